@@ -1,28 +1,60 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-import requests
-from app.config import KEYCLOAK_ISSUER, KEYCLOAK_ALGORITHMS, KEYCLOAK_CLIENT_ID
+from typing import NamedTuple
+import httpx
+import time
+from starlette.concurrency import run_in_threadpool
+from app.config import (
+    KEYCLOAK_ISSUER,
+    KEYCLOAK_ALGORITHMS,
+    KEYCLOAK_CLIENT_ID,
+    TOKEN_CACHE_SIZE,
+    TOKEN_CACHE_CLOCK_SKEW,
+)
+from app.auth.jwks_manager import jwks_manager, JWKSUnavailableError
+from app.auth.policy import role_policy
+from app.security.keycloak_client import keycloak_async_client, KeycloakUnavailableError
+from app.utils.cache import ExpiringLRUCache
+from app.utils.helpers import hash_string
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# --- Récupération des JWKS de Keycloak / Okta ---
-jwks_url = f"{KEYCLOAK_ISSUER}/protocol/openid-connect/certs"
-jwks = requests.get(jwks_url).json()
+class Principal(NamedTuple):
+    """Token vérifié : claims et masque de rôles calculé une seule fois."""
+    claims: dict
+    role_mask: int
 
+# --- Cache des tokens vérifiés : hash du token -> Principal, jusqu'à `exp` - marge
+token_cache = ExpiringLRUCache(maxsize=TOKEN_CACHE_SIZE)
+# Un nouveau bit de rôle rend les masques en cache incomplets
+role_policy.on_new_role(lambda role: token_cache.clear())
+
+# --- Clés publiques JWKS de Keycloak / Okta (chargées à la demande, voir jwks_manager) ---
 def get_public_key(kid: str):
-    for key in jwks["keys"]:
-        if key["kid"] == kid:
-            return jwt.algorithms.RSAAlgorithm.from_jwk(key)
-    raise HTTPException(status_code=401, detail="Clé publique non trouvée pour JWT")
+    try:
+        return jwks_manager.get_key(kid)
+    except KeyError:
+        raise HTTPException(status_code=401, detail="Clé publique non trouvée pour JWT")
+    except JWKSUnavailableError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service d'authentification indisponible"
+        )
 
-def verify_jwt(token: str = Depends(oauth2_scheme)):
+def verify_principal(token: str = Depends(oauth2_scheme)) -> Principal:
     """
-    Vérifie le JWT et retourne le payload.
+    Vérifie le JWT et retourne le Principal (claims + masque de rôles).
+    Un token déjà vérifié est servi depuis `token_cache` sans nouvelle vérification RSA.
     """
+    cache_key = hash_string(token)
+    principal = token_cache.get(cache_key)
+    if principal is not None:
+        return principal
+
     try:
         unverified_header = jwt.get_unverified_header(token)
-        key = get_public_key(unverified_header["kid"])
+        key = get_public_key(unverified_header.get("kid"))
         payload = jwt.decode(
             token,
             key,
@@ -30,7 +62,6 @@ def verify_jwt(token: str = Depends(oauth2_scheme)):
             audience=KEYCLOAK_CLIENT_ID,
             issuer=KEYCLOAK_ISSUER
         )
-        return payload
     except JWTError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -38,20 +69,63 @@ def verify_jwt(token: str = Depends(oauth2_scheme)):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-# Alias pour compatibilité avec d'anciennes imports
-verify_token = verify_jwt
+    principal = Principal(
+        claims=payload,
+        role_mask=role_policy.mask(payload.get("realm_access", {}).get("roles", [])),
+    )
+    ttl = payload.get("exp", 0) - TOKEN_CACHE_CLOCK_SKEW - time.time()
+    if ttl > 0:
+        token_cache.set(cache_key, principal, ttl=ttl)
+    return principal
+
+def verify_jwt(token: str = Depends(oauth2_scheme)):
+    """
+    Vérifie le JWT et retourne le payload.
+    """
+    return verify_principal(token).claims
+
+def _issued_for_this_api(claims: dict) -> bool:
+    """Même contrôle que l'audience du JWT : `aud` contient notre client, ou le token lui a été délivré (`azp`)"""
+    audience = claims.get("aud") or []
+    if isinstance(audience, str):
+        audience = [audience]
+    return KEYCLOAK_CLIENT_ID in audience or claims.get("azp") == KEYCLOAK_CLIENT_ID
 
-def require_roles(*roles):
+async def verify_opaque_token(token: str = Depends(oauth2_scheme)) -> dict:
     """
-    Dépendance FastAPI pour vérifier que le JWT contient au moins un rôle autorisé.
-    Usage: Depends(require_roles("admin", "analyst"))
+    Valide un token opaque par introspection Keycloak (résultat mis en cache).
+    Le token doit avoir été émis pour cette API (voir _issued_for_this_api).
     """
-    def wrapper(payload: dict = Depends(verify_jwt)):
-        token_roles = payload.get("realm_access", {}).get("roles", [])
-        if not any(role in token_roles for role in roles):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Rôle insuffisant pour accéder à cette ressource"
-            )
-        return payload
-    return wrapper
+    try:
+        claims = await keycloak_async_client.introspect_token(token)
+        if not _issued_for_this_api(claims):
+            raise ValueError("audience invalide")
+        return claims
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Token invalide : {str(e)}",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except (KeycloakUnavailableError, httpx.HTTPError):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service d'authentification indisponible"
+        )
+
+async def verify_bearer(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Accepte un JWT (vérification locale, voir verify_principal) ou un token
+    opaque (introspection Keycloak en cache) et retourne le Principal.
+    """
+    if token.count(".") == 2:
+        # Vérification RSA synchrone : hors de la boucle d'événements
+        return await run_in_threadpool(verify_principal, token)
+    claims = await verify_opaque_token(token)
+    return Principal(
+        claims=claims,
+        role_mask=role_policy.mask(claims.get("realm_access", {}).get("roles", [])),
+    )
+
+# Alias pour compatibilité avec d'anciennes imports
+verify_token = verify_jwt
@@ -2,10 +2,12 @@ from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from typing import Optional
 from ..models.user import User, UserInDB
 from ..security.mongodb_auth import mongodb_auth
+from ..utils.helpers import hash_string
+from .principal_cache import CachedPrincipal, principal_cache
+from .password_hasher import password_hasher, PasswordHasherBusyError
 import os
 
 # Configuration de la sécurité
@@ -13,26 +15,45 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = password_hasher.context
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def verify_password(plain_password: str, hashed_password: str):
-    """Vérifie si le mot de passe en clair correspond au hash"""
+    """Vérifie si le mot de passe en clair correspond au hash (bloquant, hors boucle async)"""
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str):
-    """Génère un hash du mot de passe"""
+    """Génère un hash du mot de passe (bloquant, hors boucle async)"""
     return pwd_context.hash(password)
 
+async def get_password_hash_async(password: str) -> str:
+    """Génère un hash du mot de passe dans le pool bcrypt dédié"""
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusyError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Service surchargé, réessayez")
+
 async def authenticate_user(username: str, password: str) -> Optional[UserInDB]:
-    """Authentifie un utilisateur"""
+    """
+    Authentifie un utilisateur.
+    La vérification bcrypt s'exécute dans le pool dédié ; si le coût du hash
+    stocké n'est plus celui configuré, le hash est régénéré de façon transparente.
+    """
     db = await mongodb_auth.get_database()
     user_doc = await db.users.find_one({"username": username})
     if not user_doc:
         return None
     user = UserInDB(**user_doc)
-    if not verify_password(password, user.hashed_password):
+    try:
+        valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    except PasswordHasherBusyError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Service surchargé, réessayez")
+    if not valid:
         return None
+    if new_hash:
+        await db.users.update_one({"username": username}, {"$set": {"hashed_password": new_hash}})
+        user.hashed_password = new_hash
+        principal_cache.invalidate_user(username)
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -46,8 +67,11 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
-    """Récupère l'utilisateur actuel à partir du token JWT"""
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> CachedPrincipal:
+    """
+    Récupère l'utilisateur actuel et le résultat de sa validation d'accès.
+    Servi depuis `principal_cache` tant que l'entrée (username, token) est valide.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -61,9 +85,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     except JWTError:
         raise credentials_exception
 
+    token_id = payload.get("jti") or hash_string(token)
+    principal = principal_cache.get(username, token_id)
+    if principal is not None:
+        return principal
+
+    version = principal_cache.version
     db = await mongodb_auth.get_database()
     user_doc = await db.users.find_one({"username": username})
     if user_doc is None:
         raise credentials_exception
-    
-    return User(**user_doc)
\ No newline at end of file
+
+    user = User(**user_doc)
+    has_access = await mongodb_auth.validate_user_access(user.username, user.access_token)
+    principal = CachedPrincipal(user=user, has_access=has_access)
+    # Un refus peut venir d'une erreur transitoire : seul un accès validé est mis en cache
+    if has_access:
+        principal_cache.set(username, token_id, principal, version=version)
+    return principal
+
+async def get_current_user(principal: CachedPrincipal = Depends(get_current_principal)) -> User:
+    """Récupère l'utilisateur actuel à partir du token JWT"""
+    return principal.user
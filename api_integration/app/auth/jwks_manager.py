@@ -0,0 +1,173 @@
+"""
+Gestion des clés publiques (JWKS) de Keycloak / Okta.
+
+- Récupération paresseuse (aucun appel réseau à l'import).
+- Cache des clés déjà construites, indexées par `kid`.
+- Rafraîchissement en arrière-plan avant l'expiration du TTL.
+- Un seul re-téléchargement (limité en fréquence) pour un `kid` inconnu.
+- Les appels concurrents partagent le même téléchargement en cours.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional
+
+import requests
+from jose import jwk
+
+from app.config import (
+    KEYCLOAK_ISSUER,
+    KEYCLOAK_ALGORITHMS,
+    JWKS_CACHE_TTL,
+    JWKS_HTTP_TIMEOUT,
+    JWKS_MIN_REFETCH_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSUnavailableError(Exception):
+    """Aucune clé JWKS n'a pu être obtenue."""
+
+
+class JWKSManager:
+    """
+    Cache thread-safe des clés publiques JWKS.
+    `verify_jwt` étant une dépendance synchrone (exécutée dans le threadpool),
+    la synchronisation repose sur threading.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str = f"{KEYCLOAK_ISSUER}/protocol/openid-connect/certs",
+        ttl: float = JWKS_CACHE_TTL,
+        http_timeout: float = JWKS_HTTP_TIMEOUT,
+        min_refetch_interval: float = JWKS_MIN_REFETCH_INTERVAL,
+        refresh_ratio: float = 0.8,
+    ):
+        self.jwks_url = jwks_url
+        self.ttl = ttl
+        self.http_timeout = http_timeout
+        self.min_refetch_interval = min_refetch_interval
+        self.refresh_ratio = refresh_ratio
+
+        self._keys: Dict[str, object] = {}
+        self._expires_at = 0.0
+        self._last_fetch = float("-inf")
+        self._lock = threading.Lock()
+        self._inflight: Optional[Future] = None
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+
+    # ---------------------------
+    # API publique
+    # ---------------------------
+    def get_key(self, kid: str):
+        """
+        Retourne la clé publique correspondant au `kid`.
+        Lève KeyError si le `kid` reste inconnu après un éventuel re-téléchargement,
+        JWKSUnavailableError si aucune clé n'a jamais pu être obtenue.
+        """
+        if time.monotonic() >= self._expires_at and self._can_refetch():
+            self._refresh(wait=True)
+        if not self._keys:
+            raise JWKSUnavailableError(f"JWKS indisponibles : {self.jwks_url}")
+
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        # Kid inconnu : rotation probable, un seul re-téléchargement limité en fréquence
+        if self._can_refetch():
+            self._refresh(wait=True)
+            key = self._keys.get(kid)
+            if key is not None:
+                return key
+        raise KeyError(kid)
+
+    def prefetch(self) -> bool:
+        """
+        Télécharge les JWKS au démarrage pour que la première requête authentifiée
+        ne paie pas l'aller-retour réseau. Retourne True si des clés sont en cache.
+        """
+        if not self._keys and self._can_refetch():
+            self._refresh(wait=True)
+        return bool(self._keys)
+
+    def close(self):
+        """Annule le rafraîchissement planifié (arrêt de l'application)."""
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    # ---------------------------
+    # Téléchargement
+    # ---------------------------
+    def _can_refetch(self) -> bool:
+        return time.monotonic() - self._last_fetch >= self.min_refetch_interval
+
+    def _refresh(self, wait: bool):
+        """
+        Lance (ou rejoint) le téléchargement des JWKS.
+        En cas d'échec, les clés existantes restent servies jusqu'au prochain essai.
+        """
+        with self._lock:
+            future = self._inflight
+            owner = future is None
+            if owner:
+                future = self._inflight = Future()
+
+        if owner:
+            try:
+                self._keys = self._fetch()
+                self._last_fetch = time.monotonic()
+                self._expires_at = self._last_fetch + self.ttl
+                self._schedule(self.ttl * self.refresh_ratio)
+                future.set_result(True)
+            except Exception as e:
+                logger.error(f"Erreur lors de la récupération des JWKS : {e}")
+                self._last_fetch = time.monotonic()
+                self._schedule(self.min_refetch_interval)
+                future.set_result(False)
+            finally:
+                with self._lock:
+                    self._inflight = None
+        elif wait:
+            try:
+                future.result(timeout=self.http_timeout * 2)
+            except FutureTimeoutError:
+                # Téléchargement en cours trop lent : on continue avec les clés en cache
+                # (aucune -> JWKSUnavailableError -> 503 côté auth_handler)
+                logger.warning(f"Attente du téléchargement JWKS en cours expirée : {self.jwks_url}")
+
+    def _fetch(self) -> Dict[str, object]:
+        response = requests.get(self.jwks_url, timeout=self.http_timeout)
+        response.raise_for_status()
+        keys = {}
+        for key in response.json().get("keys", []):
+            if "kid" not in key or key.get("use", "sig") != "sig":
+                continue
+            try:
+                keys[key["kid"]] = jwk.construct(key, algorithm=key.get("alg", KEYCLOAK_ALGORITHMS))
+            except Exception as e:
+                logger.warning(f"Clé JWKS ignorée ({key['kid']}) : {e}")
+        logger.info(f"{len(keys)} clé(s) JWKS chargée(s) depuis {self.jwks_url}")
+        return keys
+
+    def _schedule(self, delay: float):
+        """Planifie le prochain rafraîchissement en arrière-plan."""
+        with self._lock:
+            if self._closed:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._refresh, kwargs={"wait": False})
+            self._timer.daemon = True
+            self._timer.start()
+
+
+# Instance singleton
+jwks_manager = JWKSManager()
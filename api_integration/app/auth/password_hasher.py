@@ -0,0 +1,82 @@
+"""
+Hachage et vérification bcrypt hors de la boucle d'événements.
+
+bcrypt coûte ~100 ms de CPU par appel : exécuté directement dans une coroutine,
+un login bloque toutes les autres requêtes du worker. Les opérations passent
+donc par un pool de threads dédié (bcrypt libère le GIL), avec une file
+d'attente bornée pour qu'une rafale de logins ne sature pas le worker.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.config import (
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_QUEUE_TIMEOUT,
+)
+
+
+class PasswordHasherBusyError(Exception):
+    """Trop d'opérations de hachage en attente."""
+
+
+class PasswordHasher:
+    """
+    Pool bcrypt dédié avec limite de concurrence.
+    Un hash dont le coût diffère de `rounds` est signalé pour re-hachage.
+    """
+
+    def __init__(
+        self,
+        rounds: int = BCRYPT_ROUNDS,
+        max_workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT,
+    ):
+        # min/max = rounds : tout hash d'un autre coût est considéré à mettre à jour
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._slots = asyncio.Semaphore(max_pending)
+
+    async def _run(self, fn, *args):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise PasswordHasherBusyError("File de hachage saturée")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        """Génère un hash bcrypt du mot de passe."""
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Vérifie si le mot de passe en clair correspond au hash."""
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Vérifie le mot de passe et retourne (valide, nouveau_hash).
+        `nouveau_hash` est non nul si le coût du hash stocké n'est plus celui configuré.
+        """
+        return await self._run(self.context.verify_and_update, plain_password, hashed_password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+# Instance singleton
+password_hasher = PasswordHasher()
@@ -0,0 +1,76 @@
+"""
+Moteur de politique RBAC précompilé.
+
+Chaque nom de rôle est associé à une position de bit au chargement de la
+politique ; les rôles d'un token deviennent un masque entier, calculé une
+seule fois par token vérifié, et la vérification d'une route se réduit à un AND.
+
+Un rôle inconnu de la politique (ex. `require_roles("nouveau")`) reçoit un bit
+à la volée : les masques déjà calculés pour des tokens l'ignorent, d'où les
+callbacks `on_new_role` qui permettent de vider les caches de masques.
+"""
+from typing import Callable, Dict, Iterable, List
+import yaml
+from app.config import RBAC_POLICY_PATH
+
+
+class RolePolicy:
+    """
+    Politique RBAC : rôles internés en bits et masques requis par route.
+    """
+
+    def __init__(self, roles: Iterable[str] = (), routes: Dict[str, List[str]] = None):
+        self._bits: Dict[str, int] = {}
+        self._listeners: List[Callable[[str], None]] = []
+        for role in roles:
+            self.intern(role)
+        self._routes: Dict[str, int] = {
+            name: self.compile(*allowed) for name, allowed in (routes or {}).items()
+        }
+
+    @classmethod
+    def from_file(cls, path: str = RBAC_POLICY_PATH) -> "RolePolicy":
+        """Charge la politique depuis un fichier YAML (sections `roles` et `routes`)."""
+        with open(path, "r") as f:
+            config = yaml.safe_load(f)["rbac"]
+        return cls(roles=config.get("roles", []), routes=config.get("routes", {}))
+
+    def intern(self, role: str) -> int:
+        """Retourne le bit associé au rôle, en l'attribuant s'il est nouveau."""
+        bit = self._bits.get(role)
+        if bit is None:
+            bit = self._bits[role] = 1 << len(self._bits)
+            for listener in self._listeners:
+                listener(role)
+        return bit
+
+    def on_new_role(self, listener: Callable[[str], None]):
+        """Appelle `listener(role)` à chaque bit attribué après le chargement."""
+        self._listeners.append(listener)
+
+    def compile(self, *roles: str) -> int:
+        """Masque requis pour une liste de rôles autorisés."""
+        mask = 0
+        for role in roles:
+            mask |= self.intern(role)
+        return mask
+
+    def mask(self, roles: Iterable[str]) -> int:
+        """Masque des rôles d'un token ; les rôles inconnus de la politique sont ignorés."""
+        bits = self._bits
+        mask = 0
+        for role in roles:
+            mask |= bits.get(role, 0)
+        return mask
+
+    def route_mask(self, route: str) -> int:
+        """Masque requis pour une route déclarée dans la politique (KeyError sinon)."""
+        return self._routes[route]
+
+    def roles_of(self, mask: int) -> List[str]:
+        """Noms des rôles présents dans un masque (diagnostic)."""
+        return [role for role, bit in self._bits.items() if mask & bit]
+
+
+# Instance partagée par tous les routers
+role_policy = RolePolicy.from_file()
@@ -0,0 +1,54 @@
+"""
+Cache en mémoire des utilisateurs authentifiés (chatbot).
+
+Clé : (username, identifiant du token). Valeur : l'objet User et le résultat
+de la validation d'accès, pour qu'une requête authentifiée ne coûte aucune
+lecture MongoDB en régime établi.
+"""
+from typing import Any, NamedTuple, Optional
+from app.config import PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL
+from app.utils.cache import ExpiringLRUCache
+
+
+class CachedPrincipal(NamedTuple):
+    user: Any
+    has_access: bool
+
+
+class PrincipalCache:
+    """
+    Cache court (TTL) des principaux, invalidé explicitement
+    lors de la mise à jour ou de la suppression d'un utilisateur.
+    """
+
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self._cache = ExpiringLRUCache(maxsize=maxsize, default_ttl=ttl)
+        # Incrémenté à chaque invalidation : un remplissage commencé avant
+        # une mise à jour / suppression ne doit pas remettre l'ancien principal
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """À lire avant de charger l'utilisateur, puis à passer à `set`."""
+        return self._version
+
+    def get(self, username: str, token_id: str) -> Optional[CachedPrincipal]:
+        return self._cache.get((username, token_id))
+
+    def set(self, username: str, token_id: str, principal: CachedPrincipal, version: Optional[int] = None):
+        """Met en cache, sauf si une invalidation a eu lieu depuis `version`."""
+        if version is not None and version != self._version:
+            return
+        self._cache.set((username, token_id), principal)
+
+    def invalidate_user(self, username: str):
+        """Supprime toutes les entrées d'un utilisateur (tous tokens confondus)."""
+        self._version += 1
+        self._cache.invalidate_where(lambda key: key[0] == username)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+# Instance singleton
+principal_cache = PrincipalCache()
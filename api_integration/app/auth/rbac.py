@@ -1,20 +1,33 @@
 from fastapi import Depends, HTTPException, status
-from app.auth.auth_handler import verify_jwt
+from app.auth.auth_handler import Principal, verify_bearer
+from app.auth.policy import role_policy
 
-def require_roles(*allowed_roles):
+def _require_mask(required_mask: int):
     """
-    Dépendance FastAPI pour vérifier que le JWT contient au moins un rôle autorisé.
-    Usage: Depends(require_roles("admin", "analyst"))
+    Construit la dépendance FastAPI vérifiant un masque de rôles précompilé.
     """
-    def wrapper(payload: dict = Depends(verify_jwt)):
+    def wrapper(principal: Principal = Depends(verify_bearer)):
         """
-        Vérifie que le JWT contient au moins un rôle autorisé.
+        Vérifie que le JWT contient au moins un rôle autorisé (un seul AND).
         """
-        token_roles = payload.get("realm_access", {}).get("roles", [])
-        if not any(role in token_roles for role in allowed_roles):
+        if not principal.role_mask & required_mask:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Rôle insuffisant pour accéder à cette ressource"
             )
-        return payload
+        return principal.claims
     return wrapper
+
+def require_roles(*allowed_roles):
+    """
+    Dépendance FastAPI pour vérifier que le JWT contient au moins un rôle autorisé.
+    Usage: Depends(require_roles("admin", "analyst"))
+    """
+    return _require_mask(role_policy.compile(*allowed_roles))
+
+def require_policy(route: str):
+    """
+    Dépendance FastAPI appliquant les rôles déclarés pour `route` dans la politique RBAC.
+    Usage: Depends(require_policy("score"))
+    """
+    return _require_mask(role_policy.route_mask(route))
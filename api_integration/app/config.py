@@ -1,6 +1,6 @@
 import os
 from dotenv import load_dotenv
-from elasticsearch import Elasticsearch
+from app.utils.lazy import LazyResource
 
 # --- Charger le fichier .env ---
 load_dotenv()
@@ -16,25 +16,185 @@ ELASTIC_PORT = int(os.getenv("ELASTIC_PORT", 9200))
 ELASTIC_USER = os.getenv("ELASTIC_USER", "")
 ELASTIC_PASSWORD = os.getenv("ELASTIC_PASSWORD", "")
 
-# Création du client Elasticsearch
+# Client Elasticsearch créé au premier usage (import du paquet elasticsearch compris)
 es_url = f"http://{ELASTIC_HOST}:{ELASTIC_PORT}"
-if ELASTIC_USER and ELASTIC_PASSWORD:
-    # modern elasticsearch client expects a URL and basic_auth tuple
-    es_client = Elasticsearch(
-        hosts=[es_url],
-        basic_auth=(ELASTIC_USER, ELASTIC_PASSWORD)
-    )
-else:
-    es_client = Elasticsearch(
+
+def _create_es_client():
+    from elasticsearch import Elasticsearch
+    if ELASTIC_USER and ELASTIC_PASSWORD:
+        # modern elasticsearch client expects a URL and basic_auth tuple
+        return Elasticsearch(
+            hosts=[es_url],
+            basic_auth=(ELASTIC_USER, ELASTIC_PASSWORD)
+        )
+    return Elasticsearch(
         hosts=[es_url]
     )
 
+es_provider = LazyResource("elasticsearch", _create_es_client)
+
+def __getattr__(name):
+    # Compatibilité : `from app.config import es_client` crée le client à ce moment-là
+    if name == "es_client":
+        return es_provider.get()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # --- Keycloak / OAuth2 ---
 KEYCLOAK_ISSUER = os.getenv("KEYCLOAK_ISSUER", "https://keycloak.example.com/realms/myrealm")
 KEYCLOAK_CLIENT_ID = os.getenv("KEYCLOAK_CLIENT_ID", "my-client-id")
 KEYCLOAK_CLIENT_SECRET = os.getenv("KEYCLOAK_CLIENT_SECRET", "secret")
 KEYCLOAK_ALGORITHMS = os.getenv("KEYCLOAK_ALGORITHMS", "RS256")  # Signature JWT
 
+# Cache JWKS (secondes)
+JWKS_CACHE_TTL = float(os.getenv("JWKS_CACHE_TTL", 3600))
+JWKS_HTTP_TIMEOUT = float(os.getenv("JWKS_HTTP_TIMEOUT", 3))
+JWKS_MIN_REFETCH_INTERVAL = float(os.getenv("JWKS_MIN_REFETCH_INTERVAL", 30))
+
+# Cache des tokens déjà vérifiés (entrées, marge d'horloge en secondes avant `exp`)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_CLOCK_SKEW = float(os.getenv("TOKEN_CACHE_CLOCK_SKEW", 30))
+
+# Client HTTP Keycloak (pool keep-alive) et cache d'introspection
+KEYCLOAK_HTTP_TIMEOUT = float(os.getenv("KEYCLOAK_HTTP_TIMEOUT", 5))
+KEYCLOAK_HTTP_MAX_CONNECTIONS = int(os.getenv("KEYCLOAK_HTTP_MAX_CONNECTIONS", 20))
+KEYCLOAK_HTTP_MAX_KEEPALIVE = int(os.getenv("KEYCLOAK_HTTP_MAX_KEEPALIVE", 10))
+INTROSPECTION_CACHE_SIZE = int(os.getenv("INTROSPECTION_CACHE_SIZE", 10000))
+INTROSPECTION_DEFAULT_TTL = float(os.getenv("INTROSPECTION_DEFAULT_TTL", 60))
+INTROSPECTION_NEGATIVE_TTL = float(os.getenv("INTROSPECTION_NEGATIVE_TTL", 10))
+
+# Hachage des mots de passe (bcrypt) : coût et pool dédié
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 5))
+
+# Cache des utilisateurs authentifiés (chatbot)
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 30))
+
+# Tokens de service (client_credentials) pour les appels sortants
+SERVICE_TOKEN_REFRESH_RATIO = float(os.getenv("SERVICE_TOKEN_REFRESH_RATIO", 0.8))
+SERVICE_TOKEN_RETRY_DELAY = float(os.getenv("SERVICE_TOKEN_RETRY_DELAY", 5))
+
+# Politique RBAC (rôles et rôles autorisés par route)
+RBAC_POLICY_PATH = os.getenv(
+    "RBAC_POLICY_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "config", "auth", "rbac_policy.yaml")
+)
+
+# --- Chatbot (Rasa) ---
+RASA_URL = os.getenv("RASA_URL", "http://localhost:5005")
+RASA_SERVICE_AUTH = os.getenv("RASA_SERVICE_AUTH", "false").lower() == "true"  # Token de service sur les appels Rasa
+# Session HTTP persistante vers Rasa : timeouts (s), taille du pool, keep-alive et cache DNS (s)
+RASA_HTTP_TIMEOUT = float(os.getenv("RASA_HTTP_TIMEOUT", 10))
+RASA_CONNECT_TIMEOUT = float(os.getenv("RASA_CONNECT_TIMEOUT", 2))
+RASA_MAX_CONNECTIONS = int(os.getenv("RASA_MAX_CONNECTIONS", 100))
+RASA_KEEPALIVE_TIMEOUT = float(os.getenv("RASA_KEEPALIVE_TIMEOUT", 30))
+RASA_DNS_CACHE_TTL = int(os.getenv("RASA_DNS_CACHE_TTL", 300))
+# Répliques Rasa supplémentaires (séparées par des virgules), sollicitées en secours / requêtes couvertes
+RASA_REPLICA_URLS = [u.strip() for u in os.getenv("RASA_REPLICA_URLS", "").split(",") if u.strip()]
+# Résilience : deadline par requête (s), concurrence max et attente d'une place (s)
+RASA_REQUEST_DEADLINE = float(os.getenv("RASA_REQUEST_DEADLINE", 8))
+RASA_MAX_CONCURRENT = int(os.getenv("RASA_MAX_CONCURRENT", 50))
+RASA_QUEUE_TIMEOUT = float(os.getenv("RASA_QUEUE_TIMEOUT", 0.5))
+# Disjoncteur par réplique : échecs consécutifs avant ouverture, délai avant sonde (s)
+RASA_BREAKER_FAILURES = int(os.getenv("RASA_BREAKER_FAILURES", 5))
+RASA_BREAKER_RECOVERY = float(os.getenv("RASA_BREAKER_RECOVERY", 10))
+# Requête couverte vers une autre réplique après max(délai min, p95 des latences) (s).
+# Désactivée par défaut : les répliques partagent le tracker et le webhook n'est pas idempotent,
+# un tour couvert peut être traité deux fois (voir app/services/resilience.py)
+RASA_HEDGE_ENABLED = os.getenv("RASA_HEDGE_ENABLED", "false").lower() == "true"
+RASA_HEDGE_MIN_DELAY = float(os.getenv("RASA_HEDGE_MIN_DELAY", 0.05))
+# Enrichissement des messages : timeout par étape (s), au-delà la valeur par défaut est utilisée
+ENRICHMENT_STAGE_TIMEOUT = float(os.getenv("ENRICHMENT_STAGE_TIMEOUT", 0.5))
+# Dictionnaires d'entités (produits, comptes, transactions) et vérification de modification (s)
+ENTITY_DICTIONARY_PATH = os.getenv(
+    "ENTITY_DICTIONARY_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "config", "nlp", "entities.yaml")
+)
+# Profils de langue précalculés (scripts/build_language_profiles.py)
+LANGUAGE_PROFILES_PATH = os.getenv(
+    "LANGUAGE_PROFILES_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "config", "nlp", "language_profiles.bin")
+)
+ENTITY_RELOAD_INTERVAL = float(os.getenv("ENTITY_RELOAD_INTERVAL", 30))
+# Contexte de conversation en mémoire : échanges par utilisateur, utilisateurs actifs, plafond mémoire (octets),
+# durée (s) avant rechargement depuis MongoDB (échanges servis par les autres workers)
+CONTEXT_WINDOW = int(os.getenv("CONTEXT_WINDOW", 5))
+CONTEXT_MAX_USERS = int(os.getenv("CONTEXT_MAX_USERS", 10000))
+CONTEXT_MAX_BYTES = int(os.getenv("CONTEXT_MAX_BYTES", 64 * 1024 * 1024))
+CONTEXT_TTL = float(os.getenv("CONTEXT_TTL", 30))
+# Cache des réponses (questions fréquentes) : entrées, TTL (s), réponses FAQ autorisées.
+# Le webhook REST de Rasa ne renvoie pas l'intent : une réponse n'est mise en cache que si le domaine
+# la marque par un payload `custom: {faq: <nom>}` dont le nom figure dans la liste (vide : cache désactivé).
+# Par défaut, les réponses fixes du domaine (horaires, contact, agences), identiques quel que soit le contexte
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 2048))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 300))
+RESPONSE_CACHE_FAQ_RESPONSES = {
+    r.strip()
+    for r in os.getenv("RESPONSE_CACHE_FAQ_RESPONSES", "faq_horaires,faq_contact,faq_agences").split(",")
+    if r.strip()
+}
+
+# --- Santé : sondes en arrière-plan (intervalle et timeout par sonde, en s) ---
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", 10))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", 2))
+# Dépendances sans lesquelles l'instance n'est pas prête (/health/ready) : seules celles requises par
+# toutes les routes (Keycloak, authentification). Rasa et MongoDB ne servent qu'au chatbot : leur panne
+# ne doit pas retirer /score et /fraude du load balancer (état visible dans /health, statut "degraded")
+HEALTH_CRITICAL_SERVICES = [
+    s.strip() for s in os.getenv("HEALTH_CRITICAL_SERVICES", "keycloak").split(",") if s.strip()
+]
+
+# --- Démarrage : initialisation des ressources en parallèle (timeout par ressource, en s) ---
+STARTUP_RESOURCE_TIMEOUT = float(os.getenv("STARTUP_RESOURCE_TIMEOUT", 15))
+
+# --- MongoDB : connexion ---
+MONGODB_HOST = os.getenv("MONGODB_HOST", "localhost")
+MONGODB_PORT = int(os.getenv("MONGODB_PORT", 27018))
+MONGODB_DATABASE = os.getenv("MONGODB_DATABASE", "chatbot_db")
+MONGODB_AUTH_SOURCE = os.getenv("MONGODB_AUTH_SOURCE", "admin")
+# MONGO_USERNAME / MONGO_PASSWORD (noms historiques de mongodb_auth) restent prioritaires
+MONGODB_USERNAME = os.getenv("MONGO_USERNAME") or os.getenv("MONGODB_USERNAME", "test_user")
+MONGODB_PASSWORD = os.getenv("MONGO_PASSWORD") or os.getenv("MONGODB_PASSWORD", "test_password")
+
+# --- MongoDB : client partagé (pool de connexions) ---
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 5))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib")  # Compresseurs indisponibles ignorés
+
+# Cache d'existence des utilisateurs (routes /chat) : entrées, TTL présence / absence (s)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 300))
+USER_CACHE_NEGATIVE_TTL = float(os.getenv("USER_CACHE_NEGATIVE_TTL", 5))
+
+# Messages de conversation stockés par paquets (documents de taille fixe)
+CONVERSATION_BUCKET_SIZE = int(os.getenv("CONVERSATION_BUCKET_SIZE", 100))
+
+# Archivage des conversations et des échanges du chatbot : âge (jours), lots espacés (s), période du job (s)
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "false").lower() == "true"
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", 180))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 500))
+ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE", 0.5))
+ARCHIVE_MAX_BATCHES = int(os.getenv("ARCHIVE_MAX_BATCHES", 100))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", 3600))
+
+# Écritures groupées (write-behind) : taille de lot, délai max avant flush (s), file bornée
+BULK_WRITE_BATCH_SIZE = int(os.getenv("BULK_WRITE_BATCH_SIZE", 100))
+BULK_WRITE_FLUSH_INTERVAL = float(os.getenv("BULK_WRITE_FLUSH_INTERVAL", 0.05))
+BULK_WRITE_MAX_QUEUE = int(os.getenv("BULK_WRITE_MAX_QUEUE", 10000))
+BULK_WRITE_ENQUEUE_TIMEOUT = float(os.getenv("BULK_WRITE_ENQUEUE_TIMEOUT", 1))
+BULK_WRITE_MAX_RETRIES = int(os.getenv("BULK_WRITE_MAX_RETRIES", 3))
+BULK_WRITE_RETRY_BACKOFF = float(os.getenv("BULK_WRITE_RETRY_BACKOFF", 0.1))
+# Collections dont la requête attend l'acquittement de l'écriture (séparées par des virgules)
+BULK_WRITE_DURABLE_COLLECTIONS = [
+    c.strip() for c in os.getenv("BULK_WRITE_DURABLE_COLLECTIONS", "").split(",") if c.strip()
+]
+
 # --- Modèles ML ---
 SCORING_MODEL_PATH = os.getenv("SCORING_MODEL_PATH", "app/models/scoring_model.onnx")
 FRAUDE_MODEL_PATH = os.getenv("FRAUDE_MODEL_PATH", "app/models/fraude_model.onnx")
@@ -47,6 +207,14 @@ FRAUDE_ALERT_THRESHOLD = float(os.getenv("FRAUDE_ALERT_THRESHOLD", 0.7))
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_INDEX = os.getenv("LOG_INDEX", "api-logs")
 
+# Data stream ELK : rollover et rétention via ILM
+LOG_ILM_POLICY = os.getenv("LOG_ILM_POLICY", f"{LOG_INDEX}-policy")
+LOG_ROLLOVER_MAX_AGE = os.getenv("LOG_ROLLOVER_MAX_AGE", "1d")
+LOG_ROLLOVER_MAX_SIZE = os.getenv("LOG_ROLLOVER_MAX_SIZE", "10gb")
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", 30))
+LOG_NUMBER_OF_REPLICAS = int(os.getenv("LOG_NUMBER_OF_REPLICAS", 1))  # 0 pour un nœud ES unique
+LOG_BOOTSTRAP_ENABLED = os.getenv("LOG_BOOTSTRAP_ENABLED", "true").lower() == "true"
+
 # Service name used in logs
 SERVICE_NAME = os.getenv("SERVICE_NAME", "api_scoring")
 
@@ -1,8 +1,10 @@
 import logging
 import json
 import socket
+from datetime import datetime, timezone
 from logging.handlers import HTTPHandler
 from app.config import ELK_HOST, ELK_PORT, ELK_INDEX, SERVICE_NAME
+from app.utils.lazy import LazyResource
 
 class ELKHTTPHandler(HTTPHandler):
     """
@@ -14,6 +16,8 @@ class ELKHTTPHandler(HTTPHandler):
         Convertit un LogRecord en dict JSON.
         """
         log_entry = {
+            # Champ requis par le data stream (voir es_bootstrap)
+            "@timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
             "service": SERVICE_NAME,
             "level": record.levelname,
             "message": record.getMessage(),
@@ -30,16 +34,20 @@ class ELKHTTPHandler(HTTPHandler):
 logger = logging.getLogger("elk_logger")
 logger.setLevel(logging.INFO)
 
-# Handler HTTP vers Logstash/Elasticsearch
-elk_handler = ELKHTTPHandler(
-    host=f"{ELK_HOST}:{ELK_PORT}",
-    url=f"/{ELK_INDEX}/_doc",
-    method="POST"
-)
+# Handler HTTP vers Logstash/Elasticsearch, branché au démarrage (ou au premier get())
+def _attach_elk_handler() -> ELKHTTPHandler:
+    handler = ELKHTTPHandler(
+        host=f"{ELK_HOST}:{ELK_PORT}",
+        url=f"/{ELK_INDEX}/_doc",
+        method="POST"
+    )
+    logger.addHandler(handler)
+    return handler
 
-logger.addHandler(elk_handler)
+elk_handler = LazyResource("elk_handler", _attach_elk_handler)
 
 # --- Exemples d'utilisation
 if __name__ == "__main__":
+    elk_handler.get()
     logger.info({"event": "test_log", "message": "Ceci est un test de log ELK"})
     logger.error({"event": "test_error", "message": "Erreur simulée"})
@@ -0,0 +1,135 @@
+"""
+Initialisation du data stream Elasticsearch pour les logs de décision.
+
+Crée (de façon idempotente) :
+- une politique ILM de rollover / rétention,
+- un index template avec mappings explicites,
+- le data stream lui-même.
+
+Si LOG_INDEX existe déjà comme index concret (ancien format, sans ILM), le
+bootstrap échoue bruyamment au lieu de laisser les logs partir vers un index
+non géré : il faut d'abord migrer cet index (voir _check_data_stream).
+"""
+import logging
+from app.config import (
+    LOG_INDEX,
+    LOG_ILM_POLICY,
+    LOG_ROLLOVER_MAX_AGE,
+    LOG_ROLLOVER_MAX_SIZE,
+    LOG_RETENTION_DAYS,
+    LOG_NUMBER_OF_REPLICAS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Mappings explicites : pas de mapping dynamique à l'ingestion
+LOG_MAPPINGS = {
+    "dynamic": False,
+    "properties": {
+        "@timestamp": {"type": "date"},
+        "service": {"type": "keyword"},
+        "level": {"type": "keyword"},
+        "logger_name": {"type": "keyword"},
+        "hostname": {"type": "keyword"},
+        "event": {"type": "keyword"},
+        "message": {"type": "text"},
+        "error": {"type": "text"},
+        "transaction_id": {"type": "keyword"},
+        "client_id": {"type": "keyword"},
+        "risque": {"type": "float"},
+        "score": {"type": "float"},
+        "alert": {"type": "boolean"},
+        "decision": {"type": "keyword"},
+    },
+}
+
+
+def build_ilm_policy() -> dict:
+    """
+    Politique ILM : rollover sur âge/taille en phase hot, suppression après rétention.
+    """
+    return {
+        "phases": {
+            "hot": {
+                "actions": {
+                    "rollover": {
+                        "max_age": LOG_ROLLOVER_MAX_AGE,
+                        "max_primary_shard_size": LOG_ROLLOVER_MAX_SIZE,
+                    }
+                }
+            },
+            "delete": {
+                "min_age": f"{LOG_RETENTION_DAYS}d",
+                "actions": {"delete": {}},
+            },
+        }
+    }
+
+
+def build_index_template() -> dict:
+    """
+    Index template associé au data stream (mappings + politique ILM).
+    """
+    return {
+        "index_patterns": [f"{LOG_INDEX}*"],
+        "data_stream": {},
+        "priority": 200,
+        "template": {
+            "settings": {
+                "index.lifecycle.name": LOG_ILM_POLICY,
+                "number_of_replicas": LOG_NUMBER_OF_REPLICAS,
+            },
+            "mappings": LOG_MAPPINGS,
+        },
+    }
+
+
+def bootstrap_log_stream(es_client) -> bool:
+    """
+    Crée la politique ILM, l'index template et le data stream des logs.
+    Peut être appelé à chaque démarrage : les PUT écrasent à l'identique
+    et un data stream existant est conservé.
+    Retourne True si le data stream est prêt, False si le nom est pris par
+    un index concret ou en cas d'erreur.
+    """
+    from elasticsearch import ApiError
+
+    try:
+        es_client.ilm.put_lifecycle(name=LOG_ILM_POLICY, policy=build_ilm_policy())
+        es_client.indices.put_index_template(name=f"{LOG_INDEX}-template", **build_index_template())
+    except ApiError as e:
+        logger.error(f"Erreur lors de la création du template de logs : {e}")
+        return False
+
+    try:
+        es_client.indices.create_data_stream(name=LOG_INDEX)
+        logger.info(f"Data stream {LOG_INDEX} créé")
+    except ApiError as e:
+        if e.error != "resource_already_exists_exception":
+            logger.error(f"Erreur lors de la création du data stream {LOG_INDEX} : {e}")
+            return False
+        return _check_data_stream(es_client)
+    return True
+
+
+def _check_data_stream(es_client) -> bool:
+    """
+    Le nom existe déjà : vérifie que c'est bien le data stream, et non l'index
+    concret `LOG_INDEX` sur lequel écrivait l'ancienne version.
+    """
+    from elasticsearch import ApiError
+
+    try:
+        response = es_client.indices.get_data_stream(name=LOG_INDEX)
+        streams = [stream["name"] for stream in response["data_streams"]]
+    except ApiError:
+        streams = []
+    if LOG_INDEX in streams:
+        return True
+    logger.critical(
+        f"{LOG_INDEX} existe comme index concret (ancien format) et non comme data stream : "
+        f"les logs y seraient écrits sans rollover ni rétention ILM. Migration : réindexer "
+        f"{LOG_INDEX} vers un index d'archive (POST _reindex), supprimer {LOG_INDEX}, puis "
+        f"redémarrer pour créer le data stream (ou _reindex avec op_type=create vers le data stream)."
+    )
+    return False
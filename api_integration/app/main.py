@@ -1,16 +1,88 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import score_routes, fraude_routes, mongodb_routes
-from app.auth.auth_handler import require_roles, verify_token
-from app.app_logging.elk_logger import logger
+from app.routes import score_routes, fraude_routes, mongodb_routes, chatbot
+from app.auth.auth_handler import verify_bearer, token_cache
+from app.auth.rbac import require_policy
+from app.auth.principal_cache import principal_cache
+from app.auth.password_hasher import password_hasher
+from app.auth.jwks_manager import jwks_manager
+from app.security.keycloak_client import keycloak_async_client
+from app.security.service_token import service_token_provider
+from app.logging.elk_logger import logger
 from app.services.mongodb_service import mongodb_service
-import requests
-from app.config import es_client, KEYCLOAK_ISSUER
+from app.services.mongodb_client import mongo_client_factory
+from app.services.user_cache import user_existence_cache
+from app.services.conversation_archiver import conversation_archiver
+from app.services.chatbot_service import chatbot_service
+from app.services.conversation_context import conversation_context
+from app.services.health_prober import health_prober
+from app.security.mongodb_auth import mongodb_auth
+from app.logging.es_bootstrap import bootstrap_log_stream
+from app import startup
+import asyncio
+from app.config import es_provider, LOG_BOOTSTRAP_ENABLED, RASA_SERVICE_AUTH, ARCHIVE_ENABLED
+
+
+# --- Démarrage et arrêt
+async def bootstrap_logs():
+    if not LOG_BOOTSTRAP_ENABLED:
+        return
+    try:
+        # Client ES synchrone : exécuté hors de la boucle d'événements
+        await asyncio.to_thread(lambda: bootstrap_log_stream(es_provider.get()))
+    except Exception as e:
+        logger.error(f"Erreur d'initialisation du data stream de logs: {str(e)}")
+
+async def connect_mongodb():
+    try:
+        # Préchauffer le pool partagé avant les premières requêtes
+        open_connections = await mongo_client_factory.warm_up()
+        await mongodb_service.connect()
+        logger.info(f"Connexion à MongoDB établie ({open_connections} connexions ouvertes)")
+        if ARCHIVE_ENABLED:
+            conversation_archiver.start()
+    except Exception as e:
+        logger.error(f"Erreur de connexion à MongoDB: {str(e)}")
+
+async def startup_event():
+    # Ressources (client ES, handler ELK, modèles, JWKS), data stream et MongoDB en parallèle
+    report, *_ = await asyncio.gather(startup.init_resources(), bootstrap_logs(), connect_mongodb())
+    logger.info(f"Démarrage de l'API Scoring & Fraude ({report['wall_ms']} ms d'initialisation)")
+    if RASA_SERVICE_AUTH:
+        await service_token_provider.start()
+    await chatbot_service.start()
+    # Premier passage immédiat, puis toutes les HEALTH_PROBE_INTERVAL s
+    health_prober.start()
+
+async def shutdown_event():
+    logger.info("Arrêt de l'API Scoring & Fraude...")
+    await health_prober.close()
+    jwks_manager.close()
+    await service_token_provider.close()
+    await chatbot_service.close()
+    await keycloak_async_client.aclose()
+    password_hasher.shutdown()
+    await conversation_archiver.close()
+    await mongodb_service.close()
+    # Vider la file d'écriture des conversations avant de fermer le client
+    await mongodb_auth.close()
+    mongo_client_factory.close()
+    logger.info("Connexion MongoDB fermée")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup_event()
+    yield
+    await shutdown_event()
+
 
 app = FastAPI(
     title="API Scoring & Détection Fraude",
     description="Endpoints pour calcul de score et détection de fraude avec auth RBAC et logs ELK",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # --- Middleware CORS (exemple)
@@ -27,70 +99,78 @@ app.include_router(
     mongodb_routes.router,
     prefix="/chat",
     tags=["Chat"],
-    dependencies=[Depends(verify_token)]
+    dependencies=[Depends(verify_bearer)]
+)
+
+# Chatbot : utilisateurs du chatbot (token HS256, voir auth_utils.get_current_principal)
+app.include_router(
+    chatbot.router,
+    tags=["Chatbot"]
 )
 
 app.include_router(
     score_routes.router,
     prefix="/score",
     tags=["Score"],
-    dependencies=[Depends(require_roles("analyst", "admin"))]
+    dependencies=[Depends(require_policy("score"))]
 )
 
 app.include_router(
     fraude_routes.router,
     prefix="/fraude",
     tags=["Fraude"],
-    dependencies=[Depends(require_roles("analyst", "admin"))]
+    dependencies=[Depends(require_policy("fraude"))]
 )
 
 # --- Endpoint Admin exemple
-@app.get("/admin/status", tags=["Admin"], dependencies=[Depends(require_roles("admin"))])
+@app.get("/admin/status", tags=["Admin"], dependencies=[Depends(require_policy("admin"))])
 def admin_status():
     """
     Endpoint admin pour vérifier le statut de l'API.
     """
     return {"status": "API opérationnelle", "message": "Bienvenue admin!"}
 
+@app.get("/admin/metrics", tags=["Admin"], dependencies=[Depends(require_policy("admin"))])
+def admin_metrics():
+    """
+    Métriques internes (caches, pools) pour le monitoring.
+    """
+    return {
+        "auth": {
+            "token_cache": token_cache.stats(),
+            "principal_cache": principal_cache.stats(),
+            **keycloak_async_client.stats(),
+        },
+        "mongodb": {
+            "pool": mongo_client_factory.stats(),
+            "user_cache": user_existence_cache.stats(),
+            "archiver": conversation_archiver.stats(),
+            "conversation_writer": mongodb_auth.conversation_writer.stats(),
+        },
+        "rasa": chatbot_service.stats(),
+        "conversation_context": conversation_context.stats(),
+        "health": health_prober.stats(),
+        "startup": startup.last_report,
+    }
+
 # --- Root endpoint
 @app.get("/", tags=["Root"])
 def root():
     return {"message": "Bienvenue sur l'API Scoring & Fraude. Consultez /docs pour Swagger UI."}
 
 
-@app.get("/health", tags=["Health"]) 
-def health():
-    """Endpoint de santé léger qui vérifie Elasticsearch et Keycloak."""
-    status = {"elasticsearch": False, "keycloak": False}
+@app.get("/health", tags=["Health"])
+async def health():
+    """État des dépendances (Elasticsearch, Keycloak, MongoDB, Rasa) issu du dernier passage des sondes."""
+    return health_prober.snapshot()
 
-    # Vérifier Elasticsearch
-    try:
-        status["elasticsearch"] = bool(es_client.ping())
-    except Exception:
-        status["elasticsearch"] = False
-
-    # Vérifier Keycloak (simple GET vers l'issuer)
-    try:
-        r = requests.get(KEYCLOAK_ISSUER, timeout=3)
-        status["keycloak"] = r.status_code == 200
-    except Exception:
-        status["keycloak"] = False
+@app.get("/health/live", tags=["Health"])
+async def health_live():
+    """Liveness : le processus répond (aucune E/S)."""
+    return {"status": "alive"}
 
-    overall = "ok" if all(status.values()) else "degraded"
-    return {"status": overall, "services": status}
-
-# --- Event handlers pour démarrage et shutdown
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Démarrage de l'API Scoring & Fraude...")
-    try:
-        await mongodb_service.connect()
-        logger.info("Connexion à MongoDB établie")
-    except Exception as e:
-        logger.error(f"Erreur de connexion à MongoDB: {str(e)}")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("Arrêt de l'API Scoring & Fraude...")
-    await mongodb_service.close()
-    logger.info("Connexion MongoDB fermée")
+@app.get("/health/ready", tags=["Health"])
+async def health_ready():
+    """Readiness : 200 si les dépendances critiques répondaient au dernier passage des sondes, 503 sinon."""
+    snapshot = health_prober.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
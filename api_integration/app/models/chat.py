@@ -0,0 +1,7 @@
+"""Modèles des messages échangés avec le chatbot"""
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+class ChatMessage(BaseModel):
+    message: str = Field(..., min_length=1, example="Quel est le statut de ma carte ?", description="Message de l'utilisateur")
+    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Horodatage du message (UTC)")
@@ -1,6 +1,7 @@
 import random
 from app.config import FRAUDE_ALERT_THRESHOLD
 from app.logging.elk_logger import logger
+from app.utils.lazy import LazyResource
 
 class FraudeModel:
     """
@@ -72,8 +73,8 @@ class FraudeModel:
             "message": "Transaction suspecte" if alert else "Transaction normale"
         }
 
-# --- Singleton global
-fraude_model = FraudeModel()
+# --- Singleton global (modèle chargé au démarrage ou au premier appel)
+fraude_model = LazyResource("fraude_model", FraudeModel)
 
 # --- Exemple d'utilisation
 if __name__ == "__main__":
@@ -84,5 +85,5 @@ if __name__ == "__main__":
         "type": "virement",
         "historique_impaye": 2
     }
-    result = fraude_model.evaluate_transaction(transaction_test)
+    result = fraude_model.get().evaluate_transaction(transaction_test)
     print(result)
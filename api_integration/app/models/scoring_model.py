@@ -1,7 +1,7 @@
 import os
 import pickle
-import numpy as np
 from app.config import SCORING_MODEL_PATH
+from app.utils.lazy import LazyResource
 
 class ScoringModel:
     def __init__(self, model_path=SCORING_MODEL_PATH):
@@ -37,6 +37,7 @@ class ScoringModel:
         """
         if self.model:
             # Ici on suppose que le modèle a une méthode predict_proba
+            import numpy as np
             features = np.array([list(input_data.values())])
             score = self.model.predict_proba(features)[0][1]  # Probabilité classe 1
             return float(score)
@@ -49,11 +50,11 @@ class ScoringModel:
             score = max(0, min(1, 0.3 + 0.005 * (revenu/1000) - 0.05*historique_impaye + 0.01*(age/10)))
             return round(score, 3)
 
-# --- Singleton pour l'utilisation globale
-scoring_model = ScoringModel()
+# --- Singleton pour l'utilisation globale (modèle chargé au démarrage ou au premier appel)
+scoring_model = LazyResource("scoring_model", ScoringModel)
 
 # Exemple d'utilisation
 if __name__ == "__main__":
     test_input = {"age": 40, "revenu": 60000, "historique_impaye": 0}
-    score = scoring_model.predict_score(test_input)
+    score = scoring_model.get().predict_score(test_input)
     print(f"Score prédit: {score}")
@@ -0,0 +1,14 @@
+"""Modèles des utilisateurs du chatbot (documents de la collection `users`)"""
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class User(BaseModel):
+    """Utilisateur authentifié ; les champs Mongo non déclarés (_id, ...) sont ignorés"""
+    username: str = Field(..., description="Identifiant unique de l'utilisateur")
+    email: Optional[str] = Field(default=None, description="Adresse e-mail")
+    access_token: Optional[str] = Field(default=None, description="Jeton d'accès au chatbot")
+    disabled: bool = Field(default=False, description="Compte désactivé")
+
+class UserInDB(User):
+    """Utilisateur avec son hash de mot de passe (jamais renvoyé par l'API)"""
+    hashed_password: str
@@ -1,33 +1,44 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from ..models.chat import ChatMessage
-from ..services.chatbot_service import ChatbotService
+from ..services.chatbot_service import chatbot_service
+from ..services.conversation_context import conversation_context
+from ..services.resilience import BulkheadFullError, CircuitOpenError
 from ..security.mongodb_auth import mongodb_auth
-from ..auth.auth_utils import get_current_user
+from ..auth.auth_utils import get_current_principal
 from typing import List
+import asyncio
+import json
 import logging
 
 router = APIRouter()
-chatbot_service = ChatbotService()
 logger = logging.getLogger(__name__)
 
+async def _load_context(user_id: str) -> List[dict]:
+    """Derniers échanges de l'utilisateur (mémoire, relus depuis MongoDB après CONTEXT_TTL) ; vide si indisponible"""
+    try:
+        return await conversation_context.get(user_id, mongodb_auth.recent_turns)
+    except Exception as e:
+        logger.warning(f"Conversation context unavailable for {user_id}: {e}")
+        return []
+
 @router.post("/chatbot", response_model=List[dict])
 async def chat_endpoint(
     message: ChatMessage,
-    current_user = Depends(get_current_user)
+    principal = Depends(get_current_principal)
 ):
+    # Accès validé une fois par (utilisateur, token), voir principal_cache
+    if not principal.has_access:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid user credentials"
+        )
+    current_user = principal.user
+
     try:
-        # Valider l'accès utilisateur
-        if not await mongodb_auth.validate_user_access(
-            current_user.username, 
-            current_user.access_token
-        ):
-            raise HTTPException(
-                status_code=401,
-                detail="Invalid user credentials"
-            )
-
-        # Traiter le message
-        response = await chatbot_service.process_message(message.message)
+        # Traiter le message avec le contexte des derniers échanges
+        context = await _load_context(current_user.username)
+        response = await chatbot_service.process_message(message.message, context=context)
 
         # Sauvegarder la conversation
         await mongodb_auth.save_conversation({
@@ -36,12 +47,85 @@ async def chat_endpoint(
             "response": response,
             "timestamp": message.timestamp
         })
+        conversation_context.append(current_user.username, message.message, response)
 
         return response
 
+    except (CircuitOpenError, BulkheadFullError) as e:
+        logger.warning(f"Chatbot unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Chatbot temporarily unavailable")
+    except asyncio.TimeoutError:
+        logger.warning("Chatbot deadline exceeded")
+        raise HTTPException(status_code=504, detail="Chatbot timeout")
     except Exception as e:
         logger.error(f"Error in chat endpoint: {e}")
         raise HTTPException(
             status_code=500,
             detail=str(e)
-        )
\ No newline at end of file
+        )
+
+def _sse(event: str, data, event_id: int = None) -> str:
+    """Formate un événement server-sent events"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+@router.post("/chatbot/stream")
+async def chat_stream_endpoint(
+    message: ChatMessage,
+    principal = Depends(get_current_principal)
+):
+    """
+    Variante SSE de /chatbot : chaque message du bot est envoyé (événement `message`,
+    `id` = position dans la réponse) dès qu'il est enrichi, puis un événement `done`.
+    La conversation est sauvegardée une fois le flux terminé.
+    """
+    if not principal.has_access:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid user credentials"
+        )
+    current_user = principal.user
+
+    async def events():
+        responses = {}
+        try:
+            context = await _load_context(current_user.username)
+            async for index, enriched in chatbot_service.stream_message(message.message, context=context):
+                responses[index] = enriched
+                yield _sse("message", enriched, index)
+        except (CircuitOpenError, BulkheadFullError) as e:
+            logger.warning(f"Chatbot unavailable: {e}")
+            yield _sse("error", {"status": 503, "detail": "Chatbot temporarily unavailable"})
+            return
+        except asyncio.TimeoutError:
+            logger.warning("Chatbot deadline exceeded")
+            yield _sse("error", {"status": 504, "detail": "Chatbot timeout"})
+            return
+        except Exception as e:
+            logger.error(f"Error in chat stream endpoint: {e}")
+            yield _sse("error", {"detail": str(e)})
+            return
+
+        yield _sse("done", {"count": len(responses)})
+
+        # Sauvegarder la conversation (réponse dans l'ordre Rasa)
+        ordered = [responses[i] for i in sorted(responses)]
+        conversation_context.append(current_user.username, message.message, ordered)
+        try:
+            await mongodb_auth.save_conversation({
+                "user_id": current_user.username,
+                "message": message.message,
+                "response": ordered,
+                "timestamp": message.timestamp
+            })
+        except Exception as e:
+            logger.error(f"Error saving streamed conversation: {e}")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
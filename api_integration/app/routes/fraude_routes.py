@@ -2,7 +2,6 @@ from fastapi import APIRouter, HTTPException, Depends
 from app.schemas.fraude_schema import FraudeRequest, FraudeResponse
 from app.models.fraude_model import fraude_model
 from app.logging.elk_logger import logger
-from app.auth.auth_handler import require_roles
 
 router = APIRouter()
 
@@ -19,7 +18,7 @@ def detect_fraude(request: FraudeRequest):
         transaction = request.dict()
 
         # Évaluer la transaction via fraude_model
-        result = fraude_model.evaluate_transaction(transaction)
+        result = fraude_model.get().evaluate_transaction(transaction)
 
         # Logging déjà fait dans fraude_model, mais log API supplémentaire
         logger.info({
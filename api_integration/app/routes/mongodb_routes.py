@@ -1,8 +1,11 @@
 """Routes pour la gestion des utilisateurs et des conversations"""
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
-from app.schemas.mongodb_schemas import UserCreate, UserResponse, Conversation
-from app.services.mongodb_service import mongodb_service
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from app.schemas.mongodb_schemas import UserCreate, UserResponse, Conversation, Message, StoredMessage
+from app.services.mongodb_service import mongodb_service, decode_cursor
+from app.config import CONVERSATION_BUCKET_SIZE
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
 
 router = APIRouter()
@@ -10,20 +13,13 @@ router = APIRouter()
 @router.post("/users/", response_model=UserResponse)
 async def create_user(user: UserCreate):
     """Crée un nouvel utilisateur"""
-    # Vérifier si l'utilisateur existe déjà
-    existing_user = await mongodb_service.get_user(user.username)
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already registered")
-    
-    # Créer le nouvel utilisateur
     user_data = user.model_dump()
     # TODO: Hasher le mot de passe avant de le stocker
-    user_id = await mongodb_service.create_user(user_data)
-    
-    # Récupérer l'utilisateur créé
-    created_user = await mongodb_service.get_user(user.username)
-    if not created_user:
-        raise HTTPException(status_code=500, detail="Failed to create user")
+    try:
+        # Un seul insert : l'index unique sur username rejette les doublons
+        created_user = await mongodb_service.create_user(user_data)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Username already registered")
     
     return UserResponse(**created_user)
 
@@ -39,8 +35,7 @@ async def get_user(username: str):
 async def create_conversation(conversation: Conversation):
     """Crée une nouvelle conversation"""
     # Vérifier si l'utilisateur existe
-    user = await mongodb_service.get_user(conversation.user_id)
-    if not user:
+    if not await mongodb_service.user_exists(conversation.user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
     # Sauvegarder la conversation
@@ -51,12 +46,62 @@ async def create_conversation(conversation: Conversation):
     return conversation
 
 @router.get("/conversations/user/{user_id}", response_model=List[Conversation])
-async def get_user_conversations(user_id: str, limit: int = 10):
-    """Récupère les conversations d'un utilisateur"""
+async def get_user_conversations(
+    user_id: str,
+    response: Response,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full"
+):
+    """
+    Récupère une page de conversations d'un utilisateur (plus récentes d'abord).
+    Le jeton de la page suivante est renvoyé dans l'en-tête X-Next-Cursor.
+    """
     # Vérifier si l'utilisateur existe
-    user = await mongodb_service.get_user(user_id)
-    if not user:
+    if not await mongodb_service.user_exists(user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
-    conversations = await mongodb_service.get_user_conversations(user_id, limit)
-    return conversations
\ No newline at end of file
+    try:
+        conversations, next_cursor = await mongodb_service.get_user_conversations_page(user_id, limit, cursor, view)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return conversations
+
+@router.get("/conversations/user/{user_id}/stream")
+async def stream_user_conversations(
+    user_id: str,
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full"
+):
+    """Diffuse l'historique en NDJSON (une conversation par ligne) au fil du curseur MongoDB"""
+    if not await mongodb_service.user_exists(user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    async def ndjson():
+        async for conversation in mongodb_service.iter_user_conversations(user_id, cursor, view):
+            yield Conversation(**conversation).model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@router.post("/conversations/{conversation_id}/messages", response_model=StoredMessage)
+async def append_message(conversation_id: str, message: Message):
+    """Ajoute un message à une conversation (paquets de taille fixe, sans réécriture du document)"""
+    seq = await mongodb_service.append_message(conversation_id, message.model_dump())
+    if seq is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return StoredMessage(**message.model_dump(), seq=seq)
+
+@router.get("/conversations/{conversation_id}/messages", response_model=List[StoredMessage])
+async def get_latest_messages(
+    conversation_id: str,
+    limit: int = Query(50, ge=1, le=CONVERSATION_BUCKET_SIZE)
+):
+    """Récupère les derniers messages d'une conversation (ordre chronologique)"""
+    return await mongodb_service.get_latest_messages(conversation_id, limit)
@@ -2,7 +2,6 @@ from fastapi import APIRouter, HTTPException, Depends
 from app.schemas.score_schema import ScoreRequest, ScoreResponse
 from app.models.scoring_model import scoring_model
 from app.logging.elk_logger import logger
-from app.auth.auth_handler import require_roles
 
 router = APIRouter()
 
@@ -16,7 +15,7 @@ def get_score(request: ScoreRequest):
     """
     try:
         # Calcul du score
-        score = scoring_model.predict_score(request.dict())
+        score = scoring_model.get().predict_score(request.dict())
 
         # Décision simple
         from app.config import SCORE_THRESHOLD
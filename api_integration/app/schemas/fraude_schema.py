@@ -2,6 +2,9 @@ from pydantic import BaseModel, Field, validator
 from typing import Optional
 from datetime import datetime
 
+# Types de transaction acceptés (repris par les dictionnaires d'entités du chatbot)
+TRANSACTION_TYPES = ["virement", "paiement", "retrait", "depôt"]
+
 class FraudeRequest(BaseModel):
     transaction_id: str = Field(..., example="TX12345", description="Identifiant unique de la transaction")
     client_id: str = Field(..., example="C1001", description="Identifiant du client")
@@ -12,9 +15,8 @@ class FraudeRequest(BaseModel):
 
     @validator("type")
     def check_transaction_type(cls, v):
-        allowed_types = ["virement", "paiement", "retrait", "depôt"]
-        if v.lower() not in allowed_types:
-            raise ValueError(f"Type de transaction invalide : {v}. Types autorisés: {allowed_types}")
+        if v.lower() not in TRANSACTION_TYPES:
+            raise ValueError(f"Type de transaction invalide : {v}. Types autorisés: {TRANSACTION_TYPES}")
         return v.lower()
 
 class FraudeResponse(BaseModel):
@@ -9,6 +9,10 @@ class Message(BaseModel):
     content: str
     timestamp: datetime
 
+class StoredMessage(Message):
+    """Message stocké dans un paquet de conversation, avec son numéro de séquence"""
+    seq: int
+
 class ConversationMetadata(BaseModel):
     """Métadonnées d'une conversation"""
     created_at: datetime
@@ -1,6 +1,27 @@
 import requests
-from typing import List, Dict
-from app.config import KEYCLOAK_ISSUER, KEYCLOAK_CLIENT_ID, KEYCLOAK_CLIENT_SECRET
+import httpx
+import logging
+import time
+from typing import List, Dict, Optional
+from app.config import (
+    KEYCLOAK_ISSUER,
+    KEYCLOAK_CLIENT_ID,
+    KEYCLOAK_CLIENT_SECRET,
+    KEYCLOAK_HTTP_TIMEOUT,
+    KEYCLOAK_HTTP_MAX_CONNECTIONS,
+    KEYCLOAK_HTTP_MAX_KEEPALIVE,
+    INTROSPECTION_CACHE_SIZE,
+    INTROSPECTION_DEFAULT_TTL,
+    INTROSPECTION_NEGATIVE_TTL,
+    TOKEN_CACHE_CLOCK_SKEW,
+)
+from app.utils.cache import ExpiringLRUCache, SingleFlight
+from app.utils.helpers import hash_string
+
+logger = logging.getLogger(__name__)
+
+class KeycloakUnavailableError(Exception):
+    """Keycloak n'a pas pu statuer (erreur serveur, identifiants client refusés...)."""
 
 class KeycloakClient:
     """
@@ -24,9 +45,10 @@ class KeycloakClient:
             "client_id": self.client_id,
             "client_secret": self.client_secret
         }
-        response = requests.post(self.introspect_url, data=data)
+        response = requests.post(self.introspect_url, data=data, timeout=KEYCLOAK_HTTP_TIMEOUT)
         if response.status_code != 200:
-            raise ValueError(f"Erreur introspection token : {response.text}")
+            # Un token invalide donne 200 + active=false : tout autre statut vient de Keycloak
+            raise KeycloakUnavailableError(f"Erreur introspection token ({response.status_code}) : {response.text}")
         result = response.json()
         if not result.get("active"):
             raise ValueError("Token inactif ou invalide")
@@ -40,6 +62,116 @@ class KeycloakClient:
         roles = payload.get("realm_access", {}).get("roles", [])
         return roles
 
+class AsyncKeycloakClient:
+    """
+    Client Keycloak asynchrone sur un pool httpx partagé (keep-alive).
+    - Résultats d'introspection mis en cache jusqu'à l'expiration du token.
+    - Tokens invalides mis en cache négatif pendant une courte durée.
+    - Introspections concurrentes d'un même token dédupliquées.
+    """
+
+    def __init__(
+        self,
+        issuer=KEYCLOAK_ISSUER,
+        client_id=KEYCLOAK_CLIENT_ID,
+        client_secret=KEYCLOAK_CLIENT_SECRET,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.issuer = issuer
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.introspect_url = f"{self.issuer}/protocol/openid-connect/token/introspect"
+        self.token_url = f"{self.issuer}/protocol/openid-connect/token"
+        self._http = http_client
+        self._cache = ExpiringLRUCache(maxsize=INTROSPECTION_CACHE_SIZE)
+        self._negative_cache = ExpiringLRUCache(maxsize=INTROSPECTION_CACHE_SIZE, default_ttl=INTROSPECTION_NEGATIVE_TTL)
+        self._inflight = SingleFlight()
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Client HTTP partagé, créé à la première utilisation."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=KEYCLOAK_HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=KEYCLOAK_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=KEYCLOAK_HTTP_MAX_KEEPALIVE,
+                ),
+            )
+        return self._http
+
+    async def introspect_token(self, token: str) -> Dict:
+        """
+        Vérifie la validité du token auprès de Keycloak (avec cache).
+        Retourne le payload si valide, lève ValueError sinon
+        (KeycloakUnavailableError si Keycloak ne répond pas correctement).
+        """
+        key = hash_string(token)
+        result = self._cache.get(key)
+        if result is not None:
+            return result
+        if self._negative_cache.get(key) is not None:
+            raise ValueError("Token inactif ou invalide")
+        return await self._inflight.do(key, lambda: self._introspect(key, token))
+
+    async def _introspect(self, key: str, token: str) -> Dict:
+        data = {
+            "token": token,
+            "client_id": self.client_id,
+            "client_secret": self.client_secret
+        }
+        response = await self.http.post(self.introspect_url, data=data)
+        if response.status_code != 200:
+            # Un token invalide donne 200 + active=false : tout autre statut vient de Keycloak
+            raise KeycloakUnavailableError(f"Erreur introspection token ({response.status_code}) : {response.text}")
+        result = response.json()
+        if not result.get("active"):
+            self._negative_cache.set(key, True)
+            raise ValueError("Token inactif ou invalide")
+
+        exp = result.get("exp")
+        ttl = exp - TOKEN_CACHE_CLOCK_SKEW - time.time() if exp else INTROSPECTION_DEFAULT_TTL
+        if ttl > 0:
+            self._cache.set(key, result, ttl=ttl)
+        return result
+
+    async def get_roles(self, token: str) -> List[str]:
+        """
+        Récupère les rôles de l'utilisateur à partir du token.
+        """
+        payload = await self.introspect_token(token)
+        return payload.get("realm_access", {}).get("roles", [])
+
+    async def client_credentials_token(self) -> Dict:
+        """
+        Obtient un token de service (grant client_credentials).
+        Retourne la réponse Keycloak (`access_token`, `expires_in`, ...).
+        """
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret
+        }
+        response = await self.http.post(self.token_url, data=data)
+        if response.status_code != 200:
+            raise ValueError(f"Erreur obtention token de service : {response.text}")
+        return response.json()
+
+    def stats(self) -> Dict:
+        return {
+            "introspection_cache": self._cache.stats(),
+            "introspection_negative_cache": self._negative_cache.stats(),
+        }
+
+    async def aclose(self):
+        """Ferme le pool HTTP (arrêt de l'application)."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+# Instance partagée
+keycloak_async_client = AsyncKeycloakClient()
+
 # --- Exemple d'utilisation
 if __name__ == "__main__":
     client = KeycloakClient()
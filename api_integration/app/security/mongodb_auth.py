@@ -1,10 +1,13 @@
-from typing import Optional
+from typing import List, Optional
 import yaml
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ConnectionFailure
+from pymongo.write_concern import WriteConcern
 import logging
-from ..config import config
+from ..services.mongodb_client import mongo_client_factory
+from ..services.bulk_writer import BulkWriteBuffer
+from ..config import BULK_WRITE_DURABLE_COLLECTIONS
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +15,13 @@ class MongoDBAuthManager:
     def __init__(self):
         self._client: Optional[AsyncIOMotorClient] = None
         self._config = self._load_config()
+        chat_turns = self._config['collections']['chat_turns']
+        # Échanges du chatbot écrits par lots en arrière-plan (voir bulk_writer)
+        self.conversation_writer = BulkWriteBuffer(
+            self._get_chat_turns,
+            name=chat_turns,
+            wait_for_durability=chat_turns in BULK_WRITE_DURABLE_COLLECTIONS,
+        )
 
     def _load_config(self) -> dict:
         config_path = os.path.join(
@@ -23,23 +33,9 @@ class MongoDBAuthManager:
         return config['mongodb']
 
     async def initialize(self):
-        """Initialise la connexion MongoDB avec authentification"""
+        """Initialise la connexion MongoDB via le client partagé (mongodb_client)"""
         try:
-            # Construire l'URI de connexion avec auth
-            username = os.getenv('MONGO_USERNAME', self._config['auth']['credentials']['username'])
-            password = os.getenv('MONGO_PASSWORD', self._config['auth']['credentials']['password'])
-            host = self._config['connection']['host']
-            port = self._config['connection']['port']
-            auth_source = self._config['auth']['source']
-
-            uri = f"mongodb://{username}:{password}@{host}:{port}/?authSource={auth_source}"
-            
-            # Créer le client avec les options de connexion
-            self._client = AsyncIOMotorClient(
-                uri,
-                retryWrites=self._config['connection']['options']['retryWrites'],
-                w=self._config['connection']['options']['w']
-            )
+            self._client = mongo_client_factory.client
 
             # Vérifier la connexion
             await self._client.admin.command('ping')
@@ -50,17 +46,22 @@ class MongoDBAuthManager:
             raise
 
     async def get_database(self):
-        """Retourne la base de données configurée"""
+        """Retourne la base de données configurée, avec le write concern du fichier de config"""
         if not self._client:
             await self.initialize()
-        return self._client[self._config['connection']['database']]
+        return mongo_client_factory.get_database(
+            self._config['connection']['database'],
+            write_concern=WriteConcern(w=self._config['connection']['options']['w'])
+        )
+
+    async def _get_chat_turns(self):
+        db = await self.get_database()
+        return db[self._config['collections']['chat_turns']]
 
     async def close(self):
-        """Ferme la connexion MongoDB"""
-        if self._client:
-            self._client.close()
-            self._client = None
-            logger.info("MongoDB connection closed")
+        """Écrit les conversations en attente puis libère la référence au client (fermé par mongo_client_factory.close())"""
+        await self.conversation_writer.close()
+        self._client = None
 
     async def validate_user_access(self, username: str, access_token: str) -> bool:
         """Valide l'accès utilisateur"""
@@ -76,14 +77,31 @@ class MongoDBAuthManager:
             return False
 
     async def save_conversation(self, conversation_data: dict):
-        """Sauvegarde une conversation dans MongoDB"""
+        """
+        Met la conversation dans la file d'écriture groupée.
+        N'attend l'insertion que si la collection figure dans BULK_WRITE_DURABLE_COLLECTIONS.
+        Un échange du chatbot = un document plat (message + réponse) inséré une fois dans
+        `chat_turns` : aucun tableau ne grossit, d'où l'absence de paquets (append_message) ici.
+        Ces documents n'ont pas le format des conversations de mongodb_service (pas de
+        `metadata`) : ils ne partagent pas leur collection.
+        """
         try:
-            db = await self.get_database()
-            await db[self._config['collections']['conversations']].insert_one(conversation_data)
-            logger.info(f"Conversation saved for user: {conversation_data.get('user_id')}")
+            await self.conversation_writer.write(conversation_data)
+            logger.info(f"Conversation queued for user: {conversation_data.get('user_id')}")
         except Exception as e:
             logger.error(f"Error saving conversation: {e}")
             raise
 
+    async def recent_turns(self, user_id: str, limit: int) -> List[dict]:
+        """Dernières conversations du chatbot d'un utilisateur, de la plus ancienne à la plus récente"""
+        chat_turns = await self._get_chat_turns()
+        cursor = chat_turns.find(
+            {"user_id": user_id},
+            {"_id": 0, "message": 1, "response.text": 1, "timestamp": 1},
+        ).sort("_id", -1).limit(limit)
+        documents = await cursor.to_list(length=limit)
+        documents.reverse()
+        return documents
+
 # Instance singleton
 mongodb_auth = MongoDBAuthManager()
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Tokens de service (OAuth2 client_credentials) pour les appels sortants.
+
+Le token est gardé en mémoire et renouvelé en arrière-plan à ~80 % de sa
+durée de vie : en régime établi, un appel sortant n'attend jamais Keycloak.
+Seul le tout premier appel (ou un appel après expiration) attend l'obtention.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import SERVICE_TOKEN_REFRESH_RATIO, SERVICE_TOKEN_RETRY_DELAY
+from app.security.keycloak_client import AsyncKeycloakClient, keycloak_async_client
+from app.utils.cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceTokenProvider:
+    """
+    Fournit un token d'accès client_credentials mis en cache.
+    Les renouvellements concurrents sont regroupés en un seul appel Keycloak.
+    """
+
+    def __init__(
+        self,
+        keycloak: AsyncKeycloakClient = keycloak_async_client,
+        refresh_ratio: float = SERVICE_TOKEN_REFRESH_RATIO,
+        retry_delay: float = SERVICE_TOKEN_RETRY_DELAY,
+    ):
+        self.keycloak = keycloak
+        self.refresh_ratio = refresh_ratio
+        self.retry_delay = retry_delay
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._inflight = SingleFlight()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.fetches = 0
+
+    async def get_token(self) -> str:
+        """Retourne le token courant ; n'attend Keycloak que si aucun token valide n'existe."""
+        if self._token is not None and time.monotonic() < self._expires_at:
+            return self._token
+        return await self._inflight.do("token", self._fetch)
+
+    async def auth_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {await self.get_token()}"}
+
+    async def start(self):
+        """Obtient le premier token au démarrage (les requêtes suivantes ne l'attendent pas)."""
+        try:
+            await self.get_token()
+        except Exception as e:
+            logger.error(f"Impossible d'obtenir le token de service : {e}")
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def _fetch(self) -> str:
+        try:
+            response = await self.keycloak.client_credentials_token()
+        except Exception:
+            self._schedule(self.retry_delay)
+            raise
+        lifetime = float(response.get("expires_in", 60))
+        self._token = response["access_token"]
+        self._expires_at = time.monotonic() + lifetime
+        self.fetches += 1
+        self._schedule(lifetime * self.refresh_ratio)
+        return self._token
+
+    def _schedule(self, delay: float):
+        """Planifie le renouvellement proactif du token."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._refresh_in_background)
+
+    def _refresh_in_background(self):
+        self._timer = None
+        task = asyncio.ensure_future(self._inflight.do("token", self._fetch))
+        task.add_done_callback(self._log_refresh_error)
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Future):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Renouvellement du token de service échoué : {task.exception()}")
+
+
+class ServiceTokenAuth(httpx.Auth):
+    """
+    Authentification httpx ajoutant le token de service à chaque requête.
+    Usage : httpx.AsyncClient(auth=ServiceTokenAuth(service_token_provider))
+    """
+
+    def __init__(self, provider: ServiceTokenProvider):
+        self.provider = provider
+
+    async def async_auth_flow(self, request: httpx.Request):
+        request.headers["Authorization"] = f"Bearer {await self.provider.get_token()}"
+        yield request
+
+
+# Instance partagée
+service_token_provider = ServiceTokenProvider()
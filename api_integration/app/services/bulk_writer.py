@@ -0,0 +1,185 @@
+"""
+Écritures MongoDB groupées en arrière-plan (write-behind).
+
+Les documents sont placés dans une file bornée puis insérés par lots
+(`insert_many(ordered=False)`) dès que le lot est plein ou que le délai de
+flush est écoulé. La requête n'attend l'acquittement que si la collection est
+configurée comme durable ; sinon l'insert (et son write concern) sort de la
+latence perçue par l'utilisateur.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+
+from app.config import (
+    BULK_WRITE_BATCH_SIZE,
+    BULK_WRITE_FLUSH_INTERVAL,
+    BULK_WRITE_MAX_QUEUE,
+    BULK_WRITE_ENQUEUE_TIMEOUT,
+    BULK_WRITE_MAX_RETRIES,
+    BULK_WRITE_RETRY_BACKOFF,
+)
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+_STOP = object()
+
+
+class BulkWriterFullError(Exception):
+    """File d'écriture saturée."""
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, ConnectionFailure):
+        return True
+    return isinstance(error, PyMongoError) and error.has_error_label("RetryableWriteError")
+
+
+class BulkWriteBuffer:
+    """
+    Tampon d'écriture pour une collection.
+    `get_collection` est une coroutine retournant la collection Motor cible.
+    """
+
+    def __init__(
+        self,
+        get_collection: Callable[[], Awaitable[Any]],
+        name: str = "",
+        wait_for_durability: bool = False,
+        max_batch_size: int = BULK_WRITE_BATCH_SIZE,
+        flush_interval: float = BULK_WRITE_FLUSH_INTERVAL,
+        max_queue: int = BULK_WRITE_MAX_QUEUE,
+        enqueue_timeout: float = BULK_WRITE_ENQUEUE_TIMEOUT,
+        max_retries: int = BULK_WRITE_MAX_RETRIES,
+        retry_backoff: float = BULK_WRITE_RETRY_BACKOFF,
+    ):
+        self._get_collection = get_collection
+        self.name = name
+        self.wait_for_durability = wait_for_durability
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"enqueued": 0, "written": 0, "failed": 0, "batches": 0, "retries": 0}
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+
+    async def write(self, document: Dict[str, Any]):
+        """
+        Ajoute un document au prochain lot.
+        Si `wait_for_durability`, attend son insertion (et propage l'erreur éventuelle).
+        Lève BulkWriterFullError si la file reste pleine plus de `enqueue_timeout`.
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future() if self.wait_for_durability else None
+        try:
+            await asyncio.wait_for(self._queue.put((document, future)), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise BulkWriterFullError(f"File d'écriture {self.name} saturée")
+        self._stats["enqueued"] += 1
+        if future is not None:
+            await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], Optional[asyncio.Future]]]):
+        documents = [document for document, _ in batch]
+        failures: Dict[int, Exception] = {}
+        pending = list(range(len(batch)))
+        attempt = 0
+        self._stats["batches"] += 1
+
+        while pending:
+            retry_error = None
+            try:
+                collection = await self._get_collection()
+                await collection.insert_many([documents[i] for i in pending], ordered=False)
+                pending = []
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    index = pending[error["index"]]
+                    # Doublon de _id lors d'une nouvelle tentative : déjà écrit précédemment
+                    if attempt and error.get("code") == DUPLICATE_KEY:
+                        continue
+                    failures[index] = e
+                if e.details.get("writeConcernErrors"):
+                    retry_error = e
+                else:
+                    pending = []
+            except Exception as e:
+                if not _is_transient(e):
+                    failures.update({i: e for i in pending})
+                    pending = []
+                else:
+                    retry_error = e
+
+            if retry_error is None:
+                break
+            pending = [i for i in pending if i not in failures]
+            attempt += 1
+            if attempt > self.max_retries:
+                failures.update({i: retry_error for i in pending})
+                break
+            self._stats["retries"] += 1
+            logger.warning(f"Écriture groupée {self.name} : erreur transitoire, nouvelle tentative ({retry_error})")
+            await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+        self._stats["written"] += len(batch) - len(failures)
+        self._stats["failed"] += len(failures)
+        if failures:
+            logger.error(f"Écriture groupée {self.name} : {len(failures)} document(s) non écrits")
+        for index, (_, future) in enumerate(batch):
+            if future is None or future.done():
+                continue
+            if index in failures:
+                future.set_exception(failures[index])
+            else:
+                future.set_result(None)
+
+    async def close(self):
+        """Vide la file (flush des lots restants) puis arrête la tâche d'écriture."""
+        if self._task is not None and not self._task.done():
+            await self._queue.put(_STOP)
+            await self._task
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "wait_for_durability": self.wait_for_durability,
+        }
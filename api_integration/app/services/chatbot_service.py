@@ -1,51 +1,401 @@
 from typing import List, Dict, Any
 import aiohttp
+import asyncio
 import logging
+import time
 from datetime import datetime
-from ..models.chat import ChatMessage
-from ..config import config
+from typing import AsyncIterator, Optional, Tuple
+from ..config import (
+    RASA_URL,
+    RASA_SERVICE_AUTH,
+    RASA_HTTP_TIMEOUT,
+    RASA_CONNECT_TIMEOUT,
+    RASA_MAX_CONNECTIONS,
+    RASA_KEEPALIVE_TIMEOUT,
+    RASA_DNS_CACHE_TTL,
+    RASA_REPLICA_URLS,
+    RASA_REQUEST_DEADLINE,
+    RASA_MAX_CONCURRENT,
+    RASA_QUEUE_TIMEOUT,
+    RASA_BREAKER_FAILURES,
+    RASA_BREAKER_RECOVERY,
+    RASA_HEDGE_ENABLED,
+    RASA_HEDGE_MIN_DELAY,
+    ENRICHMENT_STAGE_TIMEOUT,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_FAQ_RESPONSES,
+    CONTEXT_WINDOW,
+)
+from ..security.service_token import ServiceTokenProvider, service_token_provider
+from .entity_extractor import entity_extractor
+from .language_detector import language_detector
+from .resilience import ResilientCaller
+from ..utils.cache import ExpiringLRUCache
+from ..utils.helpers import normalize_string
 
 logger = logging.getLogger(__name__)
 
-class ChatbotService:
+
+class RasaPoolMetrics:
+    """Compteurs de la session Rasa, alimentés par les hooks de trace aiohttp"""
+
     def __init__(self):
-        self.rasa_url = config.get("rasa", {}).get("url", "http://localhost:5005")
-        self.context_window = 5  # Nombre de messages à conserver pour le contexte
+        self.requests = 0
+        self.in_flight = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_request_end.append(self._on_request_done)
+        trace.on_request_exception.append(self._on_request_exception)
+        trace.on_connection_create_end.append(self._on_connection_create)
+        trace.on_connection_reuseconn.append(self._on_connection_reuse)
+        return trace
+
+    async def _on_request_start(self, session, context, params):
+        self.requests += 1
+        self.in_flight += 1
+
+    async def _on_request_done(self, session, context, params):
+        self.in_flight -= 1
+
+    async def _on_request_exception(self, session, context, params):
+        self.in_flight -= 1
+        self.errors += 1
+
+    async def _on_connection_create(self, session, context, params):
+        self.connections_created += 1
+
+    async def _on_connection_reuse(self, session, context, params):
+        self.connections_reused += 1
+
+    def stats(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+
+# Résultat utilisé quand une étape d'enrichissement échoue ou dépasse son timeout
+STAGE_DEFAULTS = {
+    "language": lambda: "fr",
+    "sentiment": lambda: {"positive": 0.0, "neutral": 1.0, "negative": 0.0},
+    "entities": list,
+    "suggestions": list,
+    "additional_info": lambda: {"related_topics": [], "useful_links": [], "documentation": None},
+}
+
+
+class StageMetrics:
+    """Durées et échecs par étape d'enrichissement"""
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, stage: str, duration_ms: float, outcome: str):
+        stats = self._stages.setdefault(
+            stage, {"calls": 0, "timeouts": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+        stats["calls"] += 1
+        stats["total_ms"] += duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+        if outcome != "ok":
+            stats[outcome] += 1
 
-    async def process_message(self, message: str) -> List[Dict[str, Any]]:
-        """Traite un message et retourne une réponse enrichie"""
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                **values,
+                "avg_ms": round(values["total_ms"] / values["calls"], 3),
+                "total_ms": round(values["total_ms"], 3),
+                "max_ms": round(values["max_ms"], 3),
+            }
+            for stage, values in self._stages.items()
+        }
+
+
+class ChatbotService:
+    def __init__(
+        self,
+        token_provider: Optional[ServiceTokenProvider] = None,
+        rasa_url: str = RASA_URL,
+        timeout: float = RASA_HTTP_TIMEOUT,
+        connect_timeout: float = RASA_CONNECT_TIMEOUT,
+        max_connections: int = RASA_MAX_CONNECTIONS,
+        replica_urls: List[str] = RASA_REPLICA_URLS,
+        deadline: float = RASA_REQUEST_DEADLINE,
+    ):
+        self.rasa_url = rasa_url
+        self.replicas = [rasa_url] + [url for url in replica_urls if url != rasa_url]
+        self.context_window = CONTEXT_WINDOW  # Nombre d'échanges précédents envoyés à Rasa
+        # Token de service ajouté aux appels Rasa (déjà en cache, renouvelé en arrière-plan)
+        self.token_provider = token_provider or (service_token_provider if RASA_SERVICE_AUTH else None)
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.max_connections = max_connections
+        self.metrics = RasaPoolMetrics()
+        # Timeout par étape d'enrichissement (modifiable étape par étape)
+        self.stage_timeouts: Dict[str, float] = {stage: ENRICHMENT_STAGE_TIMEOUT for stage in STAGE_DEFAULTS}
+        self.stage_metrics = StageMetrics()
+        # Réponses enrichies des questions fréquentes, clé (message normalisé, langue) ;
+        # uniquement les réponses marquées FAQ par le domaine Rasa (voir _is_cacheable)
+        self.response_cache = ExpiringLRUCache(maxsize=RESPONSE_CACHE_SIZE, default_ttl=RESPONSE_CACHE_TTL)
+        self.cache_faq_responses = set(RESPONSE_CACHE_FAQ_RESPONSES)
+        self.cache_skipped = 0
+        # Deadline, limite de concurrence, disjoncteurs et requêtes couvertes vers les répliques
+        self.resilience = ResilientCaller(
+            self.replicas,
+            deadline=deadline,
+            max_concurrent=RASA_MAX_CONCURRENT,
+            queue_timeout=RASA_QUEUE_TIMEOUT,
+            failure_threshold=RASA_BREAKER_FAILURES,
+            recovery_timeout=RASA_BREAKER_RECOVERY,
+            hedge=RASA_HEDGE_ENABLED,
+            hedge_min_delay=RASA_HEDGE_MIN_DELAY,
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        """Crée la session HTTP persistante (connexions keep-alive réutilisées entre les messages)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections,
+                keepalive_timeout=RASA_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=RASA_DNS_CACHE_TTL,
+                use_dns_cache=True,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                trace_configs=[self.metrics.trace_config()],
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Filet de sécurité si start() n'a pas été appelé (tests, scripts)
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def ping(self) -> bool:
+        """Au moins une réplique Rasa répond sur sa racine (sonde de santé, hors disjoncteurs)"""
+        session = await self._get_session()
+
+        async def ping_replica(replica: str) -> bool:
+            try:
+                async with session.get(f"{replica}/") as response:
+                    return response.status == 200
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return False
+
+        return any(await asyncio.gather(*(ping_replica(replica) for replica in self.replicas)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics.stats(),
+            "max_connections": self.max_connections,
+            "open": self._session is not None and not self._session.closed,
+            "enrichment": self.stage_metrics.stats(),
+            "response_cache": {**self.response_cache.stats(), "skipped": self.cache_skipped},
+            "resilience": self.resilience.stats(),
+            "entities": entity_extractor.get().stats() if entity_extractor.initialized else {},
+        }
+
+    async def process_message(
+        self,
+        message: str,
+        timeout: Optional[float] = None,
+        context: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Traite un message et retourne une réponse enrichie.
+        Les questions fréquentes déjà posées (même texte normalisé, même langue) sont servies
+        depuis le cache, contexte compris : seules les réponses FAQ de la liste autorisée y
+        entrent, et leur texte ne dépend pas des échanges précédents (voir _is_cacheable).
+        `timeout` (s) remplace le timeout total par défaut pour cet appel.
+        `context` : échanges précédents de l'utilisateur (voir conversation_context), transmis à Rasa.
+        """
         try:
-            # Enrichir le message avec le contexte et les métadonnées
-            enriched_message = await self._enrich_message(message)
-            
-            # Envoyer au modèle Rasa
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.rasa_url}/webhooks/rest/webhook",
-                    json=enriched_message
-                ) as response:
-                    if response.status == 200:
-                        bot_response = await response.json()
-                        # Enrichir la réponse
-                        return await self._enrich_response(bot_response, message)
-                    else:
-                        error_msg = await response.text()
-                        logger.error(f"Rasa error: {error_msg}")
-                        raise Exception("Failed to get response from chatbot")
+            language = await self._run_stage("language", self._detect_language, message)
+            cache_key = (normalize_string(message), language)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return self._replay(cached)
 
+            bot_response = await self._ask_rasa(message, language, timeout, context)
+            cacheable = self._is_cacheable(bot_response)
+            # Enrichir la réponse
+            responses = await self._enrich_response(self._bot_messages(bot_response), message)
+            if cacheable:
+                self.response_cache.set(cache_key, responses)
+            return responses
+
+        except asyncio.TimeoutError:
+            logger.error("Error processing message: Rasa timeout")
+            raise
         except Exception as e:
             logger.error(f"Error processing message: {e}")
             raise
 
-    async def _enrich_message(self, message: str) -> Dict[str, Any]:
-        """Enrichit le message avec des métadonnées et du contexte"""
+    async def stream_message(
+        self,
+        message: str,
+        timeout: Optional[float] = None,
+        context: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Variante de process_message qui produit chaque message du bot dès qu'il est enrichi,
+        sous la forme (position dans la réponse Rasa, message enrichi).
+        """
+        language = await self._run_stage("language", self._detect_language, message)
+        cache_key = (normalize_string(message), language)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            for index, msg in enumerate(self._replay(cached)):
+                yield index, msg
+            return
+
+        bot_response = await self._ask_rasa(message, language, timeout, context)
+        cacheable = self._is_cacheable(bot_response)
+        bot_response = self._bot_messages(bot_response)
+
+        async def enrich(index: int, msg: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+            return index, await self._enrich_bot_message(msg, message)
+
+        tasks = [asyncio.ensure_future(enrich(i, msg)) for i, msg in enumerate(bot_response)]
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, enriched = await next_done
+                responses[index] = enriched
+                yield index, enriched
+        finally:
+            # Client déconnecté : inutile de finir l'enrichissement des messages restants
+            for task in tasks:
+                task.cancel()
+
+        if cacheable:
+            self.response_cache.set(cache_key, responses)
+
+    async def _ask_rasa(
+        self,
+        message: str,
+        language: str,
+        timeout: Optional[float] = None,
+        context: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Envoie le message enrichi au webhook REST de Rasa et retourne ses messages bruts"""
+        # Enrichir le message avec le contexte et les métadonnées
+        enriched_message = await self._enrich_message(message, language, context)
+
+        headers = await self.token_provider.auth_headers() if self.token_provider else None
+        session = await self._get_session()
+
+        # Envoyer au modèle Rasa (`timeout` : deadline de l'appel, file d'attente et relances comprises)
+        try:
+            return await self.resilience.call(
+                lambda replica: self._post_rasa(session, replica, enriched_message, headers),
+                deadline=timeout,
+            )
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+
+    async def _post_rasa(
+        self,
+        session: aiohttp.ClientSession,
+        replica: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]],
+    ) -> List[Dict[str, Any]]:
+        async with session.post(f"{replica}/webhooks/rest/webhook", json=payload, headers=headers) as response:
+            if response.status == 200:
+                return await response.json()
+            error_msg = await response.text()
+            logger.error(f"Rasa error ({replica}): {error_msg}")
+            raise Exception("Failed to get response from chatbot")
+
+    def _is_cacheable(self, bot_response: List[Dict[str, Any]]) -> bool:
+        """
+        Seules les réponses connues comme FAQ sont mises en cache. Le webhook REST ne renvoie pas
+        l'intent : le signal est le payload `custom: {faq: <nom>}` de la réponse du domaine,
+        dont le nom doit figurer dans `cache_faq_responses`. Sans marqueur, ou avec un payload
+        inconnu, la réponse peut dépendre du client ou du contexte : pas de cache. Une réponse
+        de la liste ne doit donc dépendre ni de l'un ni de l'autre (horaires, contact...).
+        """
+        markers = [msg["custom"].get("faq") for msg in bot_response if isinstance(msg.get("custom"), dict)]
+        if markers and all(name in self.cache_faq_responses for name in markers):
+            return True
+        self.cache_skipped += 1
+        return False
+
+    @staticmethod
+    def _bot_messages(bot_response: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Messages à afficher : les marqueurs FAQ (payload custom sans texte) sont retirés"""
+        return [
+            msg for msg in bot_response
+            if "text" in msg or not (isinstance(msg.get("custom"), dict) and "faq" in msg["custom"])
+        ]
+
+    @staticmethod
+    def _replay(cached: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        now = datetime.utcnow().isoformat()
+        return [{**msg, "timestamp": now} for msg in cached]
+
+    async def _run_stage(self, stage: str, fn, *args) -> Any:
+        """
+        Exécute une étape d'enrichissement avec son timeout.
+        En cas d'échec ou de dépassement, retourne la valeur par défaut de l'étape.
+        """
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await asyncio.wait_for(fn(*args), timeout=self.stage_timeouts[stage])
+        except asyncio.TimeoutError:
+            outcome = "timeouts"
+            logger.warning(f"Enrichissement '{stage}' : timeout, valeur par défaut utilisée")
+        except Exception as e:
+            outcome = "errors"
+            logger.warning(f"Enrichissement '{stage}' en échec ({e}), valeur par défaut utilisée")
+        finally:
+            self.stage_metrics.record(stage, (time.perf_counter() - start) * 1000, outcome)
+        return STAGE_DEFAULTS[stage]()
+
+    async def _enrich_message(
+        self,
+        message: str,
+        language: Optional[str] = None,
+        context: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Enrichit le message avec des métadonnées et du contexte (étapes exécutées en parallèle).
+        `language` évite de refaire la détection si elle a déjà été faite ;
+        seuls les `context_window` derniers échanges de `context` sont transmis.
+        """
+        stages = [
+            self._run_stage("sentiment", self._analyze_sentiment, message),
+            self._run_stage("entities", self._extract_entities, message),
+        ]
+        if language is None:
+            language, sentiment, entities = await asyncio.gather(
+                self._run_stage("language", self._detect_language, message), *stages
+            )
+        else:
+            sentiment, entities = await asyncio.gather(*stages)
         return {
             "message": message,
             "metadata": {
                 "timestamp": datetime.utcnow().isoformat(),
-                "language": await self._detect_language(message),
-                "sentiment": await self._analyze_sentiment(message),
-                "entities": await self._extract_entities(message)
+                "language": language,
+                "sentiment": sentiment,
+                "entities": entities,
+                "context": (context or [])[-self.context_window:]
             }
         }
 
@@ -54,29 +404,32 @@ class ChatbotService:
         response: List[Dict[str, Any]], 
         original_message: str
     ) -> List[Dict[str, Any]]:
-        """Enrichit la réponse avec des informations supplémentaires"""
-        enriched_responses = []
-        
-        for msg in response:
-            enriched_msg = {
-                "text": msg["text"],
-                "timestamp": datetime.utcnow().isoformat(),
-                "context": {
-                    "original_message": original_message,
-                    "confidence": msg.get("confidence", 1.0),
-                    "intent": msg.get("intent", {}).get("name", "unknown")
-                },
-                "suggestions": await self._generate_suggestions(msg["text"]),
-                "additional_info": await self._fetch_additional_info(msg["text"])
-            }
-            enriched_responses.append(enriched_msg)
-        
-        return enriched_responses
+        """Enrichit la réponse avec des informations supplémentaires (messages traités en parallèle)"""
+        return list(await asyncio.gather(
+            *(self._enrich_bot_message(msg, original_message) for msg in response)
+        ))
+
+    async def _enrich_bot_message(self, msg: Dict[str, Any], original_message: str) -> Dict[str, Any]:
+        """Enrichit un message du bot"""
+        suggestions, additional_info = await asyncio.gather(
+            self._run_stage("suggestions", self._generate_suggestions, msg["text"]),
+            self._run_stage("additional_info", self._fetch_additional_info, msg["text"]),
+        )
+        return {
+            "text": msg["text"],
+            "timestamp": datetime.utcnow().isoformat(),
+            "context": {
+                "original_message": original_message,
+                "confidence": msg.get("confidence", 1.0),
+                "intent": msg.get("intent", {}).get("name", "unknown")
+            },
+            "suggestions": suggestions,
+            "additional_info": additional_info
+        }
 
     async def _detect_language(self, text: str) -> str:
-        """Détecte la langue du message"""
-        # TODO: Implémenter la détection de langue
-        return "fr"  # Par défaut français
+        """Détecte la langue du message (trigrammes, en mémoire ; français par défaut)"""
+        return language_detector.get().detect(text)
 
     async def _analyze_sentiment(self, text: str) -> Dict[str, float]:
         """Analyse le sentiment du message"""
@@ -88,9 +441,8 @@ class ChatbotService:
         }
 
     async def _extract_entities(self, text: str) -> List[Dict[str, Any]]:
-        """Extrait les entités nommées du message"""
-        # TODO: Implémenter l'extraction d'entités
-        return []
+        """Extrait les entités du message (dictionnaires, automate d'Aho-Corasick)"""
+        return entity_extractor.get().extract(text)
 
     async def _generate_suggestions(self, response_text: str) -> List[str]:
         """Génère des suggestions de suivi basées sur la réponse"""
@@ -108,4 +460,8 @@ class ChatbotService:
             "related_topics": [],
             "useful_links": [],
             "documentation": None
-        }
\ No newline at end of file
+        }
+
+
+# Instance singleton
+chatbot_service = ChatbotService()
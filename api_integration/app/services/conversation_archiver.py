@@ -0,0 +1,265 @@
+"""
+Archivage des conversations anciennes.
+
+Les conversations dont la dernière mise à jour dépasse ARCHIVE_AFTER_DAYS sont
+déplacées, par lots espacés, de `conversations` vers `conversations_archive`.
+Une conversation archivée garde son _id, son user_id et ses métadonnées en clair
+(pour la pagination par clé) ; le reste du document est stocké compressé (zlib),
+ainsi que ses paquets de messages (`conversation_buckets`), retirés de la
+collection chaude dans le même lot.
+La lecture de l'historique (mongodb_service) bascule sur l'archive de façon transparente.
+Ajouter un message à une conversation archivée la restaure d'abord dans la
+collection chaude (restore_conversation) : l'archive est en lecture seule.
+
+Les échanges du chatbot (`chat_turns`, documents plats immuables datés par
+`timestamp`) sont déplacés de la même façon vers `chat_turns_archive`.
+"""
+import asyncio
+import logging
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import bson
+from bson.binary import Binary
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.config import (
+    ARCHIVE_AFTER_DAYS,
+    ARCHIVE_BATCH_SIZE,
+    ARCHIVE_BATCH_PAUSE,
+    ARCHIVE_MAX_BATCHES,
+    ARCHIVE_INTERVAL,
+)
+from app.services.mongodb_client import mongo_client_factory
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLLECTION = "conversations_archive"
+BUCKET_COLLECTION = "conversation_buckets"
+CHAT_TURNS_COLLECTION = "chat_turns"
+CHAT_TURNS_ARCHIVE_COLLECTION = "chat_turns_archive"
+DUPLICATE_KEY = 11000
+
+
+def archive_boundary(after_days: float = ARCHIVE_AFTER_DAYS) -> datetime:
+    """Toute conversation archivée a été mise à jour pour la dernière fois avant cette date"""
+    return datetime.utcnow() - timedelta(days=after_days)
+
+
+def _compress(document: Dict[str, Any]) -> Binary:
+    return Binary(zlib.compress(bson.encode(document)))
+
+
+def pack_conversation(
+    conversation: Dict[str, Any],
+    archived_at: datetime,
+    buckets: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    archived = {
+        '_id': conversation['_id'],
+        'user_id': conversation.get('user_id'),
+        'metadata': conversation.get('metadata', {}),
+        'archived_at': archived_at,
+        'data': _compress(conversation),
+    }
+    if buckets:
+        archived['buckets'] = _compress({'buckets': buckets})
+    return archived
+
+
+def pack_turn(turn: Dict[str, Any], archived_at: datetime) -> Dict[str, Any]:
+    """Échange du chatbot archivé : user_id et timestamp en clair, document compressé"""
+    return {
+        '_id': turn['_id'],
+        'user_id': turn.get('user_id'),
+        'timestamp': turn.get('timestamp'),
+        'archived_at': archived_at,
+        'data': _compress(turn),
+    }
+
+
+def unpack_buckets(archived: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Paquets de messages archivés avec la conversation (documents d'origine)"""
+    if 'buckets' not in archived:
+        return []
+    return bson.decode(zlib.decompress(archived['buckets']))['buckets']
+
+
+def unpack_conversation(archived: Dict[str, Any], view: str = 'full') -> Dict[str, Any]:
+    """Document d'origine, avec la même projection que la collection chaude pour `summary`"""
+    conversation = bson.decode(zlib.decompress(archived['data']))
+    if view == 'summary' and 'messages' in conversation:
+        conversation['messages'] = conversation['messages'][-1:]
+    return conversation
+
+
+async def _ignore_duplicates(insert):
+    try:
+        await insert
+    except (DuplicateKeyError, BulkWriteError) as e:
+        # Copie déjà présente (opération interrompue puis reprise) : sans conséquence
+        errors = e.details.get('writeErrors', []) if isinstance(e, BulkWriteError) else []
+        if any(error.get('code') != DUPLICATE_KEY for error in errors):
+            raise
+
+
+async def restore_conversation(db, conversation_id: Any) -> bool:
+    """
+    Ramène une conversation archivée (et ses paquets) dans la collection chaude.
+    Retourne False si elle n'est pas dans l'archive. Idempotent : deux appels
+    concurrents restaurent le même document.
+
+    Un lot d'archivage en cours peut encore supprimer les paquets de cette
+    conversation : ceux encore présents sont d'abord marqués `restored_at`
+    (archive_batch ne supprime pas un paquet restauré après le début du lot),
+    puis les manquants sont réinsérés depuis l'archive avec la même marque.
+    """
+    archive = db[ARCHIVE_COLLECTION]
+    archived = await archive.find_one({'_id': conversation_id})
+    if archived is None:
+        return False
+    now = datetime.utcnow()
+    await db[BUCKET_COLLECTION].update_many({'conversation_id': conversation_id}, {'$set': {'restored_at': now}})
+    await _ignore_duplicates(db.conversations.insert_one(unpack_conversation(archived)))
+    buckets = [{**bucket, 'restored_at': now} for bucket in unpack_buckets(archived)]
+    if buckets:
+        await _ignore_duplicates(db[BUCKET_COLLECTION].insert_many(buckets, ordered=False))
+    await archive.delete_one({'_id': conversation_id})
+    logger.info(f"Conversation {conversation_id} restaurée depuis l'archive")
+    return True
+
+
+class ConversationArchiver:
+    """
+    Tâche périodique de déplacement vers l'archive.
+    `get_database` retourne la base Motor contenant les deux collections.
+    """
+
+    def __init__(
+        self,
+        get_database: Callable[[], Any] = mongo_client_factory.get_database,
+        after_days: float = ARCHIVE_AFTER_DAYS,
+        batch_size: int = ARCHIVE_BATCH_SIZE,
+        batch_pause: float = ARCHIVE_BATCH_PAUSE,
+        max_batches: int = ARCHIVE_MAX_BATCHES,
+        interval: float = ARCHIVE_INTERVAL,
+    ):
+        self._get_database = get_database
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.max_batches = max_batches
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"runs": 0, "archived": 0, "turns_archived": 0, "last_run": None, "last_error": None}
+
+    async def archive_batch(self, cutoff: datetime) -> int:
+        """Déplace au plus `batch_size` conversations antérieures à `cutoff` ; retourne le nombre archivé."""
+        db = self._get_database()
+        hot, archive = db.conversations, db[ARCHIVE_COLLECTION]
+        started_at = datetime.utcnow()
+        old = {'metadata.updated_at': {'$lt': cutoff}}
+        batch = await hot.find(old).sort('metadata.updated_at', ASCENDING).limit(self.batch_size).to_list(self.batch_size)
+        if not batch:
+            return 0
+
+        ids = [c['_id'] for c in batch]
+        buckets: Dict[Any, List[Dict[str, Any]]] = {}
+        async for bucket in db[BUCKET_COLLECTION].find({'conversation_id': {'$in': ids}}):
+            buckets.setdefault(bucket['conversation_id'], []).append(bucket)
+
+        now = datetime.utcnow()
+        packed = [pack_conversation(c, now, buckets.get(c['_id'])) for c in batch]
+        # Copie déjà présente (lot interrompu avant la suppression) : sans conséquence
+        await _ignore_duplicates(archive.insert_many(packed, ordered=False))
+
+        await hot.delete_many({'_id': {'$in': ids}, **old})
+        # Une conversation mise à jour entre la lecture et la suppression (ex. append_message)
+        # reste dans la collection chaude avec ses paquets : sa copie archivée, périmée, est retirée
+        kept = [c['_id'] async for c in hot.find({'_id': {'$in': ids}}, {'_id': 1})]
+        if kept:
+            await archive.delete_many({'_id': {'$in': kept}})
+        archived = [i for i in ids if i not in set(kept)]
+        bucket_ids = [b['_id'] for i in archived for b in buckets.get(i, [])]
+        if bucket_ids:
+            # Seuls les paquets copiés dans l'archive sont supprimés ; une conversation restaurée
+            # entre-temps (append_message) a marqué les siens `restored_at` : ils restent
+            await db[BUCKET_COLLECTION].delete_many({
+                '_id': {'$in': bucket_ids},
+                '$or': [{'restored_at': {'$exists': False}}, {'restored_at': {'$lt': started_at}}],
+            })
+        return len(archived)
+
+    async def archive_turns_batch(self, cutoff: datetime) -> int:
+        """Déplace au plus `batch_size` échanges du chatbot antérieurs à `cutoff` (immuables : pas de course)."""
+        db = self._get_database()
+        turns = db[CHAT_TURNS_COLLECTION]
+        old = {'timestamp': {'$lt': cutoff}}
+        batch = await turns.find(old).sort('timestamp', ASCENDING).limit(self.batch_size).to_list(self.batch_size)
+        if not batch:
+            return 0
+        now = datetime.utcnow()
+        await _ignore_duplicates(
+            db[CHAT_TURNS_ARCHIVE_COLLECTION].insert_many([pack_turn(t, now) for t in batch], ordered=False)
+        )
+        await turns.delete_many({'_id': {'$in': [t['_id'] for t in batch]}})
+        return len(batch)
+
+    async def run_once(self) -> int:
+        """Un passage complet (borné à `max_batches` lots, espacés de `batch_pause`)."""
+        cutoff = archive_boundary(self.after_days)
+        total = await self._run_batches(self.archive_batch, cutoff)
+        turns = await self._run_batches(self.archive_turns_batch, cutoff)
+        self._stats["runs"] += 1
+        self._stats["archived"] += total
+        self._stats["turns_archived"] += turns
+        self._stats["last_run"] = datetime.utcnow().isoformat()
+        if total or turns:
+            logger.info(
+                f"{total} conversation(s) et {turns} échange(s) du chatbot archivé(s) "
+                f"(antérieurs au {cutoff.isoformat()})"
+            )
+        return total
+
+    async def _run_batches(self, archive_batch, cutoff: datetime) -> int:
+        total = 0
+        for batch_number in range(self.max_batches):
+            archived = await archive_batch(cutoff)
+            total += archived
+            if archived < self.batch_size:
+                break
+            # Limiter la charge imposée au primaire
+            await asyncio.sleep(self.batch_pause)
+        return total
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+                self._stats["last_error"] = None
+            except Exception as e:
+                self._stats["last_error"] = str(e)
+                logger.error(f"Erreur d'archivage des conversations: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "running": self._task is not None}
+
+
+# Instance singleton
+conversation_archiver = ConversationArchiver()
@@ -0,0 +1,141 @@
+"""
+Contexte de conversation du chatbot, gardé en mémoire par utilisateur.
+
+Chaque utilisateur actif a un tampon circulaire de ses `window` derniers échanges
+(message + réponses du bot). Le tampon est rempli depuis MongoDB au premier
+message (ou après éviction), puis complété à chaque échange : le contexte
+envoyé à Rasa ne coûte pas de requête par message.
+
+Avec plusieurs workers, les messages d'un même utilisateur peuvent être servis
+par des workers différents : chaque tampon est donc rechargé depuis MongoDB
+quand son dernier chargement date de plus de `ttl` secondes (0 : à chaque
+message). Le contexte d'un worker a au plus `ttl` secondes de retard.
+
+Les utilisateurs inactifs sont évincés (LRU) au-delà de `max_users` ou quand la
+taille estimée de tous les tampons dépasse `max_bytes`.
+"""
+from collections import OrderedDict, deque
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List
+
+from app.config import CONTEXT_WINDOW, CONTEXT_MAX_USERS, CONTEXT_MAX_BYTES, CONTEXT_TTL
+from app.utils.cache import SingleFlight
+
+Turn = Dict[str, Any]
+# loader(user_id, limit) : dernières conversations sauvegardées, de la plus ancienne à la plus récente
+TurnLoader = Callable[[str, int], Awaitable[List[Dict[str, Any]]]]
+
+# Surcoût mémoire approximatif d'un échange (dict, deque, timestamp), en octets
+TURN_OVERHEAD = 256
+
+
+def make_turn(message: str, response: List[Dict[str, Any]], timestamp: Any = None) -> Turn:
+    """Échange au format du contexte (identique pour une conversation sauvegardée ou en cours)"""
+    timestamp = timestamp or datetime.utcnow()
+    return {
+        "user": message,
+        "bot": [msg["text"] for msg in response or [] if msg.get("text")],
+        "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+    }
+
+
+def _turn_size(turn: Turn) -> int:
+    return TURN_OVERHEAD + len(turn["user"].encode()) + sum(len(text.encode()) for text in turn["bot"])
+
+
+class ConversationContextCache:
+    """Tampons circulaires par utilisateur, rechargés après `ttl`, LRU sur les utilisateurs, plafond mémoire global"""
+
+    def __init__(
+        self,
+        window: int = CONTEXT_WINDOW,
+        max_users: int = CONTEXT_MAX_USERS,
+        max_bytes: int = CONTEXT_MAX_BYTES,
+        ttl: float = CONTEXT_TTL,
+    ):
+        self.window = window
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._buffers: "OrderedDict[str, Deque[Turn]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        # Date (monotonic) du dernier chargement depuis MongoDB
+        self._loaded_at: Dict[str, float] = {}
+        self._bytes = 0
+        self._flight = SingleFlight()
+        self._stats = {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0}
+
+    async def get(self, user_id: str, loader: TurnLoader) -> List[Turn]:
+        """Derniers échanges de l'utilisateur (du plus ancien au plus récent)"""
+        buffer = self._buffers.get(user_id)
+        if buffer is not None and time.monotonic() - self._loaded_at[user_id] < self.ttl:
+            self._buffers.move_to_end(user_id)
+            self._stats["hits"] += 1
+            return list(buffer)
+        if buffer is not None:
+            # Échanges servis par d'autres workers depuis le chargement : relire MongoDB
+            self._stats["expirations"] += 1
+            self.invalidate(user_id)
+        self._stats["misses"] += 1
+        return await self._flight.do(user_id, lambda: self._load(user_id, loader))
+
+    async def _load(self, user_id: str, loader: TurnLoader) -> List[Turn]:
+        documents = await loader(user_id, self.window)
+        # Un tampon créé pendant le chargement est plus récent que ce qui vient de MongoDB
+        existing = self._buffers.get(user_id)
+        if existing is not None:
+            return list(existing)
+        buffer = deque(
+            (make_turn(d.get("message", ""), d.get("response"), d.get("timestamp")) for d in documents),
+            maxlen=self.window,
+        )
+        self._store(user_id, buffer)
+        return list(buffer)
+
+    def append(self, user_id: str, message: str, response: List[Dict[str, Any]]):
+        """Ajoute un échange terminé ; le plus ancien sort du tampon s'il est plein"""
+        buffer = self._buffers.get(user_id)
+        if buffer is None:
+            # Utilisateur évincé entre-temps : le prochain message rechargera depuis MongoDB
+            return
+        buffer.append(make_turn(message, response))
+        self._buffers.move_to_end(user_id)
+        self._resize(user_id)
+
+    def invalidate(self, user_id: str):
+        if self._buffers.pop(user_id, None) is not None:
+            self._bytes -= self._sizes.pop(user_id)
+            del self._loaded_at[user_id]
+
+    def _store(self, user_id: str, buffer: Deque[Turn]):
+        self._buffers[user_id] = buffer
+        self._sizes[user_id] = 0
+        self._loaded_at[user_id] = time.monotonic()
+        self._resize(user_id)
+
+    def _resize(self, user_id: str):
+        size = sum(_turn_size(turn) for turn in self._buffers[user_id])
+        self._bytes += size - self._sizes[user_id]
+        self._sizes[user_id] = size
+        while self._buffers and (len(self._buffers) > self.max_users or self._bytes > self.max_bytes):
+            evicted, _ = self._buffers.popitem(last=False)
+            self._bytes -= self._sizes.pop(evicted)
+            del self._loaded_at[evicted]
+            self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "users": len(self._buffers),
+            "bytes": self._bytes,
+            "max_users": self.max_users,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
+
+
+# Instance singleton
+conversation_context = ConversationContextCache()
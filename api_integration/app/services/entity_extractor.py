@@ -0,0 +1,230 @@
+"""
+Extraction d'entités par dictionnaires (produits, types de compte, types de transaction).
+
+Les expressions du fichier de dictionnaires sont compilées une fois en automate
+d'Aho-Corasick déterminisé, stocké dans des tableaux plats :
+- `classes`    : caractère -> classe (casse et accents latins repliés à la compilation) ;
+- `delta`      : array('I'), état suivant = delta[état * nb_classes + classe] ;
+- `out_start` / `out_ids` : expressions reconnues dans chaque état (liens de suffixe inclus).
+
+Un message est parcouru une seule fois, caractère par caractère, quel que soit
+le nombre d'expressions. Le fichier est rechargé à chaud quand il change.
+"""
+import logging
+import os
+import time
+import unicodedata
+from array import array
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from ..config import ENTITY_DICTIONARY_PATH, ENTITY_RELOAD_INTERVAL
+from ..utils.lazy import LazyResource
+
+logger = logging.getLogger(__name__)
+
+# Caractères latins (avec variantes accentuées) repliés sur leur lettre de base
+_FOLDED_RANGE = range(0x250)
+_QUOTES = {"’": "'", "‘": "'", "`": "'"}
+
+
+def fold(ch: str) -> str:
+    """Minuscule sans accent (latin) ; les autres écritures sont conservées"""
+    ch = _QUOTES.get(ch, ch).lower()
+    base = unicodedata.normalize("NFKD", ch)[:1]
+    return base if base.isascii() and base else ch
+
+
+class EntityAutomaton:
+    """Automate d'Aho-Corasick sur tableaux plats ; `entities[i]` = (entité, valeur)"""
+
+    def __init__(self, dictionaries: Dict[str, Dict[str, List[str]]]):
+        expressions: Dict[str, int] = {}
+        self.entities: List[Tuple[str, str]] = []
+        for entity, values in dictionaries.items():
+            for value, synonyms in values.items():
+                self.entities.append((entity, value))
+                for synonym in [value, *synonyms]:
+                    key = "".join(fold(c) for c in str(synonym).strip())
+                    if not key:
+                        continue
+                    previous = expressions.get(key)
+                    if previous is not None and previous != len(self.entities) - 1:
+                        logger.warning(f"Expression '{synonym}' déjà associée à {self.entities[previous]}")
+                    expressions[key] = len(self.entities) - 1
+
+        # Classes de caractères : 0 = caractère absent de toutes les expressions
+        class_of: Dict[str, int] = {}
+        for key in expressions:
+            for c in key:
+                class_of.setdefault(c, len(class_of) + 1)
+        self.n_classes = len(class_of) + 1
+        self.classes: Dict[str, int] = {}
+        for c in [*map(chr, _FOLDED_RANGE), *_QUOTES, *class_of]:
+            for variant in (c, c.upper()):
+                cls = class_of.get(fold(variant))
+                if cls:
+                    self.classes[variant] = cls
+
+        # Trie des expressions
+        goto: List[Dict[int, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        lengths = array("H")
+        pattern_entity = array("H")
+        for key, entity_index in expressions.items():
+            state = 0
+            for c in key:
+                cls = class_of[c]
+                if cls not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][cls] = len(goto) - 1
+                state = goto[state][cls]
+            outputs[state].append(len(lengths))
+            lengths.append(len(key))
+            pattern_entity.append(entity_index)
+
+        # Liens d'échec (parcours en largeur) puis déterminisation complète
+        n = self.n_classes
+        delta = array("I", bytes(4 * n * len(goto)))
+        fail = [0] * len(goto)
+        queue = deque()
+        for cls, child in goto[0].items():
+            delta[cls] = child
+            queue.append(child)
+        while queue:
+            state = queue.popleft()
+            outputs[state].extend(outputs[fail[state]])
+            for cls in range(n):
+                child = goto[state].get(cls)
+                if child is None:
+                    delta[state * n + cls] = delta[fail[state] * n + cls]
+                else:
+                    fail[child] = delta[fail[state] * n + cls]
+                    delta[state * n + cls] = child
+                    queue.append(child)
+
+        self.delta = delta
+        self.out_start = array("I", [0])
+        self.out_ids = array("H")
+        for state_outputs in outputs:
+            self.out_ids.extend(state_outputs)
+            self.out_start.append(len(self.out_ids))
+        self.lengths = lengths
+        self.pattern_entity = pattern_entity
+
+    @property
+    def n_states(self) -> int:
+        return len(self.out_start) - 1
+
+    @property
+    def n_patterns(self) -> int:
+        return len(self.lengths)
+
+    def find(self, text: str) -> List[Tuple[int, int, int]]:
+        """
+        (début, fin, index d'entité) des expressions trouvées en un seul passage,
+        limitées aux mots entiers ; en cas de chevauchement, la plus longue à gauche l'emporte.
+        """
+        classes, delta, n = self.classes, self.delta, self.n_classes
+        out_start, out_ids, lengths = self.out_start, self.out_ids, self.lengths
+        found = []
+        state = 0
+        for i, ch in enumerate(text):
+            state = delta[state * n + classes.get(ch, 0)]
+            k, end = out_start[state], out_start[state + 1]
+            while k < end:
+                pattern = out_ids[k]
+                start = i + 1 - lengths[pattern]
+                if (start == 0 or not text[start - 1].isalnum()) and (
+                    i + 1 == len(text) or not text[i + 1].isalnum()
+                ):
+                    found.append((start, i + 1, self.pattern_entity[pattern]))
+                k += 1
+        if len(found) < 2:
+            return found
+
+        found.sort(key=lambda m: (m[0], m[0] - m[1]))
+        kept, last_end = [], 0
+        for match in found:
+            if match[0] >= last_end:
+                kept.append(match)
+                last_end = match[1]
+        return kept
+
+
+class EntityExtractor:
+    """
+    Extracteur partagé : automate courant, rechargé à chaud si le fichier de
+    dictionnaires change (vérifié au plus toutes les `reload_interval` s).
+    En cas d'erreur de chargement, l'automate précédent reste en service.
+    """
+
+    def __init__(self, path: str = ENTITY_DICTIONARY_PATH, reload_interval: float = ENTITY_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.automaton: Optional[EntityAutomaton] = None
+        self._mtime = 0.0
+        self._checked_at = 0.0
+        self._stats = {"reloads": 0, "reload_errors": 0, "compile_ms": 0.0}
+        self.reload()
+
+    def reload(self) -> bool:
+        """Recompile l'automate depuis le fichier ; retourne False si le chargement échoue"""
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "r", encoding="utf-8") as f:
+                dictionaries = yaml.safe_load(f)["entities"]
+            start = time.perf_counter()
+            automaton = EntityAutomaton(dictionaries)
+            self._stats["compile_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        except Exception as e:
+            self._stats["reload_errors"] += 1
+            logger.error(f"Dictionnaires d'entités non rechargés ({self.path}) : {e}")
+            return False
+        # Remplacement en une affectation : les extractions en cours gardent l'ancien automate
+        self.automaton = automaton
+        self._mtime = mtime
+        self._stats["reloads"] += 1
+        logger.info(
+            f"Dictionnaires d'entités chargés : {automaton.n_patterns} expressions, {automaton.n_states} états"
+        )
+        return True
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            changed = os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return
+        if changed:
+            self.reload()
+
+    def extract(self, text: str) -> List[Dict[str, Any]]:
+        self._maybe_reload()
+        automaton = self.automaton
+        if automaton is None:
+            return []
+        entities = []
+        for start, end, index in automaton.find(text):
+            entity, value = automaton.entities[index]
+            entities.append({"entity": entity, "value": value, "text": text[start:end], "start": start, "end": end})
+        return entities
+
+    def stats(self) -> Dict[str, Any]:
+        automaton = self.automaton
+        return {
+            **self._stats,
+            "patterns": automaton.n_patterns if automaton else 0,
+            "states": automaton.n_states if automaton else 0,
+            "table_bytes": automaton.delta.itemsize * len(automaton.delta) if automaton else 0,
+        }
+
+
+# Instance singleton (automate compilé au premier usage ou au démarrage, voir app/startup.py)
+entity_extractor = LazyResource("entity_extractor", EntityExtractor)
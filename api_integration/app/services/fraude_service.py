@@ -41,7 +41,7 @@ class FraudeService:
         """
         try:
             processed_tx = self.preprocess(transaction)
-            result = fraude_model.evaluate_transaction(processed_tx)
+            result = fraude_model.get().evaluate_transaction(processed_tx)
             result = self.postprocess(result)
 
             # Logging structuré
@@ -0,0 +1,163 @@
+"""
+Sondes de santé exécutées en arrière-plan.
+
+Les dépendances (Elasticsearch, Keycloak, MongoDB, Rasa) sont vérifiées en
+parallèle toutes les `interval` secondes, chacune bornée par `timeout`. Les
+endpoints /health* ne font aucune E/S : ils lisent le dernier résultat.
+
+Prêt (readiness) = toutes les dépendances critiques répondaient au dernier
+passage, et ce passage date de moins de `stale_after` secondes.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from app.config import (
+    es_provider,
+    HEALTH_PROBE_INTERVAL,
+    HEALTH_PROBE_TIMEOUT,
+    HEALTH_CRITICAL_SERVICES,
+    KEYCLOAK_ISSUER,
+)
+from app.security.keycloak_client import keycloak_async_client
+from app.services.chatbot_service import chatbot_service
+from app.services.mongodb_client import mongo_client_factory
+
+logger = logging.getLogger(__name__)
+
+Check = Callable[[], Awaitable[bool]]
+
+
+class HealthProber:
+    """Résultats des sondes en cache, rafraîchis par une tâche de fond"""
+
+    def __init__(
+        self,
+        interval: float = HEALTH_PROBE_INTERVAL,
+        timeout: float = HEALTH_PROBE_TIMEOUT,
+        critical: Iterable[str] = HEALTH_CRITICAL_SERVICES,
+        stale_after: Optional[float] = None,
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self.critical = set(critical)
+        self.stale_after = stale_after or 3 * interval
+        self._checks: Dict[str, Check] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._probed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"runs": 0, "failures": 0}
+
+    def register(self, name: str, check: Check):
+        self._checks[name] = check
+
+    async def _probe(self, name: str, check: Check) -> Dict[str, Any]:
+        start = time.perf_counter()
+        error = None
+        try:
+            ok = bool(await asyncio.wait_for(check(), timeout=self.timeout))
+        except asyncio.TimeoutError:
+            ok, error = False, f"timeout ({self.timeout}s)"
+        except Exception as e:
+            ok, error = False, str(e) or type(e).__name__
+        if not ok:
+            self._stats["failures"] += 1
+            if self._results.get(name, {}).get("ok", True):
+                logger.warning(f"Sonde de santé '{name}' en échec : {error or 'réponse invalide'}")
+        return {
+            "ok": ok,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "checked_at": datetime.utcnow().isoformat(),
+            "error": error,
+        }
+
+    async def probe_once(self) -> Dict[str, Dict[str, Any]]:
+        """Exécute toutes les sondes en parallèle et remplace le résultat en cache"""
+        names = list(self._checks)
+        results = await asyncio.gather(*(self._probe(name, self._checks[name]) for name in names))
+        self._results = dict(zip(names, results))
+        self._probed_at = time.monotonic()
+        self._stats["runs"] += 1
+        return self._results
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.probe_once()
+            except Exception as e:
+                logger.error(f"Erreur des sondes de santé: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def stale(self) -> bool:
+        return self._probed_at is None or time.monotonic() - self._probed_at > self.stale_after
+
+    @property
+    def ready(self) -> bool:
+        if self.stale:
+            return False
+        return all(self._results.get(name, {}).get("ok", False) for name in self.critical if name in self._checks)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """État en cache (aucune E/S)"""
+        if self._probed_at is None:
+            status = "starting"
+        elif self.stale:
+            status = "stale"
+        else:
+            status = "ok" if all(r["ok"] for r in self._results.values()) else "degraded"
+        return {
+            "status": status,
+            "ready": self.ready,
+            "age_s": round(time.monotonic() - self._probed_at, 3) if self._probed_at is not None else None,
+            "services": self._results,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "running": self._task is not None, "ready": self.ready}
+
+
+# --- Sondes des dépendances de l'API
+
+async def check_elasticsearch() -> bool:
+    # Client ES synchrone : exécuté hors de la boucle d'événements. wait_for n'interrompt pas
+    # le thread ; le ping est donc borné lui-même, sinon les pings bloqués s'accumulent dans l'exécuteur
+    es = es_provider.get().options(request_timeout=health_prober.timeout, max_retries=0)
+    return await asyncio.to_thread(es.ping)
+
+
+async def check_keycloak() -> bool:
+    response = await keycloak_async_client.http.get(KEYCLOAK_ISSUER)
+    return response.status_code == 200
+
+
+async def check_mongodb() -> bool:
+    result = await mongo_client_factory.client.admin.command("ping")
+    return bool(result.get("ok"))
+
+
+async def check_rasa() -> bool:
+    return await chatbot_service.ping()
+
+
+# Instance singleton
+health_prober = HealthProber()
+health_prober.register("elasticsearch", check_elasticsearch)
+health_prober.register("keycloak", check_keycloak)
+health_prober.register("mongodb", check_mongodb)
+health_prober.register("rasa", check_rasa)
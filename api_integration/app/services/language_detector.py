@@ -0,0 +1,188 @@
+"""
+Détection de langue en mémoire par trigrammes de caractères (fr, ar, en, es, darija latin).
+
+Les profils sont calculés à partir des corpus de `language_corpus/` (un fichier
+`<langue>.txt` par langue, une phrase par ligne) par scripts/build_language_profiles.py,
+qui les écrit dans LANGUAGE_PROFILES_PATH ; l'application charge ce fichier sans
+réentraîner. Ils tiennent dans deux tableaux compacts :
+- `codes`   : array('Q'), code 48 bits de chaque trigramme connu (trié) ;
+- `weights` : array('B'), poids quantifiés sur 8 bits, `len(languages)` par trigramme.
+
+Un trigramme du message est cherché par dichotomie dans `codes` ; son indice donne
+ses poids dans `weights`. Aucune autre structure n'est construite au chargement.
+"""
+import json
+import logging
+import math
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..config import LANGUAGE_PROFILES_PATH
+from ..utils.lazy import LazyResource
+
+logger = logging.getLogger(__name__)
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "language_corpus")
+DEFAULT_LANGUAGE = "fr"
+
+# Seuls les premiers caractères d'un message sont scorés (coût borné)
+MAX_CHARS = 4096
+CODE_MASK = (1 << 48) - 1
+SPACE = 32
+# Fichier de profils : en-tête JSON d'une ligne, puis `codes` et `weights` (petit-boutiste)
+PROFILES_MAGIC = b"LANGPROFILES1\n"
+
+# Ponctuation et blancs ramenés à un espace ; les chiffres restent (3, 7, 9 : lettres en darija latin)
+_SEPARATORS = str.maketrans({c: " " for c in "\t\r\n!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~«»¿¡،؛؟…’‘“”"})
+
+
+def _normalize(text: str) -> str:
+    return text[:MAX_CHARS].lower().translate(_SEPARATORS)
+
+
+def trigram_codes(text: str) -> Iterator[int]:
+    """
+    Codes des trigrammes d'un texte normalisé (3 points de code de 16 bits).
+    Les espaces consécutifs sont fusionnés ; un espace borde le début et la fin.
+    """
+    code, prev = SPACE, SPACE
+    for ch in text:
+        c = ord(ch)
+        if c == SPACE and prev == SPACE:
+            continue
+        prev = c
+        code = ((code << 16) | c) & CODE_MASK
+        yield code
+    if prev != SPACE:
+        yield ((code << 16) | SPACE) & CODE_MASK
+
+
+class LanguageDetector:
+    """Classifieur bayésien naïf sur trigrammes, poids quantifiés dans des tableaux triés"""
+
+    def __init__(
+        self,
+        languages: Tuple[str, ...],
+        codes: array,
+        weights: array,
+        default: str = DEFAULT_LANGUAGE,
+    ):
+        self.languages = languages
+        self.codes = codes
+        self.weights = weights
+        self.default = default
+
+    @classmethod
+    def train(cls, samples: Dict[str, List[str]], alpha: float = 0.5, **kwargs) -> "LanguageDetector":
+        """
+        Calcule les profils : log-probabilités lissées (Laplace `alpha`) par langue,
+        ramenées sur 0..255 ; un trigramme absent d'une langue y reçoit le plancher de cette langue.
+        """
+        languages = tuple(sorted(samples))
+        counts = {
+            lang: Counter(code for line in lines for code in trigram_codes(_normalize(line)))
+            for lang, lines in samples.items()
+        }
+        vocabulary = sorted(set().union(*counts.values()))
+        totals = {lang: sum(counts[lang].values()) + alpha * len(vocabulary) for lang in languages}
+        log_probs = [
+            [math.log((counts[lang][code] + alpha) / totals[lang]) for lang in languages]
+            for code in vocabulary
+        ]
+
+        low = min(min(row) for row in log_probs)
+        high = max(max(row) for row in log_probs)
+        scale = 255 / (high - low) if high > low else 0
+        weights = array("B", (round((p - low) * scale) for row in log_probs for p in row))
+        return cls(languages, array("Q", vocabulary), weights, **kwargs)
+
+    @classmethod
+    def from_corpus(cls, directory: str = CORPUS_DIR, **kwargs) -> "LanguageDetector":
+        samples = {}
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(".txt"):
+                with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                    samples[filename[:-4]] = [line.strip() for line in f if line.strip()]
+        return cls.train(samples, **kwargs)
+
+    def save(self, path: str) -> None:
+        """Écrit les profils (voir scripts/build_language_profiles.py)"""
+        codes, weights = array("Q", self.codes), self.weights
+        if sys.byteorder == "big":
+            codes.byteswap()
+        header = json.dumps({"languages": list(self.languages), "trigrams": len(codes)})
+        with open(path, "wb") as f:
+            f.write(PROFILES_MAGIC + header.encode("utf-8") + b"\n")
+            f.write(codes.tobytes())
+            f.write(weights.tobytes())
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "LanguageDetector":
+        """Relit des profils écrits par `save` ; ValueError si le fichier est invalide"""
+        with open(path, "rb") as f:
+            if f.read(len(PROFILES_MAGIC)) != PROFILES_MAGIC:
+                raise ValueError(f"{path} : fichier de profils de langue invalide")
+            header = json.loads(f.readline())
+            languages, size = tuple(header["languages"]), header["trigrams"]
+            codes, weights = array("Q"), array("B")
+            codes.frombytes(f.read(size * codes.itemsize))
+            weights.frombytes(f.read(size * len(languages)))
+        if len(codes) != size or len(weights) != size * len(languages):
+            raise ValueError(f"{path} : fichier de profils de langue tronqué")
+        if sys.byteorder == "big":
+            codes.byteswap()
+        return cls(languages, codes, weights, **kwargs)
+
+    def _score(self, text: str) -> Tuple[List[int], int]:
+        """Somme des poids par langue et nombre de trigrammes connus du message"""
+        codes, weights, n = self.codes, self.weights, len(self.languages)
+        size = len(codes)
+        totals, hits = [0] * n, 0
+        for code in trigram_codes(_normalize(text)):
+            i = bisect_left(codes, code)
+            if i < size and codes[i] == code:
+                row = weights[i * n:(i + 1) * n]
+                for lane in range(n):
+                    totals[lane] += row[lane]
+                hits += 1
+        return totals, hits
+
+    def detect(self, text: str) -> str:
+        """Langue la plus probable ; langue par défaut si aucun trigramme n'est connu"""
+        totals, hits = self._score(text)
+        if not hits:
+            return self.default
+        best, best_score = self.default, -1
+        for lang, score in zip(self.languages, totals):
+            if score > best_score:
+                best, best_score = lang, score
+        return best
+
+    def scores(self, text: str) -> Optional[Dict[str, float]]:
+        """Score moyen par trigramme et par langue (0..255), None si aucun trigramme n'est connu"""
+        totals, hits = self._score(text)
+        if not hits:
+            return None
+        return {lang: round(score / hits, 2) for lang, score in zip(self.languages, totals)}
+
+
+def load_language_detector(path: str = LANGUAGE_PROFILES_PATH) -> LanguageDetector:
+    """Profils précalculés ; à défaut (fichier absent), entraînement sur les corpus"""
+    if os.path.exists(path):
+        detector = LanguageDetector.load(path)
+    else:
+        logger.warning(f"{path} introuvable : profils de langue calculés depuis {CORPUS_DIR}")
+        detector = LanguageDetector.from_corpus()
+    logger.info(
+        f"Profils de langue chargés : {', '.join(detector.languages)} "
+        f"({len(detector.codes)} trigrammes)"
+    )
+    return detector
+
+
+# Instance singleton (profils chargés au premier usage ou au démarrage, voir app/startup.py)
+language_detector = LazyResource("language_detector", load_language_detector)
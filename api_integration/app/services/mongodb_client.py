@@ -0,0 +1,186 @@
+"""
+Client MongoDB partagé par tout le worker.
+
+MongoDBService et MongoDBAuthManager utilisaient chacun leur AsyncIOMotorClient,
+soit deux pools de sockets, deux threads de monitoring et deux flux de heartbeats
+par worker. Ils passent désormais par une fabrique unique : un seul client,
+pool dimensionné, compression réseau et timeouts de sélection de serveur configurés.
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import quote_plus
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+
+from app.config import (
+    MONGODB_HOST,
+    MONGODB_PORT,
+    MONGODB_DATABASE,
+    MONGODB_AUTH_SOURCE,
+    MONGODB_USERNAME,
+    MONGODB_PASSWORD,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_COMPRESSORS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Compteurs du pool de connexions (événements émis par les threads pymongo)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checkout_failures = 0
+        self.in_use = 0
+        self.pool_cleared = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checked_out += 1
+            self.in_use += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "open": self.created - self.closed,
+                "in_use": self.in_use,
+                "created": self.created,
+                "closed": self.closed,
+                "checked_out": self.checked_out,
+                "checkout_failures": self.checkout_failures,
+                "pool_cleared": self.pool_cleared,
+            }
+
+
+def _default_uri() -> str:
+    """URI construite depuis les variables MONGODB_* (identifiants échappés)"""
+    credentials = ""
+    if MONGODB_USERNAME:
+        credentials = f"{quote_plus(MONGODB_USERNAME)}:{quote_plus(MONGODB_PASSWORD)}@"
+    return f"mongodb://{credentials}{MONGODB_HOST}:{MONGODB_PORT}/?authSource={MONGODB_AUTH_SOURCE}"
+
+
+class MongoClientFactory:
+    """
+    Fabrique paresseuse du client Motor partagé.
+    `uri` et `database` sont construits depuis app/config.py s'ils ne sont pas fournis.
+    """
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        database: Optional[str] = None,
+        max_pool_size: int = MONGO_MAX_POOL_SIZE,
+        min_pool_size: int = MONGO_MIN_POOL_SIZE,
+        max_idle_time_ms: int = MONGO_MAX_IDLE_TIME_MS,
+        wait_queue_timeout_ms: int = MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        server_selection_timeout_ms: int = MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connect_timeout_ms: int = MONGO_CONNECT_TIMEOUT_MS,
+        compressors: str = MONGO_COMPRESSORS,
+    ):
+        self._uri = uri
+        self._database = database or MONGODB_DATABASE
+        self.options: Dict[str, Any] = {
+            "maxPoolSize": max_pool_size,
+            "minPoolSize": min_pool_size,
+            "maxIdleTimeMS": max_idle_time_ms,
+            "waitQueueTimeoutMS": wait_queue_timeout_ms,
+            "serverSelectionTimeoutMS": server_selection_timeout_ms,
+            "connectTimeoutMS": connect_timeout_ms,
+            "compressors": compressors,
+            "retryWrites": True,
+        }
+        self.listener = PoolStatsListener()
+        self._client: Optional[AsyncIOMotorClient] = None
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        if self._client is None:
+            self._client = AsyncIOMotorClient(
+                self._uri or _default_uri(),
+                event_listeners=[self.listener],
+                **self.options,
+            )
+        return self._client
+
+    def get_database(self, name: Optional[str] = None, **kwargs) -> AsyncIOMotorDatabase:
+        """Base `name` (par défaut celle de la configuration) ; kwargs : write_concern, etc."""
+        return self.client.get_database(name or self._database, **kwargs)
+
+    async def warm_up(self) -> int:
+        """
+        Ouvre `minPoolSize` connexions au démarrage pour que les premières
+        requêtes ne paient pas l'établissement TCP + authentification.
+        Retourne le nombre de connexions ouvertes.
+        """
+        admin = self.client.admin
+        await admin.command('ping')
+        count = max(1, self.options["minPoolSize"])
+        # Des pings concurrents forcent l'ouverture d'autant de connexions
+        await asyncio.gather(*(admin.command('ping') for _ in range(count)))
+        return self.listener.stats()["open"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self._client is not None,
+            "compressors": self.options["compressors"],
+            "max_pool_size": self.options["maxPoolSize"],
+            "min_pool_size": self.options["minPoolSize"],
+            **self.listener.stats(),
+        }
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+# Instance singleton
+mongo_client_factory = MongoClientFactory()
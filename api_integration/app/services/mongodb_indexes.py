@@ -0,0 +1,129 @@
+"""Index MongoDB requis par les requêtes de l'API, créés au démarrage"""
+import logging
+from typing import Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Index par collection, nommés pour que la migration soit idempotente
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        # get_user / create_user (unicité garantie par la base)
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        # validate_user_access : {username, access_token}
+        IndexModel([("username", ASCENDING), ("access_token", ASCENDING)], name="username_access_token"),
+    ],
+    "conversations": [
+        # get_user_conversations : filtre user_id, tri (metadata.updated_at, _id) décroissant (pagination par clé)
+        IndexModel(
+            [("user_id", ASCENDING), ("metadata.updated_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_id_updated_at",
+        ),
+        # conversation_archiver : sélection des conversations à archiver
+        IndexModel([("metadata.updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "chat_turns": [
+        # recent_turns (contexte du chatbot) : derniers échanges d'un utilisateur
+        IndexModel([("user_id", ASCENDING), ("_id", DESCENDING)], name="user_id_recent"),
+        # conversation_archiver : sélection des échanges à archiver
+        IndexModel([("timestamp", ASCENDING)], name="timestamp"),
+    ],
+    "conversations_archive": [
+        # Lecture de l'historique archivé, même ordre que la collection chaude
+        IndexModel(
+            [("user_id", ASCENDING), ("metadata.updated_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_id_updated_at",
+        ),
+    ],
+    "conversation_buckets": [
+        # append_message (upsert du paquet) et get_latest_messages (derniers paquets)
+        IndexModel([("conversation_id", ASCENDING), ("bucket", DESCENDING)], name="conversation_bucket_unique", unique=True),
+    ],
+}
+
+
+# Champs de index_information() qui ne sont pas des options de création
+_INFO_ONLY_FIELDS = ("key", "v", "ns")
+
+
+def _same_index(info: dict, spec: dict) -> bool:
+    return (
+        list(info["key"]) == list(spec["key"].items())
+        and bool(info.get("unique", False)) == bool(spec.get("unique", False))
+    )
+
+
+def _restore_model(name: str, info: dict) -> IndexModel:
+    options = {k: v for k, v in info.items() if k not in _INFO_ONLY_FIELDS}
+    return IndexModel(list(info["key"]), name=name, **options)
+
+
+async def _has_duplicates(collection, spec: dict) -> bool:
+    """Des documents partagent-ils les clés d'un index unique (absence = null, comme pour l'index) ?"""
+    group_id = {f"k{i}": f"${field}" for i, field in enumerate(spec["key"])}
+    pipeline = [
+        {"$group": {"_id": group_id, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": 1},
+    ]
+    return bool(await collection.aggregate(pipeline, allowDiskUse=True).to_list(length=1))
+
+
+async def ensure_indexes(db, indexes: Dict[str, List[IndexModel]] = INDEXES) -> List[str]:
+    """
+    Crée les index manquants ; un index portant les mêmes clés sous un autre nom
+    ou avec d'autres options est remplacé. Retourne les noms des index créés.
+
+    MongoDB refuse deux index sur les mêmes clés : l'ancien doit être supprimé
+    avant de créer le nouveau. Pour ne jamais rester sans index, un index unique
+    n'est reconstruit que si la collection ne contient pas de doublons, et si la
+    création échoue malgré tout, les index supprimés sont recréés. Les erreurs
+    sont journalisées sans interrompre le démarrage.
+    """
+    created = []
+    for collection_name, models in indexes.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        for model in models:
+            spec = model.document
+            name = spec["name"]
+            current = existing.get(name)
+            if current is not None and _same_index(current, spec):
+                continue
+            # Ancienne version à remplacer (même nom ou mêmes clés)
+            replaced = {
+                other_name: info for other_name, info in existing.items()
+                if other_name != "_id_"
+                and (other_name == name or list(info["key"]) == list(spec["key"].items()))
+            }
+            try:
+                if replaced and spec.get("unique") and await _has_duplicates(collection, spec):
+                    logger.error(
+                        f"Index unique {collection_name}.{name} non créé : doublons présents, "
+                        f"index existant(s) {sorted(replaced)} conservé(s)"
+                    )
+                    continue
+                for other_name in replaced:
+                    await collection.drop_index(other_name)
+            except OperationFailure as e:
+                logger.error(f"Impossible de préparer l'index {collection_name}.{name} : {e}")
+                continue
+            try:
+                await collection.create_indexes([model])
+                created.append(name)
+                logger.info(f"Index {collection_name}.{name} créé")
+            except OperationFailure as e:
+                logger.error(f"Impossible de créer l'index {collection_name}.{name} : {e}")
+                await _restore(collection, collection_name, replaced)
+    return created
+
+
+async def _restore(collection, collection_name: str, dropped: Dict[str, dict]):
+    """Recrée les index supprimés pour un remplacement qui a échoué"""
+    for other_name, info in dropped.items():
+        try:
+            await collection.create_indexes([_restore_model(other_name, info)])
+            logger.warning(f"Index {collection_name}.{other_name} restauré")
+        except OperationFailure as e:
+            logger.critical(f"Index {collection_name}.{other_name} supprimé et non restauré : {e}")
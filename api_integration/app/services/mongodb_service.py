@@ -1,36 +1,157 @@
 """Service MongoDB pour la gestion des utilisateurs et des conversations"""
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from datetime import datetime
-from app.config.mongodb_config import get_mongodb_config
+import base64
+import binascii
+from bson import ObjectId, json_util
+from pymongo import DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.config import ARCHIVE_ENABLED, CONVERSATION_BUCKET_SIZE
+from app.auth.principal_cache import principal_cache
+from app.services.user_cache import user_existence_cache
+from app.services.mongodb_indexes import ensure_indexes
+from app.services.mongodb_client import mongo_client_factory
+from app.services.conversation_archiver import (
+    ARCHIVE_COLLECTION,
+    archive_boundary,
+    restore_conversation,
+    unpack_buckets,
+    unpack_conversation,
+)
+
+# Ordre de l'historique : plus récent d'abord, _id départage les dates égales
+CONVERSATION_SORT = [('metadata.updated_at', DESCENDING), ('_id', DESCENDING)]
+
+# Projections par vue : `summary` ne renvoie que le dernier message.
+# Les messages sont dans conversation_buckets ; `messages` n'existe plus que sur les
+# conversations créées avant les paquets (lu puis complété par _combine_messages)
+CONVERSATION_VIEWS = {
+    'full': None,
+    'summary': {'messages': {'$slice': -1}},
+}
+
+
+def make_buckets(conversation_id: Any, messages: List[Dict[str, Any]], created_at: datetime,
+                 first_seq: int = 0) -> List[Dict[str, Any]]:
+    """Paquets de CONVERSATION_BUCKET_SIZE messages numérotés à partir de `first_seq` (format d'append_message)"""
+    buckets: Dict[int, Dict[str, Any]] = {}
+    for seq, message in enumerate(messages, start=first_seq):
+        bucket = buckets.setdefault(seq // CONVERSATION_BUCKET_SIZE, {
+            'conversation_id': conversation_id,
+            'bucket': seq // CONVERSATION_BUCKET_SIZE,
+            'messages': [],
+            'count': 0,
+            'created_at': created_at,
+        })
+        bucket['messages'].append({**message, 'seq': seq})
+        bucket['count'] += 1
+    return list(buckets.values())
+
+
+def _combine_messages(conversation: Dict[str, Any], buckets: List[Dict[str, Any]], view: str) -> Dict[str, Any]:
+    """Messages intégrés (anciennes conversations) suivis de ceux des paquets ; `summary` : le dernier"""
+    bucketed = sorted((m for b in buckets for m in b['messages']), key=lambda m: m['seq'])
+    messages = conversation.get('messages', []) + bucketed
+    conversation['messages'] = messages[-1:] if view == 'summary' else messages
+    return conversation
+
+
+def conversation_key(conversation_id: str) -> Any:
+    """_id MongoDB d'une conversation à partir de son identifiant texte"""
+    return ObjectId(conversation_id) if ObjectId.is_valid(conversation_id) else conversation_id
+
+
+def encode_cursor(conversation: Dict[str, Any]) -> str:
+    """Jeton de continuation opaque : position (updated_at, _id) du dernier document renvoyé"""
+    position = [conversation['metadata']['updated_at'], conversation['_id']]
+    return base64.urlsafe_b64encode(json_util.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """Décode un jeton de continuation ; lève ValueError s'il est invalide"""
+    try:
+        updated_at, conversation_id = json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f"Curseur invalide : {e}")
+    return updated_at, conversation_id
+
+
+def _after_cursor(cursor: str) -> Dict[str, Any]:
+    updated_at, conversation_id = decode_cursor(cursor)
+    return {'$or': [
+        {'metadata.updated_at': {'$lt': updated_at}},
+        {'metadata.updated_at': updated_at, '_id': {'$lt': conversation_id}},
+    ]}
+
+
+def _sort_key(conversation: Dict[str, Any]) -> Tuple[Any, Any]:
+    return conversation['metadata']['updated_at'], conversation['_id']
+
+
+async def _merge_tiers(hot, open_archive, boundary: datetime) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Fusionne deux flux triés par (updated_at, _id) décroissant : collection chaude puis archive.
+    L'archive n'est interrogée qu'une fois l'historique chaud arrivé avant `boundary`
+    (aucune conversation archivée n'est plus récente) ou épuisé, et jamais si `open_archive` est None.
+    """
+    if open_archive is None:
+        async for conversation in hot:
+            yield conversation
+        return
+
+    archived = None
+    archived_head = None
+
+    async def next_archived():
+        try:
+            return await archived.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    async for conversation in hot:
+        key = _sort_key(conversation)
+        if archived is None and conversation['metadata']['updated_at'] < boundary:
+            archived = open_archive().__aiter__()
+            archived_head = await next_archived()
+        while archived_head is not None and _sort_key(archived_head) >= key:
+            # Même clé : copie laissée par un lot d'archivage interrompu
+            if _sort_key(archived_head) > key:
+                yield archived_head
+            archived_head = await next_archived()
+        yield conversation
+
+    if archived is None:
+        archived = open_archive().__aiter__()
+        archived_head = await next_archived()
+    while archived_head is not None:
+        yield archived_head
+        archived_head = await next_archived()
+
 
 class MongoDBService:
     def __init__(self):
         self.client: Optional[AsyncIOMotorClient] = None
         self.db: Optional[AsyncIOMotorDatabase] = None
+        # Archive non vide alors que l'archivage est désactivé (vérifié une fois par processus)
+        self._archive_found: Optional[bool] = None
 
     async def connect(self):
-        """Établit la connexion à MongoDB"""
+        """Établit la connexion à MongoDB via le client partagé"""
         if self.client is None:
-            config = get_mongodb_config()
-            mongodb = config['mongodb']
-            
-            # Construire l'URI de connexion
-            uri = f"mongodb://{mongodb['auth']['credentials']['username']}:{mongodb['auth']['credentials']['password']}@{mongodb['connection']['host']}:{mongodb['connection']['port']}/?authSource=admin"
-            
-            # Créer le client
-            self.client = AsyncIOMotorClient(uri)
-            self.db = self.client[mongodb['connection']['database']]
+            self.client = mongo_client_factory.client
+            self.db = mongo_client_factory.get_database()
             
             # Vérifier la connexion
             await self.client.admin.command('ping')
 
+            # Créer / migrer les index requis par les requêtes du service
+            await ensure_indexes(self.db)
+
     async def close(self):
-        """Ferme la connexion à MongoDB"""
-        if self.client is not None:
-            self.client.close()
-            self.client = None
-            self.db = None
+        """Libère les références au client (fermé par mongo_client_factory.close())"""
+        self.client = None
+        self.db = None
 
     async def get_user(self, username: str) -> Optional[Dict[str, Any]]:
         """Récupère un utilisateur par son nom d'utilisateur"""
@@ -38,8 +159,21 @@ class MongoDBService:
             await self.connect()
         return await self.db.users.find_one({'username': username})
 
-    async def create_user(self, user_data: Dict[str, Any]) -> str:
-        """Crée un nouvel utilisateur"""
+    async def _user_in_db(self, username: str) -> bool:
+        if self.db is None:
+            await self.connect()
+        return await self.db.users.find_one({'username': username}, {'_id': 1}) is not None
+
+    async def user_exists(self, username: str) -> bool:
+        """Indique si l'utilisateur existe (cache en lecture, voir user_cache)"""
+        return await user_existence_cache.exists(username, self._user_in_db)
+
+    async def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Crée un nouvel utilisateur en un seul aller-retour et retourne le document construit.
+        L'unicité du username est garantie par l'index `username_unique` :
+        lève pymongo.errors.DuplicateKeyError si l'utilisateur existe déjà.
+        """
         if self.db is None:
             await self.connect()
         
@@ -48,10 +182,36 @@ class MongoDBService:
         user_data['updated_at'] = user_data['created_at']
         
         result = await self.db.users.insert_one(user_data)
-        return str(result.inserted_id)
+        user_existence_cache.mark_created(user_data['username'])
+        user_data['id'] = str(result.inserted_id)
+        return user_data
+
+    async def update_user(self, username: str, update_data: Dict[str, Any]) -> bool:
+        """Met à jour un utilisateur et invalide son entrée dans le cache d'authentification"""
+        if self.db is None:
+            await self.connect()
+
+        update_data['updated_at'] = datetime.utcnow()
+        result = await self.db.users.update_one({'username': username}, {'$set': update_data})
+        principal_cache.invalidate_user(username)
+        return result.modified_count > 0
+
+    async def delete_user(self, username: str) -> bool:
+        """Supprime un utilisateur et invalide son entrée dans le cache d'authentification"""
+        if self.db is None:
+            await self.connect()
+
+        result = await self.db.users.delete_one({'username': username})
+        principal_cache.invalidate_user(username)
+        user_existence_cache.invalidate(username)
+        return result.deleted_count > 0
 
     async def save_conversation(self, conversation: Dict[str, Any]) -> str:
-        """Sauvegarde une nouvelle conversation"""
+        """
+        Sauvegarde une nouvelle conversation.
+        Ses messages initiaux vont dans conversation_buckets (seq 0..n-1) et `message_count`
+        est initialisé : append_message continue la numérotation au même endroit.
+        """
         if self.db is None:
             await self.connect()
         
@@ -63,23 +223,148 @@ class MongoDBService:
         if 'created_at' not in conversation['metadata']:
             conversation['metadata']['created_at'] = now
         conversation['metadata']['updated_at'] = now
+
+        messages = conversation.pop('messages', None) or []
+        conversation.setdefault('_id', ObjectId())
+        conversation['message_count'] = len(messages)
+        if messages:
+            # Paquets d'abord : la conversation n'est visible qu'une fois ses messages écrits
+            await self.db.conversation_buckets.insert_many(make_buckets(conversation['_id'], messages, now))
         
         result = await self.db.conversations.insert_one(conversation)
         return str(result.inserted_id)
 
+    def _conversations_query(self, user_id: str, cursor: Optional[str]) -> Dict[str, Any]:
+        # Seules les conversations de ce service ont metadata.updated_at (clé de tri et de curseur) :
+        # un échange du chatbot resté dans la collection (voir scripts/migrate_chat_turns.py) est ignoré
+        query: Dict[str, Any] = {'user_id': user_id, 'metadata.updated_at': {'$exists': True}}
+        if cursor:
+            query.update(_after_cursor(cursor))
+        return query
+
+    async def _archived_conversations(self, query: Dict[str, Any], view: str, limit: Optional[int]):
+        archived = self.db[ARCHIVE_COLLECTION].find(query).sort(CONVERSATION_SORT)
+        if limit:
+            archived = archived.limit(limit)
+        async for document in archived:
+            yield _combine_messages(unpack_conversation(document, view), unpack_buckets(document), view)
+
+    async def _with_messages(self, conversations: List[Dict[str, Any]], view: str) -> List[Dict[str, Any]]:
+        """
+        Complète une série de conversations avec leurs messages en une requête sur les paquets :
+        tous les paquets pour `full`, seulement le dernier (bucket de message_count - 1) pour `summary`.
+        """
+        counted = [c for c in conversations if c.get('message_count')]
+        if not counted:
+            return conversations
+        if view == 'summary':
+            query = {'$or': [
+                {'conversation_id': c['_id'], 'bucket': (c['message_count'] - 1) // CONVERSATION_BUCKET_SIZE}
+                for c in counted
+            ]}
+        else:
+            query = {'conversation_id': {'$in': [c['_id'] for c in counted]}}
+        buckets: Dict[Any, List[Dict[str, Any]]] = {}
+        async for bucket in self.db.conversation_buckets.find(query, {'_id': 0, 'created_at': 0}):
+            buckets.setdefault(bucket['conversation_id'], []).append(bucket)
+        return [_combine_messages(c, buckets.get(c['_id'], []), view) for c in conversations]
+
+    async def _hot_conversations(self, cursor, view: str, batch_size: int) -> AsyncIterator[Dict[str, Any]]:
+        batch = []
+        async for conversation in cursor:
+            batch.append(conversation)
+            if len(batch) >= batch_size:
+                for complete in await self._with_messages(batch, view):
+                    yield complete
+                batch = []
+        for complete in await self._with_messages(batch, view):
+            yield complete
+
+    async def _archive_in_use(self) -> bool:
+        """
+        L'archive n'est lue que si l'archivage est actif, ou si elle contient des conversations
+        archivées avant sa désactivation (vérifié une fois par processus).
+        """
+        if ARCHIVE_ENABLED:
+            return True
+        if self._archive_found is None:
+            self._archive_found = await self.db[ARCHIVE_COLLECTION].find_one({}, {'_id': 1}) is not None
+        return self._archive_found
+
+    async def _iter_conversations(self, user_id: str, cursor: Optional[str], view: str, limit: Optional[int] = None,
+                                  batch_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """Historique chaud puis archivé (conversation_archiver), dans l'ordre de CONVERSATION_SORT"""
+        query = self._conversations_query(user_id, cursor)
+        hot = self.db.conversations.find(query, CONVERSATION_VIEWS[view]).sort(CONVERSATION_SORT)
+        hot = hot.limit(limit) if limit else hot.batch_size(batch_size)
+        hot = self._hot_conversations(hot, view, limit or batch_size)
+        open_archive = None
+        if await self._archive_in_use():
+            open_archive = lambda: self._archived_conversations(query, view, limit)
+        merged = _merge_tiers(hot, open_archive, archive_boundary())
+        try:
+            async for conversation in merged:
+                yield conversation
+        finally:
+            await merged.aclose()
+
     async def get_user_conversations(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Récupère les conversations d'un utilisateur"""
+        conversations, _ = await self.get_user_conversations_page(user_id, limit)
+        return conversations
+
+    async def get_user_conversations_page(
+        self,
+        user_id: str,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        view: str = 'full'
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Page de conversations (pagination par clé sur (metadata.updated_at, _id)),
+        conversations archivées comprises.
+        Retourne (conversations, curseur_suivant) ; curseur_suivant vaut None en fin d'historique.
+        """
         if self.db is None:
             await self.connect()
-        
-        cursor = self.db.conversations.find(
-            {'user_id': user_id}
-        ).sort('metadata.updated_at', -1).limit(limit)
-        
-        return [conversation async for conversation in cursor]
+
+        # Un document de plus pour savoir s'il reste une page
+        conversations = []
+        merged = self._iter_conversations(user_id, cursor, view, limit=limit + 1)
+        try:
+            async for conversation in merged:
+                conversations.append(conversation)
+                if len(conversations) > limit:
+                    break
+        finally:
+            await merged.aclose()
+        if len(conversations) > limit:
+            conversations = conversations[:limit]
+            return conversations, encode_cursor(conversations[-1])
+        return conversations, None
+
+    async def iter_user_conversations(
+        self,
+        user_id: str,
+        cursor: Optional[str] = None,
+        view: str = 'full',
+        batch_size: int = 100
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Parcourt les conversations (archivées comprises) au fil des curseurs Motor, sans tout charger en mémoire"""
+        if self.db is None:
+            await self.connect()
+
+        async for conversation in self._iter_conversations(user_id, cursor, view, batch_size=batch_size):
+            yield conversation
 
     async def update_conversation(self, conversation_id: str, update_data: Dict[str, Any]) -> bool:
-        """Met à jour une conversation existante"""
+        """
+        Met à jour les champs d'une conversation existante (hors messages).
+        Les messages passent par append_message : réécrire le tableau ferait
+        de nouveau grossir le document à chaque échange.
+        """
+        if 'messages' in update_data:
+            raise ValueError("Les messages s'ajoutent avec append_message, pas par update_conversation")
         if self.db is None:
             await self.connect()
         
@@ -94,5 +379,65 @@ class MongoDBService:
         )
         return result.modified_count > 0
 
+    async def append_message(self, conversation_id: str, message: Dict[str, Any]) -> Optional[int]:
+        """
+        Ajoute un message à une conversation sans réécrire le document.
+        Le numéro de séquence est alloué par `$inc` sur `message_count`, puis le message
+        est ajouté (`$push`) au paquet `seq // CONVERSATION_BUCKET_SIZE` de conversation_buckets.
+        Une conversation archivée est d'abord restaurée dans la collection chaude.
+        Retourne le numéro de séquence, ou None si la conversation n'existe pas.
+        """
+        if self.db is None:
+            await self.connect()
+
+        key = conversation_key(conversation_id)
+        now = datetime.utcnow()
+        for attempt in range(2):
+            conversation = await self.db.conversations.find_one_and_update(
+                {'_id': key},
+                {'$inc': {'message_count': 1}, '$set': {'metadata.updated_at': now}},
+                projection={'message_count': 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if conversation is not None or attempt or not await restore_conversation(self.db, key):
+                break
+        if conversation is None:
+            return None
+
+        seq = conversation['message_count'] - 1
+        bucket_filter = {'conversation_id': key, 'bucket': seq // CONVERSATION_BUCKET_SIZE}
+        bucket_update = {
+            '$push': {'messages': {**message, 'seq': seq}},
+            '$inc': {'count': 1},
+            '$setOnInsert': {'created_at': now},
+        }
+        try:
+            await self.db.conversation_buckets.update_one(bucket_filter, bucket_update, upsert=True)
+        except DuplicateKeyError:
+            # Deux upserts concurrents sur un nouveau paquet : le perdant réessaie en simple mise à jour
+            await self.db.conversation_buckets.update_one(bucket_filter, bucket_update)
+        return seq
+
+    async def get_latest_messages(self, conversation_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Récupère les `limit` derniers messages (ordre chronologique) en lisant uniquement les derniers paquets"""
+        if self.db is None:
+            await self.connect()
+
+        # Le paquet le plus récent peut être partiellement rempli : un paquet de plus suffit
+        buckets = -(-limit // CONVERSATION_BUCKET_SIZE) + 1
+        cursor = self.db.conversation_buckets.find(
+            {'conversation_id': conversation_key(conversation_id)},
+            {'messages': 1, '_id': 0}
+        ).sort('bucket', DESCENDING).limit(buckets)
+
+        messages = [message async for bucket in cursor for message in bucket['messages']]
+        if not messages:
+            # Conversation archivée : ses paquets sont stockés avec elle
+            archived = await self.db[ARCHIVE_COLLECTION].find_one({'_id': conversation_key(conversation_id)})
+            if archived is not None:
+                messages = [message for bucket in unpack_buckets(archived) for message in bucket['messages']]
+        messages.sort(key=lambda m: m['seq'])
+        return messages[-limit:]
+
 # Instance globale du service
 mongodb_service = MongoDBService()
\ No newline at end of file
@@ -0,0 +1,263 @@
+"""
+Couche de résilience pour les appels vers un backend répliqué (Rasa).
+
+- délai maximal par requête (deadline), file d'attente comprise ;
+- limite de concurrence (bulkhead) avec timeout d'attente : un backend lent
+  ne peut pas accumuler les requêtes jusqu'à épuiser le worker ;
+- disjoncteur par réplique, avec sondage en semi-ouverture ;
+- bascule vers la réplique suivante quand la première échoue ;
+- requête couverte (hedging, optionnelle) vers une seconde réplique si la
+  première n'a pas répondu après le p95 des latences observées.
+
+Attention : les répliques Rasa partagent le tracker de conversation et le
+webhook REST n'est pas idempotent. Une requête couverte arrive alors que la
+première est peut-être encore traitée : le tour peut être enregistré deux fois
+dans le tracker (et les actions exécutées deux fois). Le hedging est donc
+désactivé par défaut (RASA_HEDGE_ENABLED) ; à n'activer que si les répliques
+ont des trackers distincts ou si les doublons sont acceptables.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Aucune réplique disponible : disjoncteurs ouverts."""
+
+
+class BulkheadFullError(Exception):
+    """Trop de requêtes en attente vers le backend."""
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur : ouvert après `failure_threshold` échecs consécutifs,
+    semi-ouvert après `recovery_timeout` s (un seul appel de sonde à la fois),
+    refermé au premier succès de la sonde.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def try_acquire(self) -> bool:
+        """Indique si un appel peut partir ; en semi-ouverture, réserve l'unique sonde."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        self._probe_in_flight = False
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning("Disjoncteur ouvert")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def record_cancelled(self):
+        """Appel abandonné (requête couverte perdante) : ni succès ni échec."""
+        self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self._failures, "rejected": self.rejected}
+
+
+class Bulkhead:
+    """Limite de concurrence ; l'attente d'une place est bornée par `queue_timeout`."""
+
+    def __init__(self, max_concurrent: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.rejected = 0
+
+    async def __aenter__(self):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise BulkheadFullError("File d'attente du backend saturée")
+        self.active += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"active": self.active, "max_concurrent": self.max_concurrent, "rejected": self.rejected}
+
+
+class LatencyTracker:
+    """Fenêtre glissante des dernières latences réussies (secondes)."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class ResilientCaller:
+    """
+    Appelle `fn(replica)` sous deadline, bulkhead et disjoncteurs.
+    Si la première réplique échoue, la suivante disponible est sollicitée.
+    Si le hedging est actif, elle l'est aussi sans attendre l'échec, après
+    max(`hedge_min_delay`, p`hedge_percentile`) ; la première réponse gagne
+    (risque de tour dupliqué, voir l'en-tête du module).
+    """
+
+    def __init__(
+        self,
+        replicas: List[str],
+        deadline: float,
+        max_concurrent: int,
+        queue_timeout: float,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 10.0,
+        hedge: bool = False,
+        hedge_min_delay: float = 0.05,
+        hedge_percentile: float = 95,
+        hedge_min_samples: int = 20,
+    ):
+        self.replicas = list(replicas)
+        self.deadline = deadline
+        self.bulkhead = Bulkhead(max_concurrent, queue_timeout)
+        self.breakers = {r: CircuitBreaker(failure_threshold, recovery_timeout) for r in self.replicas}
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker()
+        self._stats = {"calls": 0, "deadline_exceeded": 0, "hedged": 0, "hedge_wins": 0}
+
+    def hedge_delay(self) -> float:
+        if len(self.latency) < self.hedge_min_samples:
+            return max(self.hedge_min_delay, self.deadline / 2)
+        return max(self.hedge_min_delay, self.latency.percentile(self.hedge_percentile))
+
+    async def call(self, fn: Callable[[str], Awaitable[Any]], deadline: Optional[float] = None) -> Any:
+        self._stats["calls"] += 1
+        try:
+            return await asyncio.wait_for(self._call(fn), timeout=deadline or self.deadline)
+        except asyncio.TimeoutError:
+            self._stats["deadline_exceeded"] += 1
+            raise
+
+    async def _call(self, fn: Callable[[str], Awaitable[Any]]) -> Any:
+        async with self.bulkhead:
+            return await self._hedged(fn)
+
+    def _next_replica(self, exclude: List[str]) -> Optional[str]:
+        for replica in self.replicas:
+            if replica not in exclude and self.breakers[replica].try_acquire():
+                return replica
+        return None
+
+    async def _attempt(self, fn: Callable[[str], Awaitable[Any]], replica: str) -> Any:
+        start = time.monotonic()
+        result = await fn(replica)
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    async def _hedged(self, fn: Callable[[str], Awaitable[Any]]) -> Any:
+        primary = self._next_replica([])
+        if primary is None:
+            raise CircuitOpenError("Aucune réplique disponible (disjoncteurs ouverts)")
+
+        pending: Dict[asyncio.Future, str] = {}
+
+        def launch(replica: str):
+            pending[asyncio.ensure_future(self._attempt(fn, replica))] = replica
+
+        def launch_secondary():
+            secondary = self._next_replica([primary])
+            if secondary is not None:
+                self._stats["hedged"] += 1
+                launch(secondary)
+
+        launch(primary)
+        failed_over = False
+        hedge_at = time.monotonic() + self.hedge_delay() if self.hedge and len(self.replicas) > 1 else None
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                timeout = None if hedge_at is None else max(0.0, hedge_at - time.monotonic())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Pas de réponse après le délai de couverture : solliciter une autre réplique
+                    hedge_at, failed_over = None, True
+                    launch_secondary()
+                    continue
+                for task in done:
+                    replica = pending.pop(task)
+                    if task.exception() is None:
+                        self.breakers[replica].record_success()
+                        if replica != primary:
+                            self._stats["hedge_wins"] += 1
+                        return task.result()
+                    self.breakers[replica].record_failure()
+                    last_error = task.exception()
+                if not pending and not failed_over:
+                    # Échec de la première réplique (avant un éventuel délai de couverture) : passer à la suivante
+                    hedge_at, failed_over = None, True
+                    launch_secondary()
+            raise last_error
+        except asyncio.CancelledError:
+            # Deadline dépassée : les répliques qui n'ont pas répondu comptent comme en échec
+            for replica in pending.values():
+                self.breakers[replica].record_failure()
+            raise
+        finally:
+            # Requêtes perdantes (ou abandonnées) : annulées
+            for task, replica in pending.items():
+                task.cancel()
+                self.breakers[replica].record_cancelled()
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(95)
+        return {
+            **self._stats,
+            "bulkhead": self.bulkhead.stats(),
+            "breakers": {replica: breaker.stats() for replica, breaker in self.breakers.items()},
+            "latency_p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 2),
+        }
@@ -47,7 +47,7 @@ class ScoringService:
         """
         try:
             processed_data = self.preprocess(client_data)
-            score = scoring_model.predict_score(processed_data)
+            score = scoring_model.get().predict_score(processed_data)
             result = self.postprocess(score)
 
             # Logging structuré
@@ -0,0 +1,59 @@
+"""
+Cache d'existence des utilisateurs pour les routes /chat.
+
+Les routes de conversation vérifient seulement qu'un utilisateur existe :
+les réponses (positives et négatives) sont gardées en mémoire, les lectures
+concurrentes d'un même username sont fusionnées, et le cache est mis à jour
+à la création / suppression.
+"""
+from typing import Awaitable, Callable
+from app.config import USER_CACHE_SIZE, USER_CACHE_TTL, USER_CACHE_NEGATIVE_TTL
+from app.utils.cache import ExpiringLRUCache, SingleFlight
+
+
+class UserExistenceCache:
+    """
+    Cache LRU borné username -> existe.
+    Les absences sont gardées moins longtemps (`negative_ttl`) que les présences.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = USER_CACHE_SIZE,
+        ttl: float = USER_CACHE_TTL,
+        negative_ttl: float = USER_CACHE_NEGATIVE_TTL,
+    ):
+        self._cache = ExpiringLRUCache(maxsize=maxsize, default_ttl=ttl)
+        self._flight = SingleFlight()
+        self.negative_ttl = negative_ttl
+        # Incrémenté à chaque écriture explicite : un chargement commencé
+        # avant une création / suppression ne doit pas écraser son résultat
+        self._version = 0
+
+    async def exists(self, username: str, loader: Callable[[str], Awaitable[bool]]) -> bool:
+        cached = self._cache.get(username)
+        if cached is not None:
+            return cached
+        return await self._flight.do(username, lambda: self._load(username, loader))
+
+    async def _load(self, username: str, loader: Callable[[str], Awaitable[bool]]) -> bool:
+        version = self._version
+        found = await loader(username)
+        if self._version == version:
+            self._cache.set(username, found, None if found else self.negative_ttl)
+        return found
+
+    def mark_created(self, username: str):
+        self._version += 1
+        self._cache.set(username, True)
+
+    def invalidate(self, username: str):
+        self._version += 1
+        self._cache.invalidate(username)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+# Instance singleton
+user_existence_cache = UserExistenceCache()
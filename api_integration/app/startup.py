@@ -0,0 +1,70 @@
+"""
+Initialisation des ressources coûteuses au démarrage du worker.
+
+L'import de app.main ne crée rien (voir app/utils/lazy.py) : le client
+Elasticsearch, le handler ELK, les modèles ML, le détecteur de langue,
+l'extracteur d'entités et les JWKS sont préparés ici, en parallèle dans le
+threadpool, depuis le lifespan de l'application. Une ressource en échec ne
+bloque pas le démarrage : elle sera retentée au premier usage.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict
+
+from app.auth.jwks_manager import jwks_manager
+from app.config import es_provider, STARTUP_RESOURCE_TIMEOUT
+from app.logging.elk_logger import elk_handler
+from app.models.fraude_model import fraude_model
+from app.models.scoring_model import scoring_model
+from app.services.entity_extractor import entity_extractor
+from app.services.language_detector import language_detector
+
+logger = logging.getLogger(__name__)
+
+# Nom -> initialisation synchrone (exécutée hors de la boucle d'événements)
+STARTUP_TASKS: Dict[str, Callable[[], Any]] = {
+    "elk_handler": elk_handler.get,
+    "elasticsearch": es_provider.get,
+    "scoring_model": scoring_model.get,
+    "fraude_model": fraude_model.get,
+    "language_detector": language_detector.get,
+    "entity_extractor": entity_extractor.get,
+    "jwks": jwks_manager.prefetch,
+}
+
+# Dernier rapport d'initialisation (exposé dans /admin/metrics)
+last_report: Dict[str, Any] = {}
+
+
+async def _run(name: str, task: Callable[[], Any], timeout: float) -> Dict[str, Any]:
+    start = time.perf_counter()
+    error = None
+    try:
+        result = await asyncio.wait_for(asyncio.to_thread(task), timeout=timeout)
+        ok = result is not False
+    except asyncio.TimeoutError:
+        ok, error = False, f"timeout ({timeout}s)"
+    except Exception as e:
+        ok, error = False, str(e) or type(e).__name__
+    if not ok:
+        logger.warning(f"Initialisation de '{name}' en échec : {error or 'indisponible'}")
+    return {"ok": ok, "ms": round((time.perf_counter() - start) * 1000, 2), "error": error}
+
+
+async def init_resources(
+    tasks: Dict[str, Callable[[], Any]] = None,
+    timeout: float = STARTUP_RESOURCE_TIMEOUT,
+) -> Dict[str, Any]:
+    """Initialise toutes les ressources en parallèle ; retourne le temps de chacune"""
+    tasks = STARTUP_TASKS if tasks is None else tasks
+    start = time.perf_counter()
+    names = list(tasks)
+    results = await asyncio.gather(*(_run(name, tasks[name], timeout) for name in names))
+    report = {
+        "resources": dict(zip(names, results)),
+        "wall_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+    last_report.clear()
+    last_report.update(report)
+    return report
@@ -0,0 +1,74 @@
+"""
+Profil de démarrage à froid d'un worker.
+
+    python -m app.startup_profile [--top 15]
+
+1. Temps d'import par module (`python -X importtime -c "import app.main"` dans
+   un processus neuf), cumulé, modules de l'application et dépendances.
+2. Temps d'initialisation de chaque ressource (app/startup.py), comme au
+   démarrage réel : les ressources indisponibles apparaissent en échec.
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+
+def import_times(target: str = "app.main") -> Tuple[float, List[Tuple[str, int]]]:
+    """Durée totale d'import (s) et temps cumulé (µs) par module, du plus lent au plus rapide"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumul, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumul)
+    return wall, sorted(cumulative.items(), key=lambda item: item[1], reverse=True)
+
+
+def print_import_times(top: int):
+    wall, modules = import_times()
+    print(f"Import de app.main : {wall * 1000:.0f} ms (processus neuf, interpréteur compris)")
+    app_modules = [(n, us) for n, us in modules if n == "app" or n.startswith("app.")]
+    # Dépendances de premier niveau uniquement (leurs sous-modules sont inclus dans le cumul)
+    dependencies = [(n, us) for n, us in modules if "." not in n and n != "app"]
+    for title, rows in (("Modules de l'application", app_modules), ("Dépendances", dependencies)):
+        print(f"\n{title} (temps cumulé)")
+        for name, us in rows[:top]:
+            print(f"  {us / 1000:9.1f} ms  {name}")
+
+
+def print_init_times():
+    from app.startup import init_resources
+
+    report = asyncio.run(init_resources())
+    print(f"\nInitialisation des ressources : {report['wall_ms']:.0f} ms (en parallèle)")
+    for name, result in sorted(report["resources"].items(), key=lambda item: item[1]["ms"], reverse=True):
+        status = "ok" if result["ok"] else f"échec ({result['error'] or 'indisponible'})"
+        print(f"  {result['ms']:9.1f} ms  {name:<15} {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profil de démarrage à froid de l'API")
+    parser.add_argument("--top", type=int, default=15, help="nombre de modules affichés par section")
+    parser.add_argument("--imports-only", action="store_true", help="ne pas initialiser les ressources")
+    args = parser.parse_args()
+
+    print_import_times(args.top)
+    if not args.imports_only:
+        print_init_times()
+
+
+if __name__ == "__main__":
+    main()
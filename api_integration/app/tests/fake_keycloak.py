@@ -0,0 +1,78 @@
+"""
+Faux serveur Keycloak local pour les tests (application ASGI).
+
+Utilisation avec httpx, sans réseau :
+    fake = FakeKeycloak()
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app))
+    client = AsyncKeycloakClient(issuer=fake.issuer, http_client=http)
+"""
+import asyncio
+import time
+from typing import Dict, List
+
+from fastapi import FastAPI, Form
+from fastapi.responses import JSONResponse
+
+from app.config import KEYCLOAK_CLIENT_ID
+
+
+class FakeKeycloak:
+    """
+    Simule les endpoints OpenID Connect utilisés par l'API
+    et compte les appels reçus.
+    """
+
+    def __init__(self, realm: str = "test", latency: float = 0.0):
+        self.issuer = f"http://keycloak.test/realms/{realm}"
+        self.latency = latency
+        self.active_tokens: Dict[str, dict] = {}
+        self.calls: Dict[str, int] = {"introspect": 0, "token": 0}
+        self.service_token_lifetime = 300
+        # Statut forcé de l'introspection (ex. 500, ou 401 pour des identifiants client refusés)
+        self.introspect_status = 200
+        self.app = self._build_app(realm)
+
+    def add_token(self, token: str, roles: List[str] = (), expires_in: int = 300, **claims) -> dict:
+        """Déclare un token actif (émis par défaut pour l'API) et retourne son résultat d'introspection."""
+        result = {
+            "active": True,
+            "sub": claims.pop("sub", "user"),
+            "aud": claims.pop("aud", KEYCLOAK_CLIENT_ID),
+            "exp": int(time.time()) + expires_in,
+            "realm_access": {"roles": list(roles)},
+            **claims,
+        }
+        self.active_tokens[token] = result
+        return result
+
+    def _build_app(self, realm: str) -> FastAPI:
+        app = FastAPI()
+        base = f"/realms/{realm}/protocol/openid-connect"
+
+        @app.get(f"/realms/{realm}")
+        async def realm_info():
+            return JSONResponse({"realm": realm, "token-service": f"{self.issuer}/protocol/openid-connect"})
+
+        @app.post(f"{base}/token/introspect")
+        async def introspect(token: str = Form(...), client_id: str = Form(...), client_secret: str = Form(...)):
+            self.calls["introspect"] += 1
+            await asyncio.sleep(self.latency)
+            if self.introspect_status != 200:
+                return JSONResponse({"error": "unavailable"}, status_code=self.introspect_status)
+            return JSONResponse(self.active_tokens.get(token, {"active": False}))
+
+        @app.post(f"{base}/token")
+        async def token(grant_type: str = Form(...), client_id: str = Form(...), client_secret: str = Form(...)):
+            if grant_type != "client_credentials":
+                return JSONResponse({"error": "unsupported_grant_type"}, status_code=400)
+            self.calls["token"] += 1
+            await asyncio.sleep(self.latency)
+            access_token = f"service-token-{self.calls['token']}"
+            self.add_token(access_token, sub=client_id, expires_in=self.service_token_lifetime)
+            return JSONResponse({
+                "access_token": access_token,
+                "token_type": "Bearer",
+                "expires_in": self.service_token_lifetime,
+            })
+
+        return app
@@ -0,0 +1,93 @@
+"""
+Faux serveur Rasa local pour les tests (application aiohttp.web).
+
+Utilisation :
+    fake = FakeRasa()
+    async with fake.serve() as url:
+        service = ChatbotService(rasa_url=url)
+
+En local (latence injectée, en secondes) :
+    python -m app.tests.fake_rasa --port 5006 --latency 0.3
+"""
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Set
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+class FakeRasa:
+    """
+    Simule le webhook REST de Rasa et compte les appels
+    ainsi que les connexions TCP utilisées par les clients.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        # Intent renvoyé avec chaque message (None : champ absent, comme le webhook REST standard)
+        self.intent = None
+        # Marqueur FAQ du domaine (payload `custom: {faq: <nom>}`), envoyé par le canal REST
+        # comme un message distinct après le texte ; None : réponse sans marqueur
+        self.faq = None
+        # Nombre de messages renvoyés par le bot pour chaque message reçu
+        self.replies = 1
+        # Code HTTP renvoyé (panne simulée si différent de 200)
+        self.status = 200
+        self.calls = 0
+        self.peers: Set[tuple] = set()
+        self.received: List[dict] = []
+        self.app = web.Application()
+        self.app.router.add_post("/webhooks/rest/webhook", self._webhook)
+        self.app.router.add_get("/", self._root)
+
+    async def _root(self, request: web.Request) -> web.Response:
+        return web.Response(text="Hello from Rasa", status=self.status)
+
+    async def _webhook(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        self.peers.add(request.transport.get_extra_info("peername"))
+        payload = await request.json()
+        self.received.append(payload)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.status != 200:
+            return web.json_response({"error": "simulated failure"}, status=self.status)
+        messages = []
+        for i in range(self.replies):
+            message = {
+                "recipient_id": "default",
+                "text": f"Réponse à : {payload.get('message')}" + (f" ({i})" if i else ""),
+            }
+            if self.intent:
+                message["intent"] = {"name": self.intent}
+            messages.append(message)
+        if self.faq:
+            messages.append({"recipient_id": "default", "custom": {"faq": self.faq}})
+        return web.json_response(messages)
+
+    @property
+    def connections(self) -> int:
+        """Nombre de connexions TCP distinctes ayant envoyé une requête"""
+        return len(self.peers)
+
+    @asynccontextmanager
+    async def serve(self):
+        server = TestServer(self.app)
+        await server.start_server()
+        try:
+            yield str(server.make_url("")).rstrip("/")
+        finally:
+            await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Faux serveur Rasa (latence injectable)")
+    parser.add_argument("--port", type=int, default=5006)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--status", type=int, default=200)
+    args = parser.parse_args()
+    fake = FakeRasa(latency=args.latency)
+    fake.status = args.status
+    web.run_app(fake.app, port=args.port)
@@ -0,0 +1,99 @@
+"""
+Tests du tampon d'écritures groupées (app/services/bulk_writer.py).
+"""
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from app.services.bulk_writer import BulkWriteBuffer, BulkWriterFullError
+
+
+class FakeCollection:
+    def __init__(self, failures=None):
+        self.batches = []
+        self.documents = []
+        # Exceptions à lever aux prochains appels, dans l'ordre
+        self.failures = list(failures or [])
+
+    async def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        self.batches.append(len(documents))
+        if self.failures:
+            raise self.failures.pop(0)
+        self.documents.extend(documents)
+
+
+def make_buffer(collection, **kwargs):
+    async def get_collection():
+        return collection
+
+    options = {"flush_interval": 0.01, "retry_backoff": 0}
+    options.update(kwargs)
+    return BulkWriteBuffer(get_collection, name="conversations", **options)
+
+
+@pytest.mark.asyncio
+async def test_documents_are_grouped_in_batches():
+    collection = FakeCollection()
+    buffer = make_buffer(collection, max_batch_size=10)
+    await asyncio.gather(*(buffer.write({"n": i}) for i in range(25)))
+    await buffer.close()
+
+    assert len(collection.documents) == 25
+    assert collection.batches == [10, 10, 5]
+    assert buffer.stats()["written"] == 25
+
+
+@pytest.mark.asyncio
+async def test_write_does_not_wait_unless_durable():
+    collection = FakeCollection()
+    buffer = make_buffer(collection, flush_interval=10)
+    await buffer.write({"n": 1})
+    assert collection.documents == []
+    await buffer.close()
+    assert collection.documents == [{"n": 1}]
+
+    durable = make_buffer(collection, wait_for_durability=True)
+    await durable.write({"n": 2})
+    assert collection.documents[-1] == {"n": 2}
+    await durable.close()
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    collection = FakeCollection(failures=[AutoReconnect("primary stepped down")])
+    buffer = make_buffer(collection, wait_for_durability=True)
+    await buffer.write({"n": 1})
+    await buffer.close()
+
+    assert collection.documents == [{"n": 1}]
+    assert buffer.stats()["retries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_permanent_write_error_reaches_the_waiting_request():
+    error = BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "validation"}]})
+    collection = FakeCollection(failures=[error])
+    buffer = make_buffer(collection, wait_for_durability=True, flush_interval=0.05)
+
+    results = await asyncio.gather(buffer.write({"n": 1}), buffer.write({"n": 2}), return_exceptions=True)
+    await buffer.close()
+    assert results[0] is None
+    assert isinstance(results[1], BulkWriteError)
+    assert buffer.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_is_bounded():
+    class StuckCollection(FakeCollection):
+        async def insert_many(self, documents, ordered=True):
+            await asyncio.sleep(1)
+
+    buffer = make_buffer(StuckCollection(), max_batch_size=1, max_queue=1, enqueue_timeout=0.01)
+    await buffer.write({"n": 1})
+    await asyncio.sleep(0.01)  # le premier lot est en cours d'écriture
+    await buffer.write({"n": 2})
+    with pytest.raises(BulkWriterFullError):
+        await buffer.write({"n": 3})
+    buffer._task.cancel()
@@ -0,0 +1,79 @@
+"""
+Tests du pipeline d'enrichissement concurrent (app/services/chatbot_service.py).
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.chatbot_service import ChatbotService
+
+STAGE_LATENCY = 0.05
+
+
+class SlowNLPService(ChatbotService):
+    """Étapes d'enrichissement simulant des appels NLP distants"""
+
+    async def _detect_language(self, text):
+        await asyncio.sleep(STAGE_LATENCY)
+        return "en"
+
+    async def _analyze_sentiment(self, text):
+        await asyncio.sleep(STAGE_LATENCY)
+        return {"positive": 1.0, "neutral": 0.0, "negative": 0.0}
+
+    async def _extract_entities(self, text):
+        await asyncio.sleep(STAGE_LATENCY)
+        return [{"entity": "montant", "value": "100"}]
+
+    async def _generate_suggestions(self, response_text):
+        await asyncio.sleep(STAGE_LATENCY)
+        return ["suite"]
+
+    async def _fetch_additional_info(self, response_text):
+        await asyncio.sleep(STAGE_LATENCY)
+        return {"related_topics": ["x"], "useful_links": [], "documentation": None}
+
+
+@pytest.mark.asyncio
+async def test_message_stages_run_concurrently():
+    service = SlowNLPService()
+    start = time.perf_counter()
+    enriched = await service._enrich_message("hello")
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 2 * STAGE_LATENCY
+    assert enriched["metadata"]["language"] == "en"
+    assert enriched["metadata"]["entities"] == [{"entity": "montant", "value": "100"}]
+
+
+@pytest.mark.asyncio
+async def test_bot_messages_are_enriched_in_parallel():
+    service = SlowNLPService()
+    bot_messages = [{"text": f"réponse {i}"} for i in range(5)]
+    start = time.perf_counter()
+    enriched = await service._enrich_response(bot_messages, "question")
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 2 * STAGE_LATENCY
+    assert [m["text"] for m in enriched] == [m["text"] for m in bot_messages]
+    assert all(m["suggestions"] == ["suite"] for m in enriched)
+    assert service.stage_metrics.stats()["suggestions"]["calls"] == 5
+
+
+@pytest.mark.asyncio
+async def test_slow_or_failing_stage_degrades_to_default():
+    class DegradedService(SlowNLPService):
+        async def _analyze_sentiment(self, text):
+            raise RuntimeError("service NLP indisponible")
+
+    service = DegradedService()
+    service.stage_timeouts["language"] = STAGE_LATENCY / 5
+    enriched = await service._enrich_message("hello")
+
+    assert enriched["metadata"]["language"] == "fr"
+    assert enriched["metadata"]["sentiment"] == {"positive": 0.0, "neutral": 1.0, "negative": 0.0}
+    assert enriched["metadata"]["entities"] == [{"entity": "montant", "value": "100"}]
+    stats = service.stage_metrics.stats()
+    assert stats["language"]["timeouts"] == 1
+    assert stats["sentiment"]["errors"] == 1
@@ -0,0 +1,97 @@
+"""
+Tests du cache de réponses du chatbot (app/services/chatbot_service.py).
+"""
+import pytest
+
+from app.services.chatbot_service import ChatbotService
+from app.tests.fake_rasa import FakeRasa
+
+
+def faq_service(url: str, cls=ChatbotService) -> ChatbotService:
+    service = cls(rasa_url=url)
+    service.cache_faq_responses = {"faq_horaires"}
+    return service
+
+
+@pytest.mark.asyncio
+async def test_repeated_question_is_served_from_cache():
+    fake = FakeRasa()
+    fake.faq = "faq_horaires"
+    async with fake.serve() as url:
+        service = faq_service(url)
+        first = await service.process_message("Quels sont vos horaires ?")
+        again = await service.process_message("  quels sont   VOS horaires ? ")
+        await service.close()
+
+    assert fake.calls == 1
+    # Le marqueur FAQ n'est pas renvoyé au client
+    assert [m["text"] for m in first] == ["Réponse à : Quels sont vos horaires ?"]
+    assert [m["text"] for m in again] == [m["text"] for m in first]
+    stats = service.stats()["response_cache"]
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_language_is_part_of_the_key():
+    class SwitchingLanguage(ChatbotService):
+        language = "fr"
+
+        async def _detect_language(self, text):
+            return self.language
+
+    fake = FakeRasa()
+    fake.faq = "faq_horaires"
+    async with fake.serve() as url:
+        service = faq_service(url, SwitchingLanguage)
+        await service.process_message("ok")
+        service.language = "en"
+        await service.process_message("ok")
+        await service.close()
+    assert fake.calls == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("faq, intent", [(None, None), (None, "faq_horaires"), ("check_balance", None)])
+async def test_answers_not_known_as_faq_are_not_cached(faq, intent):
+    # Sans marqueur (webhook standard), l'intent éventuel ne suffit pas ; marqueur hors liste : pas de cache
+    fake = FakeRasa()
+    fake.faq = faq
+    fake.intent = intent
+    async with fake.serve() as url:
+        service = faq_service(url)
+        await service.process_message("quel est mon solde ?")
+        await service.process_message("quel est mon solde ?")
+        await service.close()
+
+    assert fake.calls == 2
+    assert service.stats()["response_cache"]["skipped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_allowed_faq_is_cached_even_with_context():
+    # Liste par défaut (RESPONSE_CACHE_FAQ_RESPONSES) : les routes transmettent toujours un contexte
+    fake = FakeRasa()
+    fake.faq = "faq_horaires"
+    async with fake.serve() as url:
+        service = ChatbotService(rasa_url=url)
+        await service.process_message("et le samedi ?", context=[{"message": "bonjour", "response": "Bonjour !"}])
+        await service.process_message("et le samedi ?", context=[{"message": "merci", "response": "De rien"}])
+        await service.process_message("et le samedi ?")
+        await service.close()
+
+    assert fake.calls == 1
+    assert service.stats()["response_cache"]["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_contextual_answers_are_not_cached():
+    fake = FakeRasa()
+    context = [{"message": "mon solde", "response": "Lequel de vos comptes ?"}]
+    async with fake.serve() as url:
+        service = faq_service(url)
+        await service.process_message("le courant", context=context)
+        await service.process_message("le courant", context=context)
+        await service.close()
+
+    assert fake.calls == 2
+    assert len(service.response_cache) == 0
@@ -0,0 +1,175 @@
+"""
+Tests des routes du chatbot (app/routes/chatbot.py) montées dans app.main.
+MongoDB est remplacé par des faux en mémoire, Rasa par app/tests/fake_rasa.py.
+"""
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.auth import auth_utils
+from app.auth.principal_cache import PrincipalCache
+from app.main import app
+from app.routes import chatbot
+from app.security.mongodb_auth import mongodb_auth
+from app.services.chatbot_service import ChatbotService
+from app.services.conversation_context import ConversationContextCache
+from app.services.resilience import CircuitBreaker
+from app.tests.fake_rasa import FakeRasa
+
+
+class FakeUsers:
+    """Collection `users` : find_one compté"""
+
+    def __init__(self, users):
+        self.users = users
+        self.reads = 0
+
+    async def find_one(self, query):
+        self.reads += 1
+        return self.users.get(query["username"])
+
+
+class FakeMongoAuth:
+    """Remplace les accès MongoDB de mongodb_auth utilisés par les routes"""
+
+    def __init__(self, users):
+        self.db = type("FakeDB", (), {})()
+        self.db.users = FakeUsers(users)
+        self.access_checks = 0
+        self.revoked = set()
+        self.saved = []
+
+    async def get_database(self):
+        return self.db
+
+    async def validate_user_access(self, username, access_token):
+        self.access_checks += 1
+        return username in self.db.users.users and username not in self.revoked
+
+    async def save_conversation(self, conversation):
+        self.saved.append(conversation)
+
+    async def recent_turns(self, user_id, limit):
+        return []
+
+
+@pytest_asyncio.fixture
+async def api(monkeypatch):
+    fake_rasa = FakeRasa()
+    mongo = FakeMongoAuth({
+        "alice": {"_id": "1", "username": "alice", "access_token": "secret-alice"},
+        "bob": {"_id": "2", "username": "bob", "access_token": "secret-bob"},
+    })
+    for name in ("get_database", "validate_user_access", "save_conversation", "recent_turns"):
+        monkeypatch.setattr(mongodb_auth, name, getattr(mongo, name))
+    monkeypatch.setattr(auth_utils, "principal_cache", PrincipalCache(maxsize=10, ttl=60))
+    monkeypatch.setattr(chatbot, "conversation_context", ConversationContextCache(window=5))
+
+    async with fake_rasa.serve() as url:
+        service = ChatbotService(rasa_url=url, replica_urls=[])
+        monkeypatch.setattr(chatbot, "chatbot_service", service)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as http:
+            yield http, mongo, fake_rasa
+        await service.close()
+
+
+def bearer(username: str, jti: str = "t1") -> dict:
+    token = auth_utils.create_access_token({"sub": username, "jti": jti})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def parse_sse(body: str) -> list:
+    """Découpe un flux SSE en événements {event, id, data}"""
+    events = []
+    for block in body.split("\n\n"):
+        if not block:
+            continue
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append({"event": fields["event"], "id": fields.get("id"), "data": json.loads(fields["data"])})
+    return events
+
+
+@pytest.mark.asyncio
+async def test_chat_route_is_mounted_and_caches_the_principal(api):
+    http, mongo, fake_rasa = api
+    for text in ("bonjour", "et ma carte ?"):
+        response = await http.post("/chatbot", json={"message": text}, headers=bearer("alice"))
+        assert response.status_code == 200
+        assert response.json()[0]["text"] == f"Réponse à : {text}"
+
+    # Régime établi : ni lecture de l'utilisateur ni validation d'accès au second message
+    assert mongo.db.users.reads == 1
+    assert mongo.access_checks == 1
+    assert [c["message"] for c in mongo.saved] == ["bonjour", "et ma carte ?"]
+    assert all(c["user_id"] == "alice" for c in mongo.saved)
+
+
+@pytest.mark.asyncio
+async def test_chat_route_rejects_bad_credentials(api):
+    http, mongo, fake_rasa = api
+    assert (await http.post("/chatbot", json={"message": "bonjour"})).status_code == 401
+    headers = {"Authorization": "Bearer pas-un-jwt"}
+    assert (await http.post("/chatbot", json={"message": "bonjour"}, headers=headers)).status_code == 401
+    assert (await http.post("/chatbot", json={"message": "bonjour"}, headers=bearer("mallory"))).status_code == 401
+
+    mongo.revoked.add("bob")
+    response = await http.post("/chatbot", json={"message": "bonjour"}, headers=bearer("bob"))
+    assert response.status_code == 401
+    assert fake_rasa.calls == 0 and mongo.saved == []
+
+
+@pytest.mark.asyncio
+async def test_stream_route_sends_framed_events_then_saves(api):
+    http, mongo, fake_rasa = api
+    fake_rasa.replies = 2
+    response = await http.post("/chatbot/stream", json={"message": "bonjour"}, headers=bearer("alice"))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.text.endswith("\n\n")
+
+    events = parse_sse(response.text)
+    messages, done = events[:-1], events[-1]
+    assert [e["event"] for e in messages] == ["message", "message"]
+    assert sorted(e["id"] for e in messages) == ["0", "1"]
+    assert done == {"event": "done", "id": None, "data": {"count": 2}}
+
+    # Sauvegarde après le flux, réponse dans l'ordre Rasa quel que soit l'ordre d'envoi
+    assert len(mongo.saved) == 1
+    saved = mongo.saved[0]
+    assert saved["user_id"] == "alice" and saved["message"] == "bonjour"
+    assert [m["text"] for m in saved["response"]] == ["Réponse à : bonjour", "Réponse à : bonjour (1)"]
+    assert chatbot.conversation_context.stats()["users"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rasa_outage_and_deadline_map_to_503_and_504(api):
+    http, mongo, fake_rasa = api
+    service = chatbot.chatbot_service
+    resilience = service.resilience
+    resilience.breakers[service.rasa_url].failure_threshold = 1
+
+    fake_rasa.status = 500
+    assert (await http.post("/chatbot", json={"message": "a"}, headers=bearer("alice"))).status_code == 500
+    # Disjoncteur ouvert : indisponibilité temporaire, sans appel à Rasa
+    response = await http.post("/chatbot", json={"message": "b"}, headers=bearer("alice"))
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Chatbot temporarily unavailable"
+    stream = await http.post("/chatbot/stream", json={"message": "c"}, headers=bearer("alice"))
+    assert parse_sse(stream.text) == [
+        {"event": "error", "id": None, "data": {"status": 503, "detail": "Chatbot temporarily unavailable"}}
+    ]
+    assert fake_rasa.calls == 1
+
+    resilience.breakers[service.rasa_url] = CircuitBreaker()
+    fake_rasa.status, fake_rasa.latency = 200, 0.3
+    resilience.deadline = 0.05
+    response = await http.post("/chatbot", json={"message": "d"}, headers=bearer("alice"))
+    assert response.status_code == 504
+    assert response.json()["detail"] == "Chatbot timeout"
+    stream = await http.post("/chatbot/stream", json={"message": "e"}, headers=bearer("alice"))
+    assert parse_sse(stream.text)[0]["data"] == {"status": 504, "detail": "Chatbot timeout"}
+    assert mongo.saved == []
@@ -0,0 +1,40 @@
+"""
+Tests de la session HTTP persistante ChatbotService -> Rasa.
+"""
+import asyncio
+
+import pytest
+
+from app.services.chatbot_service import ChatbotService
+from app.tests.fake_rasa import FakeRasa
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused_between_messages():
+    fake = FakeRasa()
+    async with fake.serve() as url:
+        service = ChatbotService(rasa_url=url)
+        await service.start()
+        for i in range(10):
+            response = await service.process_message(f"message {i}")
+            assert response[0]["text"] == f"Réponse à : message {i}"
+        stats = service.stats()
+        await service.close()
+
+    assert fake.calls == 10
+    assert fake.connections == 1
+    assert stats["connections_created"] == 1
+    assert stats["connections_reused"] == 9
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_per_call_timeout():
+    fake = FakeRasa(latency=0.5)
+    async with fake.serve() as url:
+        service = ChatbotService(rasa_url=url)
+        with pytest.raises(asyncio.TimeoutError):
+            await service.process_message("lent", timeout=0.05)
+        assert service.stats()["timeouts"] == 1
+        await service.close()
+    assert service.stats()["open"] is False
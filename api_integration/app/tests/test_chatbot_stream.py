@@ -0,0 +1,55 @@
+"""
+Tests de la réponse en flux du chatbot (ChatbotService.stream_message).
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.chatbot_service import ChatbotService
+from app.tests.fake_rasa import FakeRasa
+
+
+class UnevenEnrichment(ChatbotService):
+    """Le premier message du bot est le plus long à enrichir"""
+
+    async def _generate_suggestions(self, response_text):
+        await asyncio.sleep(0.2 if response_text.endswith(": bonjour") else 0.01)
+        return []
+
+
+@pytest.mark.asyncio
+async def test_messages_are_streamed_as_soon_as_enriched():
+    fake = FakeRasa()
+    fake.replies = 3
+    async with fake.serve() as url:
+        service = UnevenEnrichment(rasa_url=url)
+        start = time.perf_counter()
+        received = []
+        async for index, enriched in service.stream_message("bonjour"):
+            received.append((index, time.perf_counter() - start))
+        await service.close()
+
+    assert sorted(i for i, _ in received) == [0, 1, 2]
+    # Les messages rapides arrivent avant la fin de l'enrichissement du premier
+    assert received[0][0] != 0
+    assert received[0][1] < 0.15
+
+
+@pytest.mark.asyncio
+async def test_streamed_response_fills_the_cache_in_order():
+    fake = FakeRasa()
+    fake.replies = 3
+    fake.faq = "faq_bonjour"
+    async with fake.serve() as url:
+        service = UnevenEnrichment(rasa_url=url)
+        service.cache_faq_responses = {"faq_bonjour"}
+        streamed = [m async for _, m in service.stream_message("bonjour")]
+        replayed = await service.process_message("Bonjour")
+        await service.close()
+
+    assert fake.calls == 1
+    assert [m["text"] for m in replayed] == [
+        "Réponse à : bonjour", "Réponse à : bonjour (1)", "Réponse à : bonjour (2)"
+    ]
+    assert sorted(m["text"] for m in streamed) == sorted(m["text"] for m in replayed)
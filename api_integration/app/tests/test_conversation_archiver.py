@@ -0,0 +1,286 @@
+"""
+Tests du job d'archivage des conversations (app/services/conversation_archiver.py).
+"""
+import zlib
+from datetime import datetime, timedelta
+
+import bson
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.services.conversation_archiver import (
+    ARCHIVE_COLLECTION,
+    BUCKET_COLLECTION,
+    CHAT_TURNS_ARCHIVE_COLLECTION,
+    CHAT_TURNS_COLLECTION,
+    ConversationArchiver,
+    restore_conversation,
+    unpack_buckets,
+    unpack_conversation,
+)
+from app.services.mongodb_service import MongoDBService
+
+
+def _match(document, query):
+    for key, condition in query.items():
+        if key == '$or':
+            if not any(_match(document, q) for q in condition):
+                return False
+            continue
+        if isinstance(condition, dict) and '$exists' in condition:
+            if (key in document) != condition['$exists']:
+                return False
+            continue
+        value = document['metadata']['updated_at'] if key == 'metadata.updated_at' else document[key]
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        if '$lt' in condition and not value < condition['$lt']:
+            return False
+        if '$in' in condition and value not in condition['$in']:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction):
+        def value(d):
+            return d['metadata']['updated_at'] if key == 'metadata.updated_at' else d[key]
+        self.documents.sort(key=value, reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.documents = self.documents[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.documents[:length]
+
+    def __aiter__(self):
+        self._iter = iter(self.documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, documents=()):
+        self.documents = {d['_id']: d for d in documents}
+        self.on_delete = None
+
+    def find(self, query, projection=None):
+        return FakeCursor([d for d in self.documents.values() if _match(d, query)])
+
+    async def find_one(self, query):
+        return next((d for d in self.documents.values() if _match(d, query)), None)
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        document = await self.find_one(query)
+        if document is not None:
+            document['message_count'] = document.get('message_count', 0) + update['$inc']['message_count']
+        return document
+
+    async def update_one(self, query, update, upsert=False):
+        match = {k: v for k, v in query.items() if k != 'bucket'}
+        bucket = next((d for d in self.documents.values() if _match(d, match) and d['bucket'] == query['bucket']), None)
+        if bucket is None:
+            bucket = {'_id': ObjectId(), **query, 'messages': [], 'count': 0}
+            self.documents[bucket['_id']] = bucket
+        bucket['messages'].append(update['$push']['messages'])
+        bucket['count'] += 1
+
+    async def update_many(self, query, update):
+        for d in self.documents.values():
+            if _match(d, query):
+                d.update(update['$set'])
+
+    async def insert_one(self, document):
+        if document['_id'] in self.documents:
+            raise DuplicateKeyError("E11000")
+        self.documents[document['_id']] = document
+
+    async def insert_many(self, documents, ordered=True):
+        for d in documents:
+            self.documents[d['_id']] = d
+
+    async def delete_one(self, query):
+        self.documents.pop(query['_id'], None)
+
+    async def delete_many(self, query):
+        if self.on_delete:
+            self.on_delete()
+        for d in [d for d in self.documents.values() if _match(d, query)]:
+            del self.documents[d['_id']]
+
+
+class FakeDB:
+    def __init__(self, conversations, buckets=()):
+        self.conversations = FakeCollection(conversations)
+        self.conversation_buckets = FakeCollection(buckets)
+        self.archive = FakeCollection()
+        self.chat_turns = FakeCollection()
+        self.chat_turns_archive = FakeCollection()
+
+    def __getitem__(self, name):
+        return {
+            ARCHIVE_COLLECTION: self.archive,
+            BUCKET_COLLECTION: self.conversation_buckets,
+            CHAT_TURNS_COLLECTION: self.chat_turns,
+            CHAT_TURNS_ARCHIVE_COLLECTION: self.chat_turns_archive,
+        }[name]
+
+
+def conversation(days_old):
+    updated_at = datetime.utcnow() - timedelta(days=days_old)
+    # Précision BSON (millisecondes), comme un document lu depuis MongoDB
+    updated_at = updated_at.replace(microsecond=updated_at.microsecond // 1000 * 1000)
+    return {
+        '_id': ObjectId(),
+        'user_id': 'alice',
+        'metadata': {'created_at': updated_at, 'updated_at': updated_at},
+        'messages': [{'role': 'user', 'content': 'bonjour'}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_old_conversations_move_in_batches():
+    old = [conversation(200 + i) for i in range(7)]
+    recent = [conversation(1) for _ in range(3)]
+    db = FakeDB(old + recent)
+    archiver = ConversationArchiver(lambda: db, after_days=180, batch_size=3, batch_pause=0)
+
+    assert await archiver.run_once() == 7
+    assert set(db.conversations.documents) == {c['_id'] for c in recent}
+    assert set(db.archive.documents) == {c['_id'] for c in old}
+
+    archived = db.archive.documents[old[0]['_id']]
+    assert archived['metadata'] == old[0]['metadata']
+    assert unpack_conversation(archived) == old[0]
+
+
+@pytest.mark.asyncio
+async def test_max_batches_bounds_a_run():
+    db = FakeDB([conversation(365) for _ in range(10)])
+    archiver = ConversationArchiver(lambda: db, after_days=180, batch_size=2, batch_pause=0, max_batches=2)
+    assert await archiver.run_once() == 4
+    assert len(db.conversations.documents) == 6
+
+
+@pytest.mark.asyncio
+async def test_conversation_updated_during_move_stays_hot():
+    stale = conversation(365)
+    db = FakeDB([stale])
+
+    def touched_before_delete():
+        stale['metadata'] = {**stale['metadata'], 'updated_at': datetime.utcnow()}
+
+    db.conversations.on_delete = touched_before_delete
+    archiver = ConversationArchiver(lambda: db, after_days=180, batch_pause=0)
+    assert await archiver.archive_batch(datetime.utcnow() - timedelta(days=180)) == 0
+    assert stale['_id'] in db.conversations.documents
+    assert db.archive.documents == {}
+
+
+def bucket(conversation_id, number, contents):
+    return {
+        '_id': ObjectId(),
+        'conversation_id': conversation_id,
+        'bucket': number,
+        'messages': [{'role': 'user', 'content': c, 'seq': i} for i, c in enumerate(contents)],
+        'count': len(contents),
+    }
+
+
+@pytest.mark.asyncio
+async def test_buckets_move_with_their_conversation():
+    old, recent = conversation(365), conversation(1)
+    old_bucket, recent_bucket = bucket(old['_id'], 0, ['a', 'b']), bucket(recent['_id'], 0, ['c'])
+    db = FakeDB([old, recent], [old_bucket, recent_bucket])
+    archiver = ConversationArchiver(lambda: db, after_days=180, batch_pause=0)
+
+    assert await archiver.run_once() == 1
+    # Aucun paquet orphelin dans la collection chaude
+    assert set(db.conversation_buckets.documents) == {recent_bucket['_id']}
+    assert unpack_buckets(db.archive.documents[old['_id']]) == [old_bucket]
+
+
+@pytest.mark.asyncio
+async def test_append_to_archived_conversation_restores_it():
+    old = {**conversation(365), 'message_count': 2}
+    db = FakeDB([old], [bucket(old['_id'], 0, ['a', 'b'])])
+    await ConversationArchiver(lambda: db, after_days=180, batch_pause=0).run_once()
+    assert db.conversations.documents == {} and db.conversation_buckets.documents == {}
+
+    service = MongoDBService()
+    service.db = db
+    # Lecture : repli sur les paquets archivés
+    assert [m['content'] for m in await service.get_latest_messages(str(old['_id']))] == ['a', 'b']
+
+    assert await service.append_message(str(old['_id']), {'role': 'user', 'content': 'c'}) == 2
+    assert old['_id'] in db.conversations.documents
+    assert db.archive.documents == {}
+    assert [m['content'] for m in await service.get_latest_messages(str(old['_id']))] == ['a', 'b', 'c']
+
+    # Restauration idempotente : rien à faire une fois revenue dans la collection chaude
+    assert await restore_conversation(db, old['_id']) is False
+
+
+@pytest.mark.asyncio
+async def test_restore_during_move_keeps_the_buckets():
+    old = {**conversation(365), 'message_count': 2}
+    old_bucket = bucket(old['_id'], 0, ['a', 'b'])
+    db = FakeDB([old], [old_bucket])
+    service = MongoDBService()
+    service.db = db
+
+    archiver = ConversationArchiver(lambda: db, after_days=180, batch_pause=0)
+    delete_buckets = db.conversation_buckets.delete_many
+
+    async def restored_before_bucket_delete(query):
+        # append_message restaure la conversation entre la vérification `kept` et la suppression des paquets
+        await service.append_message(str(old['_id']), {'role': 'user', 'content': 'c'})
+        await delete_buckets(query)
+
+    db.conversation_buckets.delete_many = restored_before_bucket_delete
+    assert await archiver.archive_batch(datetime.utcnow() - timedelta(days=180)) == 1
+
+    assert old['_id'] in db.conversations.documents
+    assert [m['content'] for m in await service.get_latest_messages(str(old['_id']))] == ['a', 'b', 'c']
+
+
+def chat_turn(days_old):
+    timestamp = datetime.utcnow() - timedelta(days=days_old)
+    return {
+        '_id': ObjectId(),
+        'user_id': 'alice',
+        'message': 'bonjour',
+        'response': [{'text': 'Bonjour !'}],
+        'timestamp': timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000),
+    }
+
+
+@pytest.mark.asyncio
+async def test_old_chat_turns_are_archived_by_timestamp():
+    old = [chat_turn(200 + i) for i in range(5)]
+    recent = chat_turn(1)
+    db = FakeDB([])
+    db.chat_turns = FakeCollection(old + [recent])
+    archiver = ConversationArchiver(lambda: db, after_days=180, batch_size=2, batch_pause=0)
+
+    await archiver.run_once()
+    assert set(db.chat_turns.documents) == {recent['_id']}
+    assert set(db.chat_turns_archive.documents) == {t['_id'] for t in old}
+    assert archiver.stats()["turns_archived"] == 5
+
+    archived = db.chat_turns_archive.documents[old[0]['_id']]
+    assert archived['user_id'] == 'alice' and archived['timestamp'] == old[0]['timestamp']
+    assert bson.decode(zlib.decompress(archived['data'])) == old[0]
@@ -0,0 +1,126 @@
+"""
+Tests du stockage des messages par paquets (app/services/mongodb_service.py).
+"""
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from app.config import CONVERSATION_BUCKET_SIZE
+from app.services.mongodb_service import MongoDBService
+
+
+class FakeConversations:
+    def __init__(self, ids):
+        self.documents = {i: {'_id': i, 'metadata': {}} for i in ids}
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        document = self.documents.get(query['_id'])
+        if document is None:
+            return None
+        await asyncio.sleep(0)
+        document['message_count'] = document.get('message_count', 0) + update['$inc']['message_count']
+        return {'_id': document['_id'], 'message_count': document['message_count']}
+
+
+class FakeBuckets:
+    def __init__(self):
+        self.buckets = {}
+        self.reads = []
+
+    async def update_one(self, query, update, upsert=False):
+        key = (query['conversation_id'], query['bucket'])
+        bucket = self.buckets.setdefault(key, {'bucket': query['bucket'], 'messages': [], 'count': 0})
+        bucket['messages'].append(update['$push']['messages'])
+        bucket['count'] += 1
+
+    def find(self, query, projection=None):
+        buckets = [b for (c, _), b in self.buckets.items() if c == query['conversation_id']]
+        return FakeBucketCursor(self, buckets)
+
+
+class FakeBucketCursor:
+    def __init__(self, owner, buckets):
+        self.owner = owner
+        self.buckets = buckets
+
+    def sort(self, key, direction):
+        self.buckets.sort(key=lambda b: b[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.buckets = self.buckets[:n]
+        self.owner.reads.append(n)
+        return self
+
+    def __aiter__(self):
+        self._iter = iter(self.buckets)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeArchive:
+    async def find_one(self, query):
+        return None
+
+
+class FakeDB:
+    def __init__(self, conversation_id):
+        self.conversations = FakeConversations([conversation_id])
+        self.conversation_buckets = FakeBuckets()
+        self.archive = FakeArchive()
+
+    def __getitem__(self, name):
+        return self.archive
+
+
+@pytest.fixture
+def setup():
+    conversation_id = ObjectId()
+    service = MongoDBService()
+    db = FakeDB(conversation_id)
+    service.db = db
+    return service, db, str(conversation_id)
+
+
+@pytest.mark.asyncio
+async def test_messages_are_split_into_fixed_size_buckets(setup):
+    service, db, conversation_id = setup
+    total = CONVERSATION_BUCKET_SIZE * 2 + 5
+    seqs = await asyncio.gather(*(
+        service.append_message(conversation_id, {'role': 'user', 'content': str(i)}) for i in range(total)
+    ))
+
+    assert sorted(seqs) == list(range(total))
+    sizes = sorted(b['count'] for b in db.conversation_buckets.buckets.values())
+    assert sizes == [5, CONVERSATION_BUCKET_SIZE, CONVERSATION_BUCKET_SIZE]
+
+
+@pytest.mark.asyncio
+async def test_latest_messages_read_only_the_last_buckets(setup):
+    service, db, conversation_id = setup
+    total = CONVERSATION_BUCKET_SIZE * 3 + 10
+    for i in range(total):
+        await service.append_message(conversation_id, {'role': 'user', 'content': str(i)})
+
+    latest = await service.get_latest_messages(conversation_id, limit=20)
+    assert [m['seq'] for m in latest] == list(range(total - 20, total))
+    assert db.conversation_buckets.reads == [2]
+
+
+@pytest.mark.asyncio
+async def test_append_to_unknown_conversation(setup):
+    service, _, _ = setup
+    assert await service.append_message(str(ObjectId()), {'role': 'user', 'content': 'x'}) is None
+
+
+@pytest.mark.asyncio
+async def test_messages_cannot_be_rewritten_in_place(setup):
+    service, _, conversation_id = setup
+    with pytest.raises(ValueError):
+        await service.update_conversation(conversation_id, {'messages': []})
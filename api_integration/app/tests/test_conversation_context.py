@@ -0,0 +1,115 @@
+"""
+Tests du contexte de conversation en mémoire (app/services/conversation_context.py).
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.services.chatbot_service import ChatbotService
+from app.services.conversation_context import ConversationContextCache
+from app.tests.fake_rasa import FakeRasa
+
+
+class FakeStore:
+    """Conversations sauvegardées par utilisateur, avec compteur de lectures"""
+
+    def __init__(self, history=None, latency=0.0):
+        self.history = history or {}
+        self.latency = latency
+        self.loads = 0
+
+    async def recent_turns(self, user_id, limit):
+        self.loads += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.history.get(user_id, [])[-limit:]
+
+
+def saved(i):
+    return {"message": f"question {i}", "response": [{"text": f"réponse {i}"}], "timestamp": datetime(2024, 1, 1, 0, i)}
+
+
+@pytest.mark.asyncio
+async def test_mongo_is_read_once_then_buffer_is_updated_in_memory():
+    store = FakeStore({"alice": [saved(i) for i in range(8)]})
+    cache = ConversationContextCache(window=3)
+
+    context = await cache.get("alice", store.recent_turns)
+    assert [t["user"] for t in context] == ["question 5", "question 6", "question 7"]
+    assert context[0]["bot"] == ["réponse 5"]
+    assert context[0]["timestamp"] == "2024-01-01T00:05:00"
+
+    cache.append("alice", "question 8", [{"text": "réponse 8"}, {"image": "x.png"}])
+    context = await cache.get("alice", store.recent_turns)
+    assert [t["user"] for t in context] == ["question 6", "question 7", "question 8"]
+    assert context[-1]["bot"] == ["réponse 8"]
+    assert store.loads == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    store = FakeStore({"alice": [saved(1)]}, latency=0.02)
+    cache = ConversationContextCache(window=5)
+    results = await asyncio.gather(*(cache.get("alice", store.recent_turns) for _ in range(10)))
+    assert store.loads == 1
+    assert all(len(r) == 1 for r in results)
+
+
+@pytest.mark.asyncio
+async def test_idle_users_are_evicted_by_count_and_memory():
+    store = FakeStore()
+    cache = ConversationContextCache(window=5, max_users=2)
+    for user in ("a", "b"):
+        await cache.get(user, store.recent_turns)
+    await cache.get("a", store.recent_turns)
+    await cache.get("c", store.recent_turns)
+    assert cache.stats()["users"] == 2
+    # "b" est le moins récemment utilisé
+    cache.append("b", "perdu", [])
+    await cache.get("b", store.recent_turns)
+    assert store.loads == 4
+
+    small = ConversationContextCache(window=5, max_users=100, max_bytes=2000)
+    await small.get("a", store.recent_turns)
+    await small.get("b", store.recent_turns)
+    small.append("a", "x" * 500, [])
+    small.append("a", "x" * 500, [])
+    assert small.stats()["users"] == 2
+    # Plafond dépassé : "a", moins récemment utilisé que "b", est évincé
+    small.append("b", "x" * 500, [])
+    assert small.stats()["users"] == 1 and small.stats()["bytes"] <= 2000
+    assert len(await small.get("b", store.recent_turns)) == 1
+
+
+@pytest.mark.asyncio
+async def test_buffers_are_reloaded_after_ttl_across_workers():
+    store = FakeStore({"alice": [saved(1)]})
+    worker_a = ConversationContextCache(window=5, ttl=0.05)
+    worker_b = ConversationContextCache(window=5, ttl=0.05)
+    await worker_a.get("alice", store.recent_turns)
+    await worker_b.get("alice", store.recent_turns)
+
+    # Le message suivant est servi (et sauvegardé) par le worker B
+    store.history["alice"].append(saved(2))
+    worker_b.append("alice", "question 2", [{"text": "réponse 2"}])
+    assert [t["user"] for t in await worker_a.get("alice", store.recent_turns)] == ["question 1"]
+
+    await asyncio.sleep(0.06)
+    context = await worker_a.get("alice", store.recent_turns)
+    assert [t["user"] for t in context] == ["question 1", "question 2"]
+    assert worker_a.stats()["expirations"] == 1
+    assert store.loads == 3
+
+
+@pytest.mark.asyncio
+async def test_context_is_sent_in_rasa_metadata():
+    fake = FakeRasa()
+    async with fake.serve() as url:
+        service = ChatbotService(rasa_url=url, replica_urls=[])
+        service.context_window = 2
+        context = [{"user": f"q{i}", "bot": [f"r{i}"], "timestamp": "2024-01-01T00:00:00"} for i in range(3)]
+        await service.process_message("bonjour", context=context)
+        await service.close()
+    assert [t["user"] for t in fake.received[0]["metadata"]["context"]] == ["q1", "q2"]
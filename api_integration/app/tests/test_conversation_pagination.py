@@ -0,0 +1,241 @@
+"""
+Tests de la pagination par clé de l'historique (app/services/mongodb_service.py).
+Faux curseur Motor limité aux requêtes émises par le service.
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.services.conversation_archiver import ARCHIVE_COLLECTION, pack_conversation
+from app.services import mongodb_service as mongodb_service_module
+from app.services.mongodb_service import MongoDBService, decode_cursor, encode_cursor
+
+
+def _matches(document, query):
+    for key, condition in query.items():
+        if key == '$or':
+            if not any(_matches(document, sub) for sub in condition):
+                return False
+            continue
+        value = document
+        for part in key.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        if isinstance(condition, dict) and '$exists' in condition:
+            if (value is not None) != condition['$exists']:
+                return False
+        elif isinstance(condition, dict) and '$in' in condition:
+            if value not in condition['$in']:
+                return False
+        elif isinstance(condition, dict):
+            if not value < condition['$lt']:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys, direction=None):
+        if direction is not None:
+            keys = [(keys, direction)]
+        for key, direction in reversed(keys):
+            self.documents.sort(key=lambda d: d['metadata']['updated_at'] if key == 'metadata.updated_at' else d[key],
+                                reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.documents = self.documents[:n]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length):
+        return self.documents[:length]
+
+    def __aiter__(self):
+        self._iter = iter(self.documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.queries = 0
+
+    async def find_one(self, query, projection=None):
+        self.queries += 1
+        return next((d for d in self.documents if _matches(d, query)), None)
+
+    def find(self, query, projection=None):
+        self.queries += 1
+        found = [dict(d) for d in self.documents if _matches(d, query)]
+        if projection and isinstance(projection.get('messages'), dict):
+            for d in found:
+                if 'messages' in d:
+                    d['messages'] = d['messages'][projection['messages']['$slice']:]
+        return FakeCursor(found)
+
+    async def insert_one(self, document):
+        self.documents.append(document)
+        return SimpleNamespace(inserted_id=document['_id'])
+
+    async def insert_many(self, documents):
+        self.documents.extend(documents)
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        document = next((d for d in self.documents if _matches(d, query)), None)
+        if document is not None:
+            for key, value in update['$inc'].items():
+                document[key] = document.get(key, 0) + value
+            document['metadata']['updated_at'] = update['$set']['metadata.updated_at']
+        return document
+
+    async def update_one(self, query, update, upsert=False):
+        document = next((d for d in self.documents if _matches(d, query)), None)
+        if document is None:
+            document = {**query, 'messages': [], 'count': 0}
+            self.documents.append(document)
+        document['messages'].append(update['$push']['messages'])
+        document['count'] += 1
+
+
+class FakeDB:
+    def __init__(self, hot, archived=()):
+        self.conversations = FakeCollection(hot)
+        self.conversation_buckets = FakeCollection([])
+        self.archive = FakeCollection(list(archived))
+
+    def __getitem__(self, name):
+        assert name == ARCHIVE_COLLECTION
+        return self.archive
+
+
+def make_documents():
+    start = datetime(2024, 1, 1)
+    documents = []
+    for i in range(25):
+        documents.append({
+            '_id': ObjectId(),
+            'user_id': 'alice',
+            # Dates en double pour vérifier le départage par _id
+            'metadata': {'created_at': start, 'updated_at': start + timedelta(minutes=i // 2)},
+            'messages': [{'role': 'user', 'content': f'{i}-{n}'} for n in range(3)],
+        })
+    documents.append({**documents[0], '_id': ObjectId(), 'user_id': 'bob'})
+    return documents
+
+
+@pytest.fixture
+def service():
+    svc = MongoDBService()
+    svc.db = FakeDB(make_documents())
+    return svc
+
+
+@pytest.fixture
+def archived_service():
+    # Les plus anciennes et une conversation sur trois sont archivées
+    documents = make_documents()
+    archived = [d for i, d in enumerate(documents) if i < 8 or i % 3 == 0]
+    hot = [d for d in documents if d not in archived]
+    svc = MongoDBService()
+    svc.db = FakeDB(hot, [pack_conversation(d, datetime(2024, 6, 1)) for d in archived])
+    return svc
+
+
+async def _all_pages(service, limit, view='full'):
+    seen, cursor = [], None
+    while True:
+        page, cursor = await service.get_user_conversations_page('alice', limit=limit, cursor=cursor, view=view)
+        seen.extend(page)
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fixture', ['service', 'archived_service'])
+async def test_pages_cover_history_without_duplicates(fixture, request):
+    seen = await _all_pages(request.getfixturevalue(fixture), limit=10)
+    assert len(seen) == 25
+    assert len({d['_id'] for d in seen}) == 25
+    keys = [(d['metadata']['updated_at'], d['_id']) for d in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_summary_view_keeps_last_message(service):
+    page, _ = await service.get_user_conversations_page('alice', limit=1, view='summary')
+    assert len(page[0]['messages']) == 1
+    assert page[0]['messages'][0]['content'].endswith('-2')
+
+
+@pytest.mark.asyncio
+async def test_archived_conversations_are_restored(archived_service):
+    seen = await _all_pages(archived_service, limit=7, view='summary')
+    assert all(len(d['messages']) == 1 and d['user_id'] == 'alice' for d in seen)
+    assert len(seen) == 25
+
+
+@pytest.mark.asyncio
+async def test_stream_resumes_from_cursor(service):
+    first, cursor = await service.get_user_conversations_page('alice', limit=5)
+    rest = [d async for d in service.iter_user_conversations('alice', cursor=cursor)]
+    assert len(first) + len(rest) == 25
+    assert not {d['_id'] for d in first} & {d['_id'] for d in rest}
+
+
+@pytest.mark.asyncio
+async def test_chat_turns_left_in_the_collection_are_ignored(service):
+    # Échange du chatbot écrit avant scripts/migrate_chat_turns.py : pas de metadata
+    service.db.conversations.documents.append(
+        {'_id': ObjectId(), 'user_id': 'alice', 'message': 'bonjour', 'response': [], 'timestamp': datetime(2024, 2, 1)}
+    )
+    seen = await _all_pages(service, limit=10)
+    assert len(seen) == 25 and all('metadata' in d for d in seen)
+
+
+@pytest.mark.asyncio
+async def test_empty_archive_is_not_queried_when_archiving_is_off(service, monkeypatch):
+    monkeypatch.setattr(mongodb_service_module, 'ARCHIVE_ENABLED', False)
+    await _all_pages(service, limit=10)
+    await _all_pages(service, limit=10)
+    # Une seule vérification par processus, puis plus aucune requête sur l'archive
+    assert service.db.archive.queries == 1
+
+
+@pytest.mark.asyncio
+async def test_creation_and_appended_messages_share_the_buckets(service, monkeypatch):
+    monkeypatch.setattr(mongodb_service_module, 'CONVERSATION_BUCKET_SIZE', 2)
+    created = [{'role': 'user', 'content': f'création {i}', 'timestamp': datetime(2025, 1, 1)} for i in range(3)]
+    conversation_id = await service.save_conversation({'user_id': 'carol', 'messages': created})
+    stored = service.db.conversations.documents[-1]
+    assert 'messages' not in stored and stored['message_count'] == 3
+
+    # La numérotation continue après les messages de création
+    assert await service.append_message(conversation_id, {'role': 'bot', 'content': 'réponse'}) == 3
+    latest = await service.get_latest_messages(conversation_id, limit=10)
+    assert [m['content'] for m in latest] == ['création 0', 'création 1', 'création 2', 'réponse']
+
+    full, _ = await service.get_user_conversations_page('carol', view='full')
+    assert [m['content'] for m in full[0]['messages']] == [m['content'] for m in latest]
+    summary, _ = await service.get_user_conversations_page('carol', view='summary')
+    assert [m['content'] for m in summary[0]['messages']] == ['réponse']
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    document = {'_id': ObjectId(), 'metadata': {'updated_at': datetime(2024, 5, 1, 8, 30)}}
+    assert decode_cursor(encode_cursor(document)) == (document['metadata']['updated_at'], document['_id'])
+    with pytest.raises(ValueError):
+        decode_cursor('pas-un-curseur')
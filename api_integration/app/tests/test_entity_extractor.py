@@ -0,0 +1,69 @@
+"""
+Tests de l'extraction d'entités par automate d'Aho-Corasick (app/services/entity_extractor.py).
+"""
+import os
+
+from app.schemas.fraude_schema import TRANSACTION_TYPES
+from app.services.entity_extractor import EntityAutomaton, EntityExtractor, entity_extractor
+
+DICTIONARIES = {
+    "transaction_type": {"virement": ["transfert", "l virement"], "retrait": ["withdrawal"]},
+    "account_type": {"compte_courant": ["compte courant"], "compte_epargne": ["compte épargne"]},
+    "product": {"carte_visa": ["carte visa", "visa"]},
+}
+
+
+def values(automaton, text):
+    return [automaton.entities[i] for _, _, i in automaton.find(text)]
+
+
+def test_finds_all_entities_in_one_pass():
+    automaton = EntityAutomaton(DICTIONARIES)
+    text = "Un TRANSFERT du Compte Epargne vers le compte courant, puis un withdrawal Visa"
+    assert values(automaton, text) == [
+        ("transaction_type", "virement"),
+        ("account_type", "compte_epargne"),
+        ("account_type", "compte_courant"),
+        ("transaction_type", "retrait"),
+        ("product", "carte_visa"),
+    ]
+
+
+def test_whole_words_and_longest_match():
+    automaton = EntityAutomaton(DICTIONARIES)
+    assert values(automaton, "virements visas") == []
+    # "carte visa" l'emporte sur "visa", "l virement" sur "virement"
+    assert automaton.find("ma carte visa") == [(3, 13, 4)]
+    assert [(s, e) for s, e, _ in automaton.find("ndir l virement")] == [(5, 15)]
+
+
+def test_extractor_reports_positions():
+    entities = entity_extractor.get().extract("Je veux faire un virement depuis ma carte visa")
+    assert entities == [
+        {"entity": "transaction_type", "value": "virement", "text": "virement", "start": 17, "end": 25},
+        {"entity": "product", "value": "carte_visa", "text": "carte visa", "start": 36, "end": 46},
+    ]
+
+
+def test_transaction_types_match_fraude_request():
+    automaton = entity_extractor.get().automaton
+    transaction_types = {value for entity, value in automaton.entities if entity == "transaction_type"}
+    assert transaction_types == set(TRANSACTION_TYPES)
+
+
+def test_hot_reload_and_invalid_file(tmp_path):
+    path = tmp_path / "entities.yaml"
+    path.write_text("entities:\n  product:\n    carte_visa: [visa]\n", encoding="utf-8")
+    extractor = EntityExtractor(str(path), reload_interval=0)
+    assert extractor.extract("gold") == []
+
+    path.write_text("entities:\n  product:\n    carte_gold: [gold]\n", encoding="utf-8")
+    os.utime(path, (0, extractor._mtime + 1))
+    assert [e["value"] for e in extractor.extract("gold")] == ["carte_gold"]
+    assert extractor.stats()["reloads"] == 2
+
+    # Fichier invalide : l'automate précédent reste en service
+    path.write_text("entities: [", encoding="utf-8")
+    os.utime(path, (0, extractor._mtime + 1))
+    assert [e["value"] for e in extractor.extract("gold")] == ["carte_gold"]
+    assert extractor.stats()["reload_errors"] == 1
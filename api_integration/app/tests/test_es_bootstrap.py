@@ -0,0 +1,64 @@
+"""
+Tests pour l'initialisation du data stream de logs (app/logging/es_bootstrap.py).
+Le client Elasticsearch est simulé : aucun appel réseau.
+"""
+from unittest.mock import MagicMock
+from elasticsearch import BadRequestError, NotFoundError
+
+from app.logging import es_bootstrap
+from app.config import LOG_INDEX, LOG_ILM_POLICY
+
+
+def make_api_error(error_type: str, error_class=BadRequestError, status=400):
+    meta = MagicMock(status=status)
+    return error_class(message=error_type, meta=meta, body={"error": {"type": error_type}})
+
+
+def test_bootstrap_creates_policy_template_and_stream():
+    es = MagicMock()
+    assert es_bootstrap.bootstrap_log_stream(es) is True
+
+    es.ilm.put_lifecycle.assert_called_once()
+    assert es.ilm.put_lifecycle.call_args.kwargs["name"] == LOG_ILM_POLICY
+
+    template = es.indices.put_index_template.call_args.kwargs
+    assert template["data_stream"] == {}
+    assert template["template"]["settings"]["index.lifecycle.name"] == LOG_ILM_POLICY
+    es.indices.create_data_stream.assert_called_once_with(name=LOG_INDEX)
+
+
+def test_bootstrap_is_idempotent_when_stream_exists():
+    es = MagicMock()
+    es.indices.create_data_stream.side_effect = make_api_error("resource_already_exists_exception")
+    es.indices.get_data_stream.return_value = {"data_streams": [{"name": LOG_INDEX}]}
+    assert es_bootstrap.bootstrap_log_stream(es) is True
+
+
+def test_bootstrap_fails_on_legacy_concrete_index():
+    # L'ancienne version écrivait dans un index concret du même nom
+    es = MagicMock()
+    es.indices.create_data_stream.side_effect = make_api_error("resource_already_exists_exception")
+    es.indices.get_data_stream.side_effect = make_api_error("index_not_found_exception", NotFoundError, 404)
+    assert es_bootstrap.bootstrap_log_stream(es) is False
+
+
+def test_replicas_are_configurable(monkeypatch):
+    monkeypatch.setattr(es_bootstrap, "LOG_NUMBER_OF_REPLICAS", 2)
+    assert es_bootstrap.build_index_template()["template"]["settings"]["number_of_replicas"] == 2
+
+
+def test_bootstrap_reports_other_errors():
+    es = MagicMock()
+    es.indices.create_data_stream.side_effect = make_api_error("illegal_argument_exception")
+    assert es_bootstrap.bootstrap_log_stream(es) is False
+
+
+def test_mappings_are_explicit_for_decision_fields():
+    properties = es_bootstrap.LOG_MAPPINGS["properties"]
+    assert es_bootstrap.LOG_MAPPINGS["dynamic"] is False
+    assert properties["client_id"]["type"] == "keyword"
+    assert properties["risque"]["type"] == "float"
+    assert properties["score"]["type"] == "float"
+    assert properties["alert"]["type"] == "boolean"
+    assert properties["decision"]["type"] == "keyword"
+    assert properties["@timestamp"]["type"] == "date"
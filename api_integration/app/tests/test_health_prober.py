@@ -0,0 +1,150 @@
+"""
+Tests des sondes de santé en arrière-plan (app/services/health_prober.py).
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from elasticsearch import Elasticsearch
+
+from app.config import HEALTH_CRITICAL_SERVICES
+from app.security.keycloak_client import AsyncKeycloakClient
+from app.services import health_prober as health_module
+from app.services.chatbot_service import ChatbotService
+from app.services.health_prober import HealthProber
+from app.services.mongodb_client import MongoClientFactory
+from app.tests.fake_keycloak import FakeKeycloak
+from app.tests.fake_rasa import FakeRasa
+
+
+def make_check(result=True, delay=0.0, error=None):
+    async def check():
+        if delay:
+            await asyncio.sleep(delay)
+        if error:
+            raise error
+        return result
+    return check
+
+
+@pytest.mark.asyncio
+async def test_checks_run_concurrently_with_timeout():
+    prober = HealthProber(interval=10, timeout=0.1, critical=["mongodb"])
+    prober.register("mongodb", make_check(delay=0.05))
+    prober.register("rasa", make_check(delay=0.05))
+    prober.register("elasticsearch", make_check(delay=1))
+
+    start = time.perf_counter()
+    results = await prober.probe_once()
+    assert time.perf_counter() - start < 0.2
+
+    assert results["mongodb"]["ok"] and results["rasa"]["ok"]
+    assert results["elasticsearch"]["ok"] is False
+    assert results["elasticsearch"]["error"] == "timeout (0.1s)"
+    snapshot = prober.snapshot()
+    # Elasticsearch n'est pas critique : dégradé mais prêt
+    assert snapshot["status"] == "degraded" and snapshot["ready"] is True
+
+
+@pytest.mark.asyncio
+async def test_not_ready_before_first_probe_on_critical_failure_or_when_stale():
+    prober = HealthProber(interval=10, timeout=0.1, critical=["mongodb"], stale_after=0.05)
+    prober.register("mongodb", make_check(error=ConnectionError("refused")))
+    assert prober.snapshot()["status"] == "starting" and not prober.ready
+
+    await prober.probe_once()
+    assert prober.snapshot()["services"]["mongodb"]["error"] == "refused"
+    assert not prober.ready
+
+    prober.register("mongodb", make_check())
+    await prober.probe_once()
+    assert prober.ready
+    await asyncio.sleep(0.06)
+    assert prober.snapshot()["status"] == "stale" and not prober.ready
+
+
+@pytest.mark.asyncio
+async def test_background_loop_refreshes_cache():
+    calls = []
+
+    async def check():
+        calls.append(1)
+        return True
+
+    prober = HealthProber(interval=0.01, timeout=0.1, critical=["rasa"])
+    prober.register("rasa", check)
+    prober.start()
+    await asyncio.sleep(0.05)
+    await prober.close()
+    assert len(calls) >= 2
+    assert prober.stats()["running"] is False
+
+
+@pytest.mark.asyncio
+async def test_rasa_ping_accepts_any_healthy_replica():
+    down, up = FakeRasa(), FakeRasa()
+    down.status = 503
+    async with down.serve() as down_url, up.serve() as up_url:
+        service = ChatbotService(rasa_url=down_url, replica_urls=[up_url])
+        assert await service.ping() is True
+        up.status = 503
+        assert await service.ping() is False
+        await service.close()
+
+
+@pytest.mark.asyncio
+async def test_registered_checks_probe_the_real_clients(monkeypatch):
+    # Sondes enregistrées sur le singleton, clients réels : Keycloak et Rasa simulés,
+    # MongoDB et Elasticsearch injoignables (port fermé)
+    keycloak, rasa = FakeKeycloak(), FakeRasa()
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=keycloak.app))
+    monkeypatch.setattr(health_module, "KEYCLOAK_ISSUER", keycloak.issuer)
+    client = AsyncKeycloakClient(issuer=keycloak.issuer, http_client=http)
+    monkeypatch.setattr(health_module, "keycloak_async_client", client)
+    mongo = MongoClientFactory(uri="mongodb://127.0.0.1:1/", server_selection_timeout_ms=100)
+    monkeypatch.setattr(health_module, "mongo_client_factory", mongo)
+    es = Elasticsearch("http://127.0.0.1:1", request_timeout=0.2, max_retries=0)
+    monkeypatch.setattr(health_module, "es_provider", SimpleNamespace(get=lambda: es))
+
+    async with rasa.serve() as url:
+        service = ChatbotService(rasa_url=url, replica_urls=[])
+        monkeypatch.setattr(health_module, "chatbot_service", service)
+        prober = HealthProber(interval=10, timeout=1)
+        for name, check in health_module.health_prober._checks.items():
+            prober.register(name, check)
+        results = await prober.probe_once()
+        await service.close()
+    await http.aclose()
+    mongo.close()
+
+    assert set(results) == {"elasticsearch", "keycloak", "mongodb", "rasa"}
+    assert results["keycloak"]["ok"] and results["rasa"]["ok"]
+    # Erreur du driver (sélection du serveur), pas d'erreur de programmation dans la sonde
+    assert results["mongodb"]["ok"] is False and "127.0.0.1:1" in results["mongodb"]["error"]
+    assert results["elasticsearch"]["ok"] is False
+    # Par défaut seul Keycloak est critique : MongoDB et Elasticsearch en panne, l'instance reste prête
+    assert HEALTH_CRITICAL_SERVICES == ["keycloak"]
+    assert prober.snapshot()["status"] == "degraded" and prober.ready
+
+
+@pytest.mark.asyncio
+async def test_elasticsearch_ping_is_bounded_by_the_probe_timeout(monkeypatch):
+    # Serveur qui accepte la connexion sans jamais répondre : le thread du ping doit se terminer
+    # de lui-même (timeout client par défaut : 10 s, avec relances)
+    async def hang(reader, writer):
+        await reader.read()
+
+    server = await asyncio.start_server(hang, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    es = Elasticsearch(f"http://127.0.0.1:{port}")
+    monkeypatch.setattr(health_module, "es_provider", SimpleNamespace(get=lambda: es))
+    monkeypatch.setattr(health_module.health_prober, "timeout", 0.2)
+
+    start = time.monotonic()
+    try:
+        assert await asyncio.wait_for(health_module.check_elasticsearch(), timeout=5) is False
+    finally:
+        server.close()
+    assert time.monotonic() - start < 2
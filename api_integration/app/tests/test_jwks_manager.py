@@ -0,0 +1,105 @@
+"""
+Tests du cache JWKS (app/auth/jwks_manager.py).
+Le endpoint JWKS est simulé en patchant requests.get : aucun appel réseau.
+"""
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk
+
+from app.auth import jwks_manager as jwks_module
+from app.auth.jwks_manager import JWKSManager, JWKSUnavailableError
+
+
+def make_jwk(kid: str) -> dict:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public = jwk.RSAKey(private_key.public_key(), "RS256").to_dict()
+    public.update({"kid": kid, "use": "sig"})
+    return public
+
+
+@pytest.fixture
+def fake_jwks(monkeypatch):
+    """Remplace requests.get ; `state["keys"]` contient les clés publiées."""
+    state = {"keys": [make_jwk("k1")], "calls": 0, "delay": 0.0, "fail": False}
+
+    def fake_get(url, timeout=None):
+        state["calls"] += 1
+        time.sleep(state["delay"])
+        if state["fail"]:
+            raise ConnectionError("keycloak down")
+        response = MagicMock()
+        response.json.return_value = {"keys": list(state["keys"])}
+        return response
+
+    monkeypatch.setattr(jwks_module.requests, "get", fake_get)
+    return state
+
+
+@pytest.fixture
+def manager():
+    m = JWKSManager(jwks_url="http://keycloak.test/certs", ttl=60, min_refetch_interval=60)
+    yield m
+    m.close()
+
+
+def test_fetch_is_lazy_and_cached(fake_jwks, manager):
+    assert fake_jwks["calls"] == 0
+    key = manager.get_key("k1")
+    assert manager.get_key("k1") is key
+    assert fake_jwks["calls"] == 1
+
+
+def test_unknown_kid_triggers_single_rate_limited_refetch(fake_jwks, manager):
+    manager.get_key("k1")
+    manager.min_refetch_interval = 0
+    fake_jwks["keys"].append(make_jwk("k2"))
+    assert manager.get_key("k2") is not None
+    assert fake_jwks["calls"] == 2
+
+    manager.min_refetch_interval = 60
+    with pytest.raises(KeyError):
+        manager.get_key("inconnu")
+    assert fake_jwks["calls"] == 2
+
+
+def test_concurrent_requests_share_one_fetch(fake_jwks, manager):
+    fake_jwks["delay"] = 0.2
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(manager.get_key("k1"))) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 10
+    assert fake_jwks["calls"] == 1
+
+
+def test_stale_keys_are_served_when_refresh_fails(fake_jwks, manager):
+    key = manager.get_key("k1")
+    fake_jwks["fail"] = True
+    manager._expires_at = 0
+    manager.min_refetch_interval = 0
+    assert manager.get_key("k1") is key
+
+
+def test_unavailable_without_any_key(fake_jwks, manager):
+    fake_jwks["fail"] = True
+    with pytest.raises(JWKSUnavailableError):
+        manager.get_key("k1")
+
+
+def test_waiting_on_a_stuck_fetch_reports_unavailable(fake_jwks, manager):
+    manager.http_timeout = 0.05
+    fake_jwks["delay"] = 0.5
+    owner = threading.Thread(target=manager.prefetch)
+    owner.start()
+    time.sleep(0.02)
+    # Le second appelant attend 2 x http_timeout puis abandonne : 503, pas 500
+    with pytest.raises(JWKSUnavailableError):
+        manager.get_key("k1")
+    owner.join()
+    assert manager.get_key("k1") is not None
@@ -0,0 +1,100 @@
+"""
+Tests de l'introspection Keycloak asynchrone (app/security/keycloak_client.py)
+contre le faux Keycloak local (app/tests/fake_keycloak.py).
+"""
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.security.keycloak_client import AsyncKeycloakClient, KeycloakUnavailableError
+from app.tests.fake_keycloak import FakeKeycloak
+
+
+@pytest.fixture
+def fake_keycloak():
+    return FakeKeycloak(latency=0.05)
+
+
+@pytest_asyncio.fixture
+async def client(fake_keycloak):
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_keycloak.app))
+    client = AsyncKeycloakClient(issuer=fake_keycloak.issuer, http_client=http)
+    yield client
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_active_token_is_cached_until_expiry(fake_keycloak, client):
+    fake_keycloak.add_token("opaque-1", roles=["analyst"])
+    for _ in range(5):
+        assert await client.get_roles("opaque-1") == ["analyst"]
+    assert fake_keycloak.calls["introspect"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalid_token_is_negatively_cached(fake_keycloak, client):
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            await client.introspect_token("inconnu")
+    assert fake_keycloak.calls["introspect"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_are_deduplicated(fake_keycloak, client):
+    fake_keycloak.add_token("opaque-2", roles=["admin"])
+    results = await asyncio.gather(*(client.introspect_token("opaque-2") for _ in range(20)))
+    assert all(r["sub"] == "user" for r in results)
+    assert fake_keycloak.calls["introspect"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_not_cached(fake_keycloak, client):
+    fake_keycloak.add_token("opaque-3", expires_in=1)
+    await client.introspect_token("opaque-3")
+    await client.introspect_token("opaque-3")
+    assert fake_keycloak.calls["introspect"] == 2
+
+
+@pytest.mark.asyncio
+async def test_keycloak_errors_are_not_invalid_tokens(fake_keycloak, client):
+    fake_keycloak.introspect_status = 500
+    with pytest.raises(KeycloakUnavailableError):
+        await client.introspect_token("opaque-4")
+    # Pas de cache négatif : le token sera réévalué quand Keycloak répondra
+    fake_keycloak.introspect_status = 200
+    fake_keycloak.add_token("opaque-4")
+    assert (await client.introspect_token("opaque-4"))["active"] is True
+
+
+@pytest.mark.asyncio
+async def test_rbac_routes_accept_opaque_tokens(fake_keycloak, client, monkeypatch):
+    from fastapi import Depends, FastAPI
+
+    from app.auth import auth_handler
+    from app.auth.rbac import require_policy
+
+    monkeypatch.setattr(auth_handler, "keycloak_async_client", client)
+    app = FastAPI()
+
+    @app.get("/score", dependencies=[Depends(require_policy("score"))])
+    async def score():
+        return {"ok": True}
+
+    fake_keycloak.add_token("opaque-analyst", roles=["analyst"])
+    fake_keycloak.add_token("opaque-viewer", roles=["viewer"])
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as http:
+        async def get(token):
+            return (await http.get("/score", headers={"Authorization": f"Bearer {token}"})).status_code
+
+        assert await get("opaque-analyst") == 200
+        assert await get("opaque-viewer") == 403
+        assert await get("opaque-inconnu") == 401
+        # Token actif mais émis pour un autre client : refusé comme un JWT d'une autre audience
+        fake_keycloak.add_token("opaque-autre-api", roles=["analyst"], aud="autre-api", azp="autre-api")
+        assert await get("opaque-autre-api") == 401
+        fake_keycloak.add_token("opaque-azp", roles=["analyst"], aud="account", azp=auth_handler.KEYCLOAK_CLIENT_ID)
+        assert await get("opaque-azp") == 200
+        fake_keycloak.introspect_status = 401  # identifiants client refusés
+        assert await get("opaque-nouveau") == 503
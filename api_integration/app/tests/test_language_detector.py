@@ -0,0 +1,69 @@
+"""
+Tests du détecteur de langue par trigrammes (app/services/language_detector.py).
+"""
+from array import array
+
+import pytest
+
+from app.config import LANGUAGE_PROFILES_PATH
+from app.services.language_detector import LanguageDetector, language_detector, load_language_detector
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Bonjour, je n'arrive pas à me connecter à mon compte.", "fr"),
+    ("Hello, I can't log in to my account.", "en"),
+    ("Hola, no puedo entrar en mi cuenta.", "es"),
+    ("مرحبا، لا أستطيع الدخول إلى حسابي.", "ar"),
+    ("salam, ma 9dertch ndkhol l compte dyali.", "darija"),
+])
+def test_detects_supported_languages(text, expected):
+    assert language_detector.get().detect(text) == expected
+
+
+def test_unknown_or_empty_text_falls_back_to_default():
+    assert language_detector.get().detect("") == "fr"
+    assert language_detector.get().detect("?!… 👍") == "fr"
+    assert language_detector.get().scores("") is None
+
+
+def test_profiles_are_compact_arrays():
+    detector = language_detector.get()
+    assert isinstance(detector.codes, array) and detector.codes.typecode == "Q"
+    assert isinstance(detector.weights, array) and detector.weights.typecode == "B"
+    assert len(detector.weights) == len(detector.codes) * len(detector.languages)
+
+
+def test_long_messages_are_scored_on_a_bounded_prefix():
+    detector = LanguageDetector.train({"aa": ["aaaa"], "bb": ["bbbb"]})
+    assert detector.detect("a" * 100_000) == "aa"
+    assert max(detector.scores("b" * 100_000).values()) <= 255
+
+
+def test_saved_profiles_round_trip(tmp_path):
+    detector = LanguageDetector.train({"aa": ["aaaa", "abab"], "bb": ["bbbb"]})
+    path = str(tmp_path / "profiles.bin")
+    detector.save(path)
+    loaded = LanguageDetector.load(path)
+    assert loaded.languages == detector.languages
+    assert loaded.codes == detector.codes and loaded.weights == detector.weights
+    assert loaded.scores("abba") == detector.scores("abba")
+
+
+def test_shipped_profiles_match_the_corpus():
+    # Un corpus modifié sans relancer scripts/build_language_profiles.py ferait échouer ce test
+    shipped = LanguageDetector.load(LANGUAGE_PROFILES_PATH)
+    trained = LanguageDetector.from_corpus()
+    assert shipped.languages == trained.languages
+    assert shipped.codes == trained.codes and shipped.weights == trained.weights
+
+
+def test_invalid_profiles_file_is_rejected(tmp_path):
+    path = tmp_path / "profiles.bin"
+    path.write_bytes(b"pas un fichier de profils")
+    with pytest.raises(ValueError):
+        LanguageDetector.load(str(path))
+
+
+def test_missing_profiles_fall_back_to_training(tmp_path):
+    detector = load_language_detector(str(tmp_path / "absent.bin"))
+    assert detector.detect("Hello, I can't log in to my account.") == "en"
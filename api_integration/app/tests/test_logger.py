@@ -62,6 +62,8 @@ def test_logger_emit_called_on_info(monkeypatch):
     """
     logger = getattr(elk_logger, "logger", None)
     assert logger is not None, "Module elk_logger n'expose pas 'logger'"
+    # Le handler ELK est branché au démarrage (lifespan), pas à l'import
+    elk_logger.elk_handler.get()
 
     # Choisir un handler sur lequel patcher emit
     target_handler = None
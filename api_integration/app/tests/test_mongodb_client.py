@@ -0,0 +1,67 @@
+"""
+Tests du client MongoDB partagé (app/services/mongodb_client.py).
+Aucun serveur requis : le client Motor se connecte paresseusement.
+"""
+from types import SimpleNamespace
+
+from app.services.mongodb_client import MongoClientFactory, PoolStatsListener
+
+
+def test_pool_listener_tracks_connections():
+    listener = PoolStatsListener()
+    event = SimpleNamespace()
+    listener.connection_created(event)
+    listener.connection_created(event)
+    listener.connection_checked_out(event)
+    listener.connection_checked_in(event)
+    listener.connection_checked_out(event)
+    listener.connection_closed(event)
+    listener.connection_check_out_failed(event)
+
+    stats = listener.stats()
+    assert stats["open"] == 1
+    assert stats["in_use"] == 1
+    assert stats["checked_out"] == 2
+    assert stats["checkout_failures"] == 1
+
+
+def test_factory_builds_a_single_tuned_client():
+    factory = MongoClientFactory(
+        uri="mongodb://localhost:27017/?authSource=admin",
+        database="chatbot_db",
+        max_pool_size=20,
+        min_pool_size=2,
+        compressors="zlib",
+    )
+    try:
+        client = factory.client
+        assert factory.client is client
+        assert client.options.pool_options.max_pool_size == 20
+        assert client.options.pool_options.min_pool_size == 2
+        assert factory.get_database().name == "chatbot_db"
+        assert factory.get_database("autre").client is client
+        assert factory.stats()["connected"] is True
+    finally:
+        factory.close()
+    assert factory.stats()["connected"] is False
+
+
+def test_default_client_is_built_from_config(monkeypatch):
+    from pymongo.uri_parser import parse_uri
+
+    from app.services import mongodb_client
+
+    monkeypatch.setattr(mongodb_client, "MONGODB_USERNAME", "api@user")
+    monkeypatch.setattr(mongodb_client, "MONGODB_PASSWORD", "p:ss/word")
+    parsed = parse_uri(mongodb_client._default_uri())
+    assert (parsed["username"], parsed["password"]) == ("api@user", "p:ss/word")
+    assert parsed["nodelist"] == [(mongodb_client.MONGODB_HOST, mongodb_client.MONGODB_PORT)]
+    assert parsed["options"].get("authSource") == mongodb_client.MONGODB_AUTH_SOURCE
+
+    factory = MongoClientFactory()
+    try:
+        # Le singleton de l'application passe par ce chemin (aucun uri fourni)
+        assert factory.client.options.pool_options.max_pool_size == factory.options["maxPoolSize"]
+        assert factory.get_database().name == mongodb_client.MONGODB_DATABASE
+    finally:
+        factory.close()
@@ -0,0 +1,116 @@
+"""
+Tests de la création idempotente des index MongoDB (app/services/mongodb_indexes.py).
+"""
+import pytest
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.services.mongodb_indexes import INDEXES, ensure_indexes
+
+
+class FakeCollection:
+    def __init__(self):
+        self.indexes = {"_id_": {"key": [("_id", 1)]}}
+        self.dropped = []
+        self.duplicates = False
+        self.fail_on = set()
+
+    async def index_information(self):
+        return {name: dict(info) for name, info in self.indexes.items()}
+
+    async def create_indexes(self, models):
+        for model in models:
+            spec = model.document
+            if spec["name"] in self.fail_on:
+                raise OperationFailure("E11000 duplicate key error")
+            info = {"key": list(spec["key"].items())}
+            if spec.get("unique"):
+                info["unique"] = True
+            self.indexes[spec["name"]] = info
+
+    def aggregate(self, pipeline, **kwargs):
+        found = [{"_id": "doublon", "count": 2}] if self.duplicates else []
+
+        class Cursor:
+            async def to_list(self, length=None):
+                return found
+        return Cursor()
+
+    async def drop_index(self, name):
+        self.dropped.append(name)
+        del self.indexes[name]
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+@pytest.mark.asyncio
+async def test_indexes_are_created_once():
+    db = FakeDatabase()
+    created = await ensure_indexes(db)
+    assert sorted(created) == sorted(m.document["name"] for models in INDEXES.values() for m in models)
+    assert db["users"].indexes["username_unique"]["unique"] is True
+    assert db["conversations"].indexes["user_id_updated_at"]["key"] == [
+        ("user_id", 1), ("metadata.updated_at", -1), ("_id", -1)
+    ]
+
+    # Deuxième démarrage : rien à faire
+    assert await ensure_indexes(db) == []
+
+
+@pytest.mark.asyncio
+async def test_legacy_index_on_same_keys_is_replaced():
+    db = FakeDatabase()
+    # Index historique non unique créé à la main
+    db["users"].indexes["username_1"] = {"key": [("username", 1)]}
+
+    created = await ensure_indexes(db, {"users": [INDEXES["users"][0]]})
+    assert created == ["username_unique"]
+    assert db["users"].dropped == ["username_1"]
+    assert "username_1" not in db["users"].indexes
+
+
+@pytest.mark.asyncio
+async def test_index_with_changed_options_is_rebuilt():
+    db = FakeDatabase()
+    await ensure_indexes(db, {"users": [IndexModel([("username", ASCENDING)], name="username_unique")]})
+
+    created = await ensure_indexes(db, {"users": [INDEXES["users"][0]]})
+    assert created == ["username_unique"]
+    assert db["users"].indexes["username_unique"]["unique"] is True
+
+
+@pytest.mark.asyncio
+async def test_index_with_changed_keys_is_rebuilt():
+    db = FakeDatabase()
+    db["conversations"].indexes["user_id_updated_at"] = {"key": [("user_id", 1), ("metadata.updated_at", -1)]}
+
+    created = await ensure_indexes(db, {"conversations": INDEXES["conversations"][:1]})
+    assert created == ["user_id_updated_at"]
+    assert db["conversations"].indexes["user_id_updated_at"]["key"][-1] == ("_id", -1)
+
+
+@pytest.mark.asyncio
+async def test_unique_rebuild_is_skipped_when_duplicates_exist():
+    db = FakeDatabase()
+    db["users"].indexes["username_1"] = {"key": [("username", 1)]}
+    db["users"].duplicates = True
+
+    assert await ensure_indexes(db, {"users": [INDEXES["users"][0]]}) == []
+    assert db["users"].dropped == []
+    assert "username_1" in db["users"].indexes
+
+
+@pytest.mark.asyncio
+async def test_dropped_index_is_restored_when_creation_fails():
+    db = FakeDatabase()
+    db["users"].indexes["username_1"] = {"key": [("username", 1)], "v": 2}
+    db["users"].fail_on.add("username_unique")
+
+    assert await ensure_indexes(db, {"users": [INDEXES["users"][0]]}) == []
+    assert db["users"].dropped == ["username_1"]
+    assert db["users"].indexes["username_1"]["key"] == [("username", 1)]
+    assert "username_unique" not in db["users"].indexes
@@ -0,0 +1,116 @@
+"""
+Tests du pool bcrypt dédié (app/auth/password_hasher.py).
+Coûts bcrypt réduits (4-5) pour garder les tests rapides.
+"""
+import asyncio
+
+import pytest
+
+from app.auth.password_hasher import PasswordHasher, PasswordHasherBusyError
+
+
+@pytest.fixture
+def hasher():
+    h = PasswordHasher(rounds=5, max_workers=1, max_pending=4, queue_timeout=1)
+    yield h
+    h.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify(hasher):
+    hashed = await hasher.hash("secret")
+    assert await hasher.verify("secret", hashed)
+    assert not await hasher.verify("autre", hashed)
+
+
+@pytest.mark.asyncio
+async def test_rehash_when_cost_changes(hasher):
+    old = PasswordHasher(rounds=4, max_workers=1)
+    old_hash = old.context.hash("secret")
+    old.shutdown()
+
+    valid, new_hash = await hasher.verify_and_update("secret", old_hash)
+    assert valid
+    assert new_hash is not None and new_hash.startswith("$2b$05$")
+
+    valid, new_hash = await hasher.verify_and_update("secret", await hasher.hash("secret"))
+    assert valid and new_hash is None
+
+
+@pytest.mark.asyncio
+async def test_event_loop_keeps_running_during_verification():
+    hasher = PasswordHasher(rounds=10, max_workers=1)
+    hashed = hasher.context.hash("secret")
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    task = asyncio.create_task(ticker())
+    assert await hasher.verify("secret", hashed)
+    task.cancel()
+    hasher.shutdown()
+    assert ticks > 5
+
+
+@pytest.mark.asyncio
+async def test_queue_is_bounded():
+    hasher = PasswordHasher(rounds=10, max_workers=1, max_pending=1, queue_timeout=0.01)
+    hashed = hasher.context.hash("secret")
+    results = await asyncio.gather(
+        hasher.verify("secret", hashed),
+        hasher.verify("secret", hashed),
+        return_exceptions=True,
+    )
+    hasher.shutdown()
+    assert any(isinstance(r, PasswordHasherBusyError) for r in results)
+
+
+class FakeUsersCollection:
+    def __init__(self, document):
+        self.document = document
+        self.updates = []
+
+    async def find_one(self, query):
+        return dict(self.document) if query["username"] == self.document["username"] else None
+
+    async def update_one(self, query, update):
+        self.updates.append((query, update))
+        self.document.update(update["$set"])
+
+
+@pytest.mark.asyncio
+async def test_login_rewrites_hash_with_outdated_cost(hasher, monkeypatch):
+    from types import SimpleNamespace
+
+    from app.auth import auth_utils
+    from app.auth.principal_cache import CachedPrincipal, PrincipalCache
+
+    old = PasswordHasher(rounds=4, max_workers=1)
+    users = FakeUsersCollection({"username": "alice", "hashed_password": old.context.hash("secret")})
+    old.shutdown()
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    cache.set("alice", "t1", CachedPrincipal(user="alice", has_access=True))
+
+    async def get_database():
+        return SimpleNamespace(users=users)
+
+    monkeypatch.setattr(auth_utils, "password_hasher", hasher)
+    monkeypatch.setattr(auth_utils, "principal_cache", cache)
+    monkeypatch.setattr(auth_utils.mongodb_auth, "get_database", get_database)
+
+    assert await auth_utils.authenticate_user("alice", "mauvais") is None
+    assert users.updates == []
+
+    user = await auth_utils.authenticate_user("alice", "secret")
+    assert user.username == "alice"
+    assert user.hashed_password.startswith("$2b$05$")
+    assert users.document["hashed_password"] == user.hashed_password
+    assert cache.get("alice", "t1") is None
+
+    # Hash à jour : plus de réécriture
+    await auth_utils.authenticate_user("alice", "secret")
+    assert len(users.updates) == 1
@@ -0,0 +1,42 @@
+"""
+Tests du cache des utilisateurs authentifiés (app/auth/principal_cache.py).
+"""
+from app.auth.principal_cache import CachedPrincipal, PrincipalCache
+
+
+def test_principal_is_cached_per_user_and_token():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    principal = CachedPrincipal(user={"username": "alice"}, has_access=True)
+    cache.set("alice", "token-1", principal)
+    assert cache.get("alice", "token-1") is principal
+    assert cache.get("alice", "token-2") is None
+
+
+def test_invalidate_user_drops_every_token_of_that_user():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    cache.set("alice", "token-1", CachedPrincipal(user="alice", has_access=True))
+    cache.set("alice", "token-2", CachedPrincipal(user="alice", has_access=True))
+    cache.set("bob", "token-3", CachedPrincipal(user="bob", has_access=True))
+
+    cache.invalidate_user("alice")
+    assert cache.get("alice", "token-1") is None
+    assert cache.get("alice", "token-2") is None
+    assert cache.get("bob", "token-3") is not None
+
+
+def test_entries_expire_after_ttl():
+    cache = PrincipalCache(maxsize=10, ttl=-1)
+    cache.set("alice", "token-1", CachedPrincipal(user="alice", has_access=True))
+    assert cache.get("alice", "token-1") is None
+
+
+def test_fill_started_before_invalidation_is_dropped():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    version = cache.version
+    # Lecture Mongo en cours... pendant ce temps l'utilisateur est modifié
+    cache.invalidate_user("alice")
+    cache.set("alice", "token-1", CachedPrincipal(user="ancien", has_access=True), version=version)
+    assert cache.get("alice", "token-1") is None
+
+    cache.set("alice", "token-1", CachedPrincipal(user="nouveau", has_access=True), version=cache.version)
+    assert cache.get("alice", "token-1").user == "nouveau"
@@ -0,0 +1,69 @@
+"""
+Tests du moteur RBAC précompilé (app/auth/policy.py, app/auth/rbac.py).
+"""
+import pytest
+from fastapi import HTTPException
+
+from app.auth.auth_handler import Principal
+from app.auth.policy import RolePolicy, role_policy
+from app.auth.rbac import require_policy, require_roles
+
+
+def test_roles_are_interned_into_distinct_bits():
+    policy = RolePolicy(roles=["admin", "analyst", "viewer"])
+    assert policy.mask(["admin"]) == 1
+    assert policy.mask(["analyst"]) == 2
+    assert policy.mask(["viewer", "admin"]) == 5
+    assert policy.mask(["inconnu"]) == 0
+
+
+def test_route_masks_are_compiled_once():
+    policy = RolePolicy(roles=["admin", "analyst"], routes={"score": ["analyst", "admin"]})
+    assert policy.route_mask("score") == 3
+    with pytest.raises(KeyError):
+        policy.route_mask("absente")
+
+
+def test_policy_file_declares_api_routes():
+    for route in ("score", "fraude", "admin"):
+        assert role_policy.route_mask(route)
+    assert role_policy.roles_of(role_policy.route_mask("admin")) == ["admin"]
+
+
+def principal(*roles) -> Principal:
+    claims = {"sub": "user", "realm_access": {"roles": list(roles)}}
+    return Principal(claims=claims, role_mask=role_policy.mask(roles))
+
+
+@pytest.mark.parametrize("roles", [("analyst",), ("admin",), ("viewer", "admin")])
+def test_require_policy_accepts_allowed_roles(roles):
+    check = require_policy("score")
+    assert check(principal(*roles))["sub"] == "user"
+
+
+@pytest.mark.parametrize("roles", [(), ("viewer",), ("inconnu",)])
+def test_require_policy_rejects_other_roles(roles):
+    check = require_policy("score")
+    with pytest.raises(HTTPException) as exc:
+        check(principal(*roles))
+    assert exc.value.status_code == 403
+
+
+def test_require_roles_keeps_any_of_semantics():
+    check = require_roles("admin")
+    assert check(principal("admin", "analyst"))
+    with pytest.raises(HTTPException):
+        check(principal("analyst"))
+
+
+def test_new_role_bit_invalidates_cached_masks():
+    from app.auth.auth_handler import token_cache
+
+    token_cache.clear()
+    cached = principal("auditeur")
+    assert cached.role_mask == 0
+    token_cache.set("token", cached)
+    check = require_roles("auditeur")
+    # Le masque en cache a été calculé avant l'attribution du bit : il est purgé
+    assert len(token_cache) == 0
+    assert check(principal("auditeur"))
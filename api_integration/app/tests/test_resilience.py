@@ -0,0 +1,142 @@
+"""
+Tests de la couche de résilience (app/services/resilience.py) et de son usage vers Rasa.
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.chatbot_service import ChatbotService
+from app.services.resilience import (
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientCaller,
+)
+from app.tests.fake_rasa import FakeRasa
+
+
+def test_breaker_opens_then_probes_then_closes():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.try_acquire() is False
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.try_acquire() is True
+    # Une seule sonde à la fois
+    assert breaker.try_acquire() is False
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.try_acquire() is True
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast():
+    caller = ResilientCaller(["a"], deadline=1, max_concurrent=5, queue_timeout=0.1, failure_threshold=1)
+
+    async def broken(replica):
+        raise ConnectionError(replica)
+
+    with pytest.raises(ConnectionError):
+        await caller.call(broken)
+    with pytest.raises(CircuitOpenError):
+        await caller.call(broken)
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_rejects_when_queue_wait_exceeded():
+    caller = ResilientCaller(["a"], deadline=1, max_concurrent=1, queue_timeout=0.02, hedge=False)
+
+    async def slow(replica):
+        await asyncio.sleep(0.2)
+        return replica
+
+    first = asyncio.ensure_future(caller.call(slow))
+    await asyncio.sleep(0)
+    with pytest.raises(BulkheadFullError):
+        await caller.call(slow)
+    assert await first == "a"
+    assert caller.stats()["bulkhead"]["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_counts_as_failure_and_cancels_attempt():
+    cancelled = asyncio.Event()
+    caller = ResilientCaller(["a"], deadline=0.05, max_concurrent=5, queue_timeout=0.1, failure_threshold=1)
+
+    async def hanging(replica):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(asyncio.TimeoutError):
+        await caller.call(hanging)
+    await asyncio.sleep(0)
+    assert cancelled.is_set()
+    assert caller.stats()["deadline_exceeded"] == 1
+    assert caller.breakers["a"].state == "open"
+
+
+@pytest.mark.asyncio
+async def test_fast_failure_falls_over_to_next_replica():
+    caller = ResilientCaller(["a", "b"], deadline=1, max_concurrent=5, queue_timeout=0.1)
+
+    async def only_b(replica):
+        if replica == "a":
+            raise ConnectionError(replica)
+        return replica
+
+    assert await caller.call(only_b) == "b"
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_against_slow_replica():
+    slow, fast = FakeRasa(latency=0.5), FakeRasa()
+    async with slow.serve() as slow_url, fast.serve() as fast_url:
+        service = ChatbotService(rasa_url=slow_url, replica_urls=[fast_url], deadline=2)
+        service.resilience.hedge = True
+        # Latences habituelles ~10 ms : le p95 déclenche la couverture bien avant 0.5 s
+        for _ in range(service.resilience.hedge_min_samples):
+            service.resilience.latency.record(0.01)
+        start = time.perf_counter()
+        response = await service.process_message("bonjour")
+        elapsed = time.perf_counter() - start
+        stats = service.stats()["resilience"]
+        await service.close()
+
+    assert response[0]["text"] == "Réponse à : bonjour"
+    assert elapsed < 0.4
+    assert slow.calls == 1 and fast.calls == 1
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    # Le perdant annulé ne compte pas comme un échec
+    assert stats["breakers"][slow_url]["consecutive_failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failing_replica_trips_breaker():
+    broken = FakeRasa()
+    broken.status = 500
+    async with broken.serve() as url:
+        service = ChatbotService(rasa_url=url, replica_urls=[])
+        service.resilience.breakers[url].failure_threshold = 2
+        for _ in range(2):
+            with pytest.raises(Exception, match="Failed to get response"):
+                await service.process_message("bonjour")
+        with pytest.raises(CircuitOpenError):
+            await service.process_message("bonjour")
+        await service.close()
+    assert broken.calls == 2
@@ -0,0 +1,72 @@
+"""
+Tests des tokens de service client_credentials (app/security/service_token.py)
+contre le faux Keycloak local.
+"""
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.security.keycloak_client import AsyncKeycloakClient
+from app.security.service_token import ServiceTokenAuth, ServiceTokenProvider
+from app.tests.fake_keycloak import FakeKeycloak
+
+
+@pytest.fixture
+def fake_keycloak():
+    return FakeKeycloak(latency=0.02)
+
+
+@pytest_asyncio.fixture
+async def provider(fake_keycloak):
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_keycloak.app))
+    keycloak = AsyncKeycloakClient(issuer=fake_keycloak.issuer, http_client=http)
+    provider = ServiceTokenProvider(keycloak=keycloak)
+    yield provider
+    await provider.close()
+    await keycloak.aclose()
+
+
+@pytest.mark.asyncio
+async def test_token_is_cached(fake_keycloak, provider):
+    first = await provider.get_token()
+    for _ in range(10):
+        assert await provider.get_token() == first
+    assert fake_keycloak.calls["token"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_calls_share_one_fetch(fake_keycloak, provider):
+    tokens = await asyncio.gather(*(provider.get_token() for _ in range(20)))
+    assert len(set(tokens)) == 1
+    assert fake_keycloak.calls["token"] == 1
+
+
+@pytest.mark.asyncio
+async def test_token_is_refreshed_proactively(fake_keycloak, provider):
+    fake_keycloak.service_token_lifetime = 0.5
+    first = await provider.get_token()
+    # Renouvellement planifié à 80 % de la durée de vie (0.4 s)
+    await asyncio.sleep(0.45)
+    assert fake_keycloak.calls["token"] == 2
+
+    fake_keycloak.latency = 1.0
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    second = await provider.get_token()
+    assert second != first
+    assert loop.time() - start < 0.1
+
+
+@pytest.mark.asyncio
+async def test_httpx_auth_adds_bearer_header(provider):
+    seen = {}
+
+    def handler(request: httpx.Request):
+        seen["authorization"] = request.headers.get("Authorization")
+        return httpx.Response(200, json={})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), auth=ServiceTokenAuth(provider)) as http:
+        await http.get("http://feature-store.test/features")
+    assert seen["authorization"] == f"Bearer {await provider.get_token()}"
@@ -0,0 +1,97 @@
+"""
+Tests du démarrage à froid (app/startup.py, app/utils/lazy.py).
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from app.startup import STARTUP_TASKS, init_resources
+from app.utils.lazy import LazyResource, registry
+
+# Budget d'import de app.main dans un processus neuf (s), ajustable pour les CI lentes
+COLD_START_BUDGET = float(os.getenv("COLD_START_BUDGET", 3))
+
+COLD_IMPORT = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+from app.utils.lazy import registry
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "modules": [m for m in ("elasticsearch", "numpy") if m in sys.modules],
+    "registered": sorted(registry),
+    "initialized": [name for name, resource in registry.items() if resource.initialized],
+}))
+"""
+
+
+def test_cold_import_is_fast_and_creates_nothing():
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_IMPORT], cwd=project_root, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    profile = json.loads(result.stdout.strip().splitlines()[-1])
+    assert profile["modules"] == []
+    # Y compris le détecteur de langue et l'extracteur d'entités, préparés par app/startup.py
+    assert {"language_detector", "entity_extractor"} <= set(profile["registered"])
+    assert profile["initialized"] == []
+    assert profile["seconds"] < COLD_START_BUDGET, f"import de app.main : {profile['seconds']:.2f}s"
+
+
+def test_lazy_resource_is_created_once_under_concurrency():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.02)
+        return object()
+
+    resource = LazyResource("test_resource", factory)
+    try:
+        assert not resource.initialized
+        values = []
+        threads = [threading.Thread(target=lambda: values.append(resource.get())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1 and len({id(v) for v in values}) == 1
+        assert resource.initialized and resource.init_ms >= 20
+
+        resource.reset()
+        resource.get()
+        assert len(calls) == 2
+    finally:
+        registry.pop("test_resource", None)
+
+
+def test_registered_resources_are_warmed_at_startup():
+    warmed = {getattr(task, "__self__", None) for task in STARTUP_TASKS.values()}
+    assert set(registry.values()) <= warmed
+
+
+@pytest.mark.asyncio
+async def test_resources_are_initialized_in_parallel_and_failures_reported():
+    def slow():
+        time.sleep(0.1)
+
+    def broken():
+        raise RuntimeError("modèle introuvable")
+
+    report = await init_resources(
+        {"a": slow, "b": slow, "c": slow, "jwks": lambda: False, "model": broken, "hang": lambda: time.sleep(1)},
+        timeout=0.3,
+    )
+    resources = report["resources"]
+    assert all(resources[name]["ok"] for name in "abc")
+    assert resources["jwks"]["ok"] is False
+    assert resources["model"] == {**resources["model"], "ok": False, "error": "modèle introuvable"}
+    assert resources["hang"]["error"] == "timeout (0.3s)"
+    # Trois tâches de 100 ms en parallèle, plafonnées par le timeout
+    assert report["wall_ms"] < 600
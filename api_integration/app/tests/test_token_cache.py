@@ -0,0 +1,98 @@
+"""
+Tests du cache des tokens vérifiés (app/utils/cache.py et verify_jwt).
+"""
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.auth import auth_handler
+from app.config import KEYCLOAK_ISSUER, KEYCLOAK_CLIENT_ID, TOKEN_CACHE_CLOCK_SKEW
+from app.utils.cache import ExpiringLRUCache
+
+
+# ---------------------------
+# ExpiringLRUCache
+# ---------------------------
+def test_lru_evicts_least_recently_used():
+    cache = ExpiringLRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire():
+    cache = ExpiringLRUCache(maxsize=10)
+    cache.set("a", 1, ttl=-1)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["misses"] == 1
+
+
+def test_hit_rate():
+    cache = ExpiringLRUCache(maxsize=10)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    assert cache.stats()["hit_rate"] == pytest.approx(2 / 3, abs=1e-3)
+
+
+# ---------------------------
+# verify_jwt
+# ---------------------------
+@pytest.fixture
+def signing_key(monkeypatch):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public = jwk.RSAKey(private_key.public_key(), "RS256")
+    monkeypatch.setattr(auth_handler.jwks_manager, "get_key", lambda kid: public)
+    auth_handler.token_cache.clear()
+    return pem
+
+
+def make_token(pem: bytes, exp_in: float) -> str:
+    now = time.time()
+    claims = {
+        "sub": "user",
+        "iss": KEYCLOAK_ISSUER,
+        "aud": KEYCLOAK_CLIENT_ID,
+        "iat": int(now),
+        "exp": int(now + exp_in),
+        "realm_access": {"roles": ["analyst"]},
+    }
+    return jwt.encode(claims, pem, algorithm="RS256", headers={"kid": "k1"})
+
+
+def test_repeat_token_skips_signature_verification(signing_key, monkeypatch):
+    token = make_token(signing_key, exp_in=600)
+    calls = {"decode": 0}
+    real_decode = auth_handler.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls["decode"] += 1
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth_handler.jwt, "decode", counting_decode)
+    first = auth_handler.verify_jwt(token)
+    for _ in range(5):
+        assert auth_handler.verify_jwt(token) == first
+    assert calls["decode"] == 1
+    assert auth_handler.token_cache.stats()["hits"] == 5
+
+
+def test_token_close_to_expiry_is_not_cached(signing_key):
+    token = make_token(signing_key, exp_in=TOKEN_CACHE_CLOCK_SKEW / 2)
+    auth_handler.verify_jwt(token)
+    assert len(auth_handler.token_cache) == 0
@@ -0,0 +1,70 @@
+"""
+Tests du cache d'existence des utilisateurs (app/services/user_cache.py).
+"""
+import asyncio
+
+import pytest
+
+from app.services.user_cache import UserExistenceCache
+
+
+class FakeUsers:
+    def __init__(self, *usernames, latency=0.0):
+        self.usernames = set(usernames)
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self, username):
+        self.calls += 1
+        found = username in self.usernames
+        await asyncio.sleep(self.latency)
+        return found
+
+
+@pytest.mark.asyncio
+async def test_hits_and_misses_are_cached():
+    users = FakeUsers("alice")
+    cache = UserExistenceCache(maxsize=10, ttl=60, negative_ttl=60)
+    assert await cache.exists("alice", users)
+    assert await cache.exists("alice", users)
+    assert not await cache.exists("bob", users)
+    assert not await cache.exists("bob", users)
+    assert users.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_read():
+    users = FakeUsers("alice", latency=0.01)
+    cache = UserExistenceCache(maxsize=10, ttl=60)
+    results = await asyncio.gather(*(cache.exists("alice", users) for _ in range(20)))
+    assert all(results)
+    assert users.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_create_and_delete_update_the_cache():
+    users = FakeUsers()
+    cache = UserExistenceCache(maxsize=10, ttl=60, negative_ttl=60)
+    assert not await cache.exists("alice", users)
+
+    users.usernames.add("alice")
+    cache.mark_created("alice")
+    assert await cache.exists("alice", users)
+
+    users.usernames.discard("alice")
+    cache.invalidate("alice")
+    assert not await cache.exists("alice", users)
+    assert users.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_read_does_not_override_creation():
+    users = FakeUsers(latency=0.02)
+    cache = UserExistenceCache(maxsize=10, ttl=60, negative_ttl=60)
+    lookup = asyncio.create_task(cache.exists("alice", users))
+    await asyncio.sleep(0.005)
+    # Création pendant la lecture : le "absent" lu ne doit pas être mis en cache
+    users.usernames.add("alice")
+    cache.mark_created("alice")
+    assert not await lookup
+    assert await cache.exists("alice", users)
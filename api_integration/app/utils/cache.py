@@ -0,0 +1,114 @@
+"""
+Cache LRU borné avec expiration par entrée et compteurs de hit/miss,
+et déduplication des appels asynchrones concurrents (single-flight).
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class ExpiringLRUCache:
+    """
+    Cache LRU thread-safe : chaque entrée a sa propre date d'expiration,
+    l'entrée la moins récemment utilisée est évincée quand `maxsize` est atteint.
+    """
+
+    def __init__(self, maxsize: int = 1024, default_ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retourne la valeur en cache (et la marque comme récente), sinon `default`."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Ajoute une entrée ; `ttl` en secondes (None = `default_ttl`, ou pas d'expiration)."""
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        """Supprime toutes les entrées dont la clé satisfait `predicate`."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SingleFlight:
+    """
+    Déduplique les appels asynchrones concurrents portant sur la même clé :
+    le premier appelant lance le travail, les suivants attendent le même résultat.
+    L'annulation d'un appelant n'interrompt pas le travail partagé.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Future):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Marque l'exception comme lue si aucun appelant n'attend plus
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
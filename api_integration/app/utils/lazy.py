@@ -0,0 +1,55 @@
+"""
+Ressources initialisées à la demande (clients, modèles, profils).
+
+Rien n'est créé à l'import : la ressource est construite au premier `get()`,
+une seule fois même en cas d'accès concurrents (threadpool FastAPI), ou
+préchauffée au démarrage (voir app/startup.py). Le temps d'initialisation est
+mesuré pour `python -m app.startup_profile`.
+"""
+import threading
+import time
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+# Toutes les ressources déclarées, par nom (profilage, tests de démarrage à froid)
+registry: Dict[str, "LazyResource"] = {}
+
+
+class LazyResource(Generic[T]):
+    """Valeur produite par `factory()` au premier accès, puis conservée"""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._value = _MISSING
+        self._lock = threading.Lock()
+        self.init_ms: Optional[float] = None
+        registry[name] = self
+
+    @property
+    def initialized(self) -> bool:
+        return self._value is not _MISSING
+
+    def get(self) -> T:
+        value = self._value
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            if self._value is _MISSING:
+                start = time.perf_counter()
+                self._value = self._factory()
+                self.init_ms = round((time.perf_counter() - start) * 1000, 3)
+            return self._value
+
+    def reset(self):
+        """Oublie la valeur : le prochain `get()` la recrée (tests)"""
+        with self._lock:
+            self._value = _MISSING
+            self.init_ms = None
+
+    def __repr__(self) -> str:
+        state = f"{self.init_ms} ms" if self.initialized else "non initialisée"
+        return f"<LazyResource {self.name} ({state})>"
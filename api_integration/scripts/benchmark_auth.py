@@ -0,0 +1,74 @@
+"""
+Benchmark du coût d'authentification par requête (verify_jwt)
+- sans cache : vérification RS256 complète à chaque appel
+- avec cache : token déjà vérifié servi depuis token_cache
+
+Usage (depuis api_integration/) :
+    python scripts/benchmark_auth.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.auth import auth_handler
+from app.config import KEYCLOAK_ISSUER, KEYCLOAK_CLIENT_ID
+
+# ---------------------------
+# Config
+# ---------------------------
+NUM_REQUESTS = 5000
+
+
+def make_token() -> str:
+    """Génère une paire RSA locale, publie la clé dans jwks_manager et signe un token."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public = jwk.RSAKey(private_key.public_key(), "RS256")
+    auth_handler.jwks_manager.get_key = lambda kid: public
+
+    now = int(time.time())
+    claims = {
+        "sub": "bench_user",
+        "iss": KEYCLOAK_ISSUER,
+        "aud": KEYCLOAK_CLIENT_ID,
+        "iat": now,
+        "exp": now + 3600,
+        "realm_access": {"roles": ["analyst"]},
+    }
+    return jwt.encode(claims, pem, algorithm="RS256", headers={"kid": "bench"})
+
+
+def run(token: str, cached: bool):
+    """Retourne le coût moyen par requête (µs) et le hit rate observé."""
+    cache = auth_handler.token_cache
+    cache.clear()
+    hits_before = cache.hits
+    start = time.perf_counter()
+    for _ in range(NUM_REQUESTS):
+        if not cached:
+            cache.clear()
+        auth_handler.verify_jwt(token)
+    elapsed = (time.perf_counter() - start) / NUM_REQUESTS * 1e6
+    return elapsed, (cache.hits - hits_before) / NUM_REQUESTS
+
+
+if __name__ == "__main__":
+    token = make_token()
+    uncached, _ = run(token, cached=False)
+    cached, hit_rate = run(token, cached=True)
+
+    print(f"Requêtes            : {NUM_REQUESTS}")
+    print(f"Sans cache          : {uncached:8.1f} µs / requête")
+    print(f"Avec cache          : {cached:8.1f} µs / requête")
+    print(f"Gain                : x{uncached / cached:.0f}")
+    print(f"Hit rate (cache)    : {hit_rate:.2%}")
@@ -0,0 +1,103 @@
+"""
+Benchmark de l'extraction d'entités (app/services/entity_extractor.py)
+- automate d'Aho-Corasick (un passage par message, quel que soit le nombre d'expressions)
+- alternance regex naïve : (?<!\\w)(?:expr1|expr2|...)(?!\\w), insensible à la casse
+
+Les dictionnaires réels sont complétés par des produits synthétiques pour mesurer
+l'évolution du coût avec la taille des dictionnaires.
+
+Usage (depuis api_integration/) :
+    python scripts/benchmark_entity_extraction.py
+"""
+import os
+import re
+import sys
+import time
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import ENTITY_DICTIONARY_PATH
+from app.services.entity_extractor import EntityAutomaton, fold
+
+# ---------------------------
+# Config
+# ---------------------------
+NUM_ROUNDS = 500
+EXTRA_PRODUCTS = [0, 500, 5000]
+
+MESSAGES = [
+    "Bonjour, je veux faire un virement depuis mon compte épargne vers mon compte courant.",
+    "Ma carte visa a été refusée pour un paiement en ligne hier soir.",
+    "I need to make a wire transfer from my savings account please.",
+    "Quiero hacer una transferencia desde mi cuenta corriente.",
+    "bghit ndir l virement mn compte d tawfir dyali",
+    "أريد تحويل المال من حساب جاري",
+    "Combien coûte un retrait avec la carte gold à l'étranger ?",
+    "Rien à signaler, merci beaucoup pour votre aide.",
+]
+
+
+def load_dictionaries(extra_products: int):
+    with open(ENTITY_DICTIONARY_PATH, "r", encoding="utf-8") as f:
+        dictionaries = yaml.safe_load(f)["entities"]
+    for i in range(extra_products):
+        dictionaries["product"][f"offre_{i}"] = [f"offre premium {i}", f"pack avantage {i}"]
+    return dictionaries
+
+
+def build_regex(dictionaries):
+    """Alternance de toutes les expressions (forme d'origine et sans accents), la plus longue d'abord"""
+    lookup = {}
+    for entity, values in dictionaries.items():
+        for value, synonyms in values.items():
+            for synonym in [value, *synonyms]:
+                synonym = str(synonym)
+                for form in {synonym.lower(), "".join(fold(c) for c in synonym)}:
+                    lookup[form] = (entity, value)
+    alternation = "|".join(re.escape(e) for e in sorted(lookup, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE), lookup
+
+
+def run(label, fn):
+    start = time.perf_counter()
+    for _ in range(NUM_ROUNDS):
+        for message in MESSAGES:
+            fn(message)
+    elapsed = time.perf_counter() - start
+    per_message = elapsed * 1e6 / (NUM_ROUNDS * len(MESSAGES))
+    print(f"  {label:<16} {per_message:9.2f} µs/message")
+    return per_message
+
+
+def main():
+    for extra in EXTRA_PRODUCTS:
+        dictionaries = load_dictionaries(extra)
+
+        start = time.perf_counter()
+        automaton = EntityAutomaton(dictionaries)
+        compile_ac = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        regex, lookup = build_regex(dictionaries)
+        compile_re = (time.perf_counter() - start) * 1000
+
+        print(f"\n{automaton.n_patterns} expressions ({automaton.n_states} états, "
+              f"table {automaton.delta.itemsize * len(automaton.delta) // 1024} Kio)")
+        print(f"  compilation      aho-corasick {compile_ac:.1f} ms, regex {compile_re:.1f} ms")
+
+        def aho_corasick(message):
+            return [automaton.entities[i] for _, _, i in automaton.find(message)]
+
+        def naive_regex(message):
+            return [lookup.get(m.group(0).lower()) or lookup.get("".join(fold(c) for c in m.group(0)))
+                    for m in regex.finditer(message)]
+
+        disagreements = [m for m in MESSAGES if aho_corasick(m) != naive_regex(m)]
+        ac = run("aho-corasick", aho_corasick)
+        rx = run("regex", naive_regex)
+        print(f"  accélération     x{rx / ac:.1f}, résultats différents : {len(disagreements)}/{len(MESSAGES)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark du détecteur de langue (app/services/language_detector.py)
+- précision par langue sur des messages absents des corpus d'entraînement
+- coût moyen par message (µs)
+- entraînement sur les corpus vs chargement des profils précalculés
+
+Usage (depuis api_integration/) :
+    python scripts/benchmark_language_detection.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import LANGUAGE_PROFILES_PATH
+from app.services.language_detector import LanguageDetector
+
+# ---------------------------
+# Config
+# ---------------------------
+NUM_ROUNDS = 2000
+
+EVAL_SET = {
+    "fr": [
+        "Bonjour, ma carte a été avalée par le distributeur ce matin.",
+        "Je ne trouve pas le bouton pour télécharger mon RIB.",
+        "Pouvez-vous annuler le virement que j'ai fait par erreur ?",
+        "Mon compte est débité deux fois pour le même achat.",
+        "Est-ce que je peux payer en plusieurs fois ?",
+        "Je veux savoir pourquoi on m'a facturé ces frais.",
+        "Merci, tout est réglé maintenant.",
+        "Il me manque de l'argent sur mon compte depuis hier.",
+    ],
+    "en": [
+        "Hi, the ATM swallowed my card this morning.",
+        "I can't find where to download my bank details.",
+        "Can you cancel the transfer I made by mistake?",
+        "My account was charged twice for the same purchase.",
+        "Can I pay in installments?",
+        "I want to know why I was charged these fees.",
+        "Thanks, everything is sorted now.",
+        "Some money is missing from my account since yesterday.",
+    ],
+    "es": [
+        "Hola, el cajero se tragó mi tarjeta esta mañana.",
+        "No encuentro dónde descargar los datos de mi cuenta.",
+        "¿Puede anular la transferencia que hice por error?",
+        "Me cobraron dos veces la misma compra.",
+        "¿Puedo pagar a plazos?",
+        "Quiero saber por qué me cobraron estas comisiones.",
+        "Gracias, ya está todo resuelto.",
+        "Me falta dinero en la cuenta desde ayer.",
+    ],
+    "ar": [
+        "مرحبا، الصراف الآلي ابتلع بطاقتي هذا الصباح.",
+        "لا أجد أين أحمل معلومات حسابي.",
+        "هل يمكنكم إلغاء التحويل الذي قمت به بالخطأ؟",
+        "تم خصم المبلغ مرتين لنفس الشراء.",
+        "هل يمكنني الدفع بالتقسيط؟",
+        "أريد أن أعرف لماذا تم احتساب هذه الرسوم.",
+        "شكرا، تم حل كل شيء الآن.",
+        "ينقص مال من حسابي منذ البارحة.",
+    ],
+    "darija": [
+        "salam, guichet bla3 lia la carte had sbah.",
+        "ma l9itch fin ntelecharger le RIB dyali.",
+        "wach t9der tannuler l virement li dert bl ghalat?",
+        "t9etta3 lia joj dlmrat 3la nfs chi.",
+        "wach n9der nkhles b triqa dyal ta9sit?",
+        "bghit n3ref 3lach khlsoni had lfrais.",
+        "chokran, kolchi tsawb daba.",
+        "na9sin lia flous f compte mn lbare7.",
+    ],
+}
+
+
+def main():
+    start = time.perf_counter()
+    LanguageDetector.from_corpus()
+    train_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    detector = LanguageDetector.load(LANGUAGE_PROFILES_PATH)
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"Entraînement sur les corpus : {train_ms:.1f} ms")
+    print(f"Chargement des profils précalculés : {load_ms:.1f} ms "
+          f"({len(detector.codes)} trigrammes, {len(detector.languages)} langues, "
+          f"{detector.codes.itemsize * len(detector.codes) + len(detector.weights)} octets)")
+
+    print("\nPrécision (messages hors corpus d'entraînement)")
+    correct = total = 0
+    for lang, messages in EVAL_SET.items():
+        ok = 0
+        for message in messages:
+            predicted = detector.detect(message)
+            if predicted == lang:
+                ok += 1
+            else:
+                print(f"  [{lang} -> {predicted}] {message}")
+        correct += ok
+        total += len(messages)
+        print(f"  {lang:<7} {ok}/{len(messages)}")
+    print(f"  total   {correct}/{total} ({100 * correct / total:.1f} %)")
+
+    messages = [m for batch in EVAL_SET.values() for m in batch]
+    start = time.perf_counter()
+    for _ in range(NUM_ROUNDS):
+        for message in messages:
+            detector.detect(message)
+    elapsed = time.perf_counter() - start
+    calls = NUM_ROUNDS * len(messages)
+    avg_chars = sum(len(m) for m in messages) / len(messages)
+    print(f"\nDébit : {calls} messages ({avg_chars:.0f} caractères en moyenne)")
+    print(f"  {elapsed * 1e6 / calls:.2f} µs/message, {calls / elapsed:,.0f} messages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Calcule les profils du détecteur de langue à partir des corpus
+(app/services/language_corpus/) et les écrit dans LANGUAGE_PROFILES_PATH.
+
+À relancer après chaque modification d'un corpus : l'application charge le
+fichier tel quel et ne réentraîne que s'il est absent.
+
+Usage (depuis api_integration/) :
+    python scripts/build_language_profiles.py [--output config/nlp/language_profiles.bin]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import LANGUAGE_PROFILES_PATH
+from app.services.language_detector import CORPUS_DIR, LanguageDetector
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère les profils précalculés du détecteur de langue")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="répertoire des corpus <langue>.txt")
+    parser.add_argument("--output", default=LANGUAGE_PROFILES_PATH)
+    args = parser.parse_args()
+
+    detector = LanguageDetector.from_corpus(args.corpus)
+    detector.save(args.output)
+    print(
+        f"{os.path.normpath(args.output)} : {', '.join(detector.languages)} "
+        f"({len(detector.codes)} trigrammes, {os.path.getsize(args.output)} octets)"
+    )
+
+
+if __name__ == "__main__":
+    main()
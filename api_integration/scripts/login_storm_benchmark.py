@@ -0,0 +1,107 @@
+"""
+Test de charge : latence du chat pendant une rafale de logins.
+
+Simule, dans un seul worker (une boucle d'événements) :
+- un flux continu de requêtes chat (petit travail async),
+- une rafale de logins concurrents vérifiant un mot de passe bcrypt,
+et compare la latence p50 / p99 du chat :
+- AVANT : vérification bcrypt directement dans la coroutine (bloque la boucle),
+- APRÈS : vérification via le pool bcrypt dédié (app/auth/password_hasher.py).
+
+Usage (depuis api_integration/) :
+    python scripts/login_storm_benchmark.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.auth.password_hasher import PasswordHasher
+
+# ---------------------------
+# Config
+# ---------------------------
+NUM_LOGINS = 20
+LOGIN_CONCURRENCY = 10
+CHAT_INTERVAL = 0.005       # une requête chat toutes les 5 ms
+CHAT_WORK = 0.001           # travail async simulé d'une requête chat (I/O)
+PASSWORD = "motdepasse-de-test"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def chat_traffic(stop: asyncio.Event, latencies: list):
+    """
+    Émet des requêtes chat selon un planning fixe et mesure leur latence depuis
+    l'instant prévu d'arrivée : une boucle bloquée retarde aussi l'émission,
+    et ce retard doit compter dans la latence observée par le client.
+    """
+    loop = asyncio.get_running_loop()
+    pending = []
+    next_at = loop.time()
+
+    async def chat_request(scheduled_at: float):
+        await asyncio.sleep(CHAT_WORK)
+        latencies.append((loop.time() - scheduled_at) * 1000)
+
+    while not stop.is_set():
+        # Émettre toutes les requêtes arrivées depuis le dernier réveil
+        while next_at <= loop.time():
+            pending.append(asyncio.create_task(chat_request(next_at)))
+            next_at += CHAT_INTERVAL
+        await asyncio.sleep(max(0.0, next_at - loop.time()))
+    await asyncio.gather(*pending)
+
+
+async def login_storm(hasher: PasswordHasher, hashed: str, offload: bool):
+    semaphore = asyncio.Semaphore(LOGIN_CONCURRENCY)
+
+    async def login():
+        async with semaphore:
+            if offload:
+                assert await hasher.verify(PASSWORD, hashed)
+            else:
+                # Comportement historique : bcrypt exécuté dans la coroutine
+                assert hasher.context.verify(PASSWORD, hashed)
+                await asyncio.sleep(0)
+
+    await asyncio.gather(*(login() for _ in range(NUM_LOGINS)))
+
+
+async def run(offload: bool):
+    hasher = PasswordHasher()
+    hashed = hasher.context.hash(PASSWORD)
+    latencies = []
+    stop = asyncio.Event()
+
+    traffic = asyncio.create_task(chat_traffic(stop, latencies))
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await login_storm(hasher, hashed, offload)
+    duration = time.perf_counter() - start
+    stop.set()
+    await traffic
+    hasher.shutdown()
+    return latencies, duration
+
+
+def report(label: str, latencies: list, duration: float):
+    print(
+        f"{label:<28} chat p50 = {statistics.median(latencies):7.1f} ms   "
+        f"p99 = {percentile(latencies, 99):7.1f} ms   "
+        f"({len(latencies)} requêtes chat, {NUM_LOGINS} logins en {duration:.2f} s)"
+    )
+
+
+if __name__ == "__main__":
+    before, before_duration = asyncio.run(run(offload=False))
+    after, after_duration = asyncio.run(run(offload=True))
+    report("AVANT (bcrypt dans la boucle)", before, before_duration)
+    report("APRÈS (pool bcrypt dédié)", after, after_duration)
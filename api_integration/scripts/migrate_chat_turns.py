@@ -0,0 +1,67 @@
+"""
+Déplace les échanges du chatbot de `conversations` vers `chat_turns`.
+
+Depuis le client MongoDB partagé (app/services/mongodb_client.py), mongodb_auth
+et mongodb_service écrivent dans la même base. Les échanges du chatbot
+({user_id, message, response, timestamp}, sans `metadata`) ont pu être insérés
+dans `conversations`, où ils cassent la pagination de l'historique. Ils vont
+désormais dans `chat_turns` ; ce script y déplace ceux déjà écrits.
+
+Idempotent et repris sans risque après interruption : chaque lot est copié
+(copies déjà présentes ignorées) puis supprimé de `conversations`.
+
+Usage (depuis api_integration/) :
+    python scripts/migrate_chat_turns.py [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo.errors import BulkWriteError
+
+from app.services.mongodb_client import mongo_client_factory
+
+DUPLICATE_KEY = 11000
+# Un échange du chatbot n'a pas de `metadata` (toujours présent sur les conversations de mongodb_service)
+CHAT_TURN = {"metadata": {"$exists": False}, "message": {"$exists": True}}
+
+
+async def migrate(batch_size: int, dry_run: bool) -> int:
+    db = mongo_client_factory.get_database()
+    source, target = db.conversations, db.chat_turns
+    if dry_run:
+        return await source.count_documents(CHAT_TURN)
+
+    moved = 0
+    while True:
+        batch = await source.find(CHAT_TURN).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return moved
+        try:
+            await target.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+        await source.delete_many({"_id": {"$in": [turn["_id"] for turn in batch]}})
+        moved += len(batch)
+        print(f"{moved} échange(s) déplacé(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Déplace les échanges du chatbot vers chat_turns")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="compte les échanges à déplacer sans rien modifier")
+    args = parser.parse_args()
+
+    try:
+        count = asyncio.run(migrate(args.batch_size, args.dry_run))
+    finally:
+        mongo_client_factory.close()
+    print(f"{count} échange(s) {'à déplacer' if args.dry_run else 'déplacé(s)'} vers chat_turns")
+
+
+if __name__ == "__main__":
+    main()